@@ -2,13 +2,16 @@
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from apps.core.admin import LargeTableAdminMixin
 from .models import User
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
     """Custom admin for User model"""
-    list_display = ['email', 'name', 'is_staff', 'is_active', 'date_joined']
+    list_display = ['email', 'name', 'shard', 'is_staff', 'is_active', 'date_joined']
     list_filter = ['is_staff', 'is_active', 'date_joined']
+    # Changed by `manage.py rebalance_shards --move`, which also moves the data
+    readonly_fields = ['shard', 'shard_locked']
     search_fields = ['email', 'name']
     ordering = ['-date_joined']
     
@@ -17,4 +20,5 @@ class UserAdmin(BaseUserAdmin):
         ('Personal Info', {'fields': ('name', 'username')}),
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
         ('Important dates', {'fields': ('last_login', 'date_joined')}),
+        ('Shard', {'fields': ('shard', 'shard_locked')}),
     )
\ No newline at end of file
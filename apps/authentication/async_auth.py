@@ -0,0 +1,76 @@
+# apps/authentication/async_auth.py
+
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from apps.core.sharding import shard_for_user, use_shard
+
+"""
+JWT authentication for async (ASGI-native) views.
+
+DRF's authentication classes are synchronous: JWTAuthentication.get_user()
+hits the database with the sync ORM. Token decoding is pure CPU, so we reuse
+simplejwt for that and only replace the user lookup with `aget()`.
+"""
+
+User = get_user_model()
+
+_jwt = JWTAuthentication()
+
+
+async def authenticate_request(request):
+    """
+    Return the authenticated user for a request, or None.
+    """
+    header = _jwt.get_header(request)
+    if header is None:
+        return None
+
+    raw_token = _jwt.get_raw_token(header)
+    if raw_token is None:
+        return None
+
+    try:
+        validated_token = _jwt.get_validated_token(raw_token)
+    except (InvalidToken, TokenError):
+        return None
+
+    user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+    if user_id is None:
+        return None
+
+    try:
+        user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        return None
+
+    if not user.is_active:
+        return None
+
+    return user
+
+
+def async_jwt_required(view_func):
+    """
+    Decorator for async views: authenticate with JWT, set request.user
+    and activate the user's shard.
+    Responds with the same 401 body DRF uses for unauthenticated requests.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await authenticate_request(request)
+        if user is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=401
+            )
+        request.user = user
+        # Sharded models follow the user (apps/core/sharding.py)
+        with use_shard(shard_for_user(user)):
+            return await view_func(request, *args, **kwargs)
+
+    return wrapper
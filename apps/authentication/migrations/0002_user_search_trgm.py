@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from apps.core.admin import trigram_search_indexes
+
+
+class Migration(migrations.Migration):
+    """
+    Trigram indexes behind the admin search_fields (PostgreSQL only).
+    """
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        trigram_search_indexes('users', ['email', 'name']),
+    ]
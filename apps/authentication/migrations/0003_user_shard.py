@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_user_search_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='shard',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='shard_locked',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -16,6 +16,12 @@ class User(AbstractUser):
     email = models.EmailField(unique=True, db_index=True)
     name = models.CharField(max_length=255)
     
+    # Database alias holding this user's patients and mappings
+    # ('' = 'default', see apps/core/sharding.py)
+    shard = models.CharField(max_length=64, blank=True, default='')
+    # Set while rebalance_shards moves the user's rows; writes get 503
+    shard_locked = models.BooleanField(default=False)
+    
     # We'll use email for login instead of username
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['name', 'username']  # username still required by Django internally
@@ -1,9 +1,12 @@
 # apps/authentication/serializers.py
 
 from rest_framework import serializers
+from apps.core.instrumentation import TimedSerializerMixin
+from apps.core.sharding import pick_shard, replicate
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from .tokens import token_service
 
 User = get_user_model()
 
@@ -53,8 +56,11 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             username=validated_data['email'],  # Using email as username
             email=validated_data['email'],
             name=validated_data['name'],
-            password=validated_data['password']
+            password=validated_data['password'],
+            shard=pick_shard(validated_data['email'])
         )
+        # Their patients reference the user row on their shard
+        replicate(User, [user.pk], aliases=[user.shard])
         return user
 
 
@@ -97,13 +103,13 @@ class UserLoginSerializer(serializers.Serializer):
                 'User account is disabled.'
             )
         
-        # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        # Generate JWT tokens (signing key prepared once per process)
+        tokens = token_service.issue_pair(user)
         
         # Return serializable data (not the User object!)
         return {
-            'access': str(refresh.access_token),
-            'refresh': str(refresh),
+            'access': tokens['access'],
+            'refresh': tokens['refresh'],
             'user': {
                 'id': user.id,
                 'email': user.email,
@@ -112,7 +118,24 @@ class UserLoginSerializer(serializers.Serializer):
         }
 
 
-class UserSerializer(serializers.ModelSerializer):
+class TokenRefreshSerializer(serializers.Serializer):
+    """
+    Serializer for refresh token rotation.
+    The old refresh token is blacklisted and a new pair is returned.
+    """
+    refresh = serializers.CharField(required=True, write_only=True)
+    
+    def validate(self, attrs):
+        """
+        Rotate the refresh token.
+        """
+        try:
+            return token_service.rotate(attrs['refresh'])
+        except TokenError as e:
+            raise serializers.ValidationError({'refresh': str(e)})
+
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Basic user serializer for displaying user information.
     """
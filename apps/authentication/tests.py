@@ -1,3 +1,227 @@
-from django.test import TestCase
+# apps/authentication/tests.py
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from apps.authentication.tokens import BloomFilter, TokenService, token_service
+from apps.core.testing import TEST_PASSWORD, QueryCountTestCase, bearer, make_user
+
+User = get_user_model()
+
+
+# No time-based flush of buffered tokens in the middle of a measurement
+@override_settings(TOKEN_BLACKLIST_FLUSH_INTERVAL=3600)
+class AuthenticationQueryCountTests(QueryCountTestCase):
+    """
+    Registration and login run the same number of queries
+    whether there are 1, 100 or 1,000 users.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+
+    def tearDown(self):
+        # Don't leak buffered OutstandingToken rows into other tests
+        token_service._pending_outstanding.clear()
+
+    def grow_users(self, size):
+        missing = size - User.objects.count()
+        if missing > 0:
+            start = User.objects.count()
+            password = make_password(TEST_PASSWORD)
+            User.objects.bulk_create([
+                User(
+                    username=f'user{start + i}@example.com',
+                    email=f'user{start + i}@example.com',
+                    name=f'User {start + i}',
+                    password=password,
+                )
+                for i in range(missing)
+            ])
+
+    def test_register(self):
+        self.assertConstantQueries(
+            self.grow_users,
+            lambda n: self.client.post(
+                '/api/auth/register/',
+                {
+                    'name': f'New User {n}',
+                    'email': f'new{n}@example.com',
+                    'password': TEST_PASSWORD,
+                    'password2': TEST_PASSWORD,
+                },
+                format='json'
+            )
+        )
+
+    def test_login(self):
+        self.assertConstantQueries(
+            self.grow_users,
+            lambda n: self.client.post(
+                '/api/auth/login/',
+                {'email': self.user.email, 'password': TEST_PASSWORD},
+                format='json'
+            )
+        )
+
+
+class BloomFilterTests(SimpleTestCase):
+    """
+    No false negatives; false positives near the configured rate.
+    """
+
+    def test_members(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        values = [f'jti-{i}' for i in range(1000)]
+        for value in values:
+            bloom.add(value)
+
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(
+    TOKEN_BLACKLIST_FLUSH_INTERVAL=3600,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class TokenServiceTests(QueryCountTestCase):
+    """
+    Refresh tokens rotate once, across processes; new OutstandingToken
+    rows are batched.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+
+    def tearDown(self):
+        token_service._pending_outstanding.clear()
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': token}, format='json')
+
+    def test_refresh_rotates(self):
+        login = self.client.post(
+            '/api/auth/login/',
+            {'email': self.user.email, 'password': TEST_PASSWORD},
+            format='json'
+        )
+        old = login.data['refresh']
+
+        response = self.refresh(old)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['refresh'], old)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+
+        # The old token is used up
+        response = self.refresh(old)
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(BlacklistedToken.objects.filter(token__token=old).exists())
+
+    def test_reuse_across_processes(self):
+        first, second = TokenService(), TokenService()
+        refresh = first.issue_pair(self.user)['refresh']
+
+        first.rotate(refresh)
+
+        # `second` hasn't synced its bloom filter; the database decides
+        with self.assertRaises(TokenError):
+            second.rotate(refresh)
+
+    def test_inactive_user(self):
+        refresh = token_service.issue_pair(self.user)['refresh']
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        with self.assertRaises(TokenError):
+            token_service.rotate(refresh)
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_deleted_user(self):
+        refresh = token_service.issue_pair(self.user)['refresh']
+        self.user.delete()
+
+        with self.assertRaises(TokenError):
+            token_service.rotate(refresh)
+
+    def test_flush(self):
+        service = TokenService()
+        service.issue_pair(self.user)
+        self.assertFalse(OutstandingToken.objects.exists())
+
+        self.assertEqual(service.flush(), 1)
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+
+        with override_settings(TOKEN_BLACKLIST_BATCH_SIZE=2):
+            service.issue_pair(self.user)
+            service.issue_pair(self.user)
+        self.assertEqual(OutstandingToken.objects.count(), 3)
+
+    @override_settings(TOKEN_BLACKLIST_SYNC_INTERVAL=0)
+    def test_sync(self):
+        first, second = TokenService(), TokenService()
+        refresh = first.issue_pair(self.user)['refresh']
+        first.rotate(refresh)
+        jti = OutstandingToken.objects.get(token=refresh).jti
+
+        self.assertTrue(second.is_blacklisted(jti))
+        self.assertIn(jti, second._get_bloom())
+
+    @override_settings(TOKEN_BLACKLIST_SYNC_INTERVAL=0, TOKEN_BLOOM_CAPACITY=1)
+    def test_bloom_rebuild(self):
+        service = TokenService()
+        expired, live = [service.issue_pair(self.user)['refresh'] for _ in range(2)]
+        service.rotate(expired)
+        service.rotate(live)
+        OutstandingToken.objects.filter(token=expired).update(expires_at=timezone.now() - timedelta(days=1))
+        full = service._get_bloom()
+        self.assertGreater(full.count, full.capacity)
+
+        jti = OutstandingToken.objects.get(token=live).jti
+        self.assertTrue(service.is_blacklisted(jti))
+
+        # Rebuilt with only the unexpired entry
+        bloom = service._get_bloom()
+        self.assertIsNot(bloom, full)
+        self.assertEqual(bloom.count, 1)
+        self.assertIn(jti, bloom)
+
+
+class AsyncJwtRequiredTests(QueryCountTestCase):
+    """
+    async_jwt_required answers 401 unless a valid access token of an
+    active user is sent.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.refresh = str(RefreshToken.for_user(self.user))
+
+    async def get(self, authorization=None):
+        headers = {'Authorization': authorization} if authorization else {}
+        return await self.async_client.get('/api/async/doctors/', headers=headers)
+
+    async def test_valid_token(self):
+        response = await self.get(bearer(self.user))
+        self.assertEqual(response.status_code, 200)
+
+    async def test_missing_or_bad_token(self):
+        self.assertEqual((await self.get()).status_code, 401)
+        self.assertEqual((await self.get('Bearer not-a-token')).status_code, 401)
+        self.assertEqual((await self.get(f'Bearer {self.refresh}')).status_code, 401)
+
+    async def test_expired_token(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(from_time=timezone.now() - timedelta(days=1))
+        self.assertEqual((await self.get(f'Bearer {token}')).status_code, 401)
+
+    async def test_inactive_user(self):
+        authorization = bearer(self.user)
+        await User.objects.filter(pk=self.user.pk).aupdate(is_active=False)
+        self.assertEqual((await self.get(authorization)).status_code, 401)
 
-# Create your tests here.
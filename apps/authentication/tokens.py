@@ -0,0 +1,447 @@
+# apps/authentication/tokens.py
+
+import atexit
+import base64
+import hashlib
+import hmac
+import json
+import math
+import threading
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.state import token_backend
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.utils import datetime_from_epoch, datetime_to_epoch
+from apps.core.metrics import record_cache
+
+"""
+Token service for issuing and rotating JWT pairs.
+
+Why not RefreshToken.for_user()?
+- It re-serializes the JWT header and re-keys HMAC for every token
+- With the blacklist app installed it INSERTs one OutstandingToken per login
+- Blacklist checks run one query per refresh
+
+This module keeps the key material prepared once per process, buffers
+OutstandingToken writes for new tokens and flushes them in batches, and
+answers "is this jti blacklisted?" from an in-memory bloom filter.
+Once more ids than TOKEN_BLOOM_CAPACITY have been added, the filter is
+rebuilt from the unexpired blacklist entries (expired tokens fail their
+signature check before the blacklist is consulted).
+
+Rotation is not buffered: the old token is claimed with a single
+INSERT ... ON CONFLICT DO NOTHING into the blacklist, so a refresh token
+can be used once across all processes, whatever the traffic.
+"""
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter for blacklisted token ids.
+
+    A negative answer is definitive; a positive answer must be confirmed
+    against the database (false positive rate is `error_rate` for up to
+    `capacity` values, and climbs beyond that).
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.count = 0  # values added (repeats included)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        self.count += 1
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class TokenService:
+    """
+    Issues access/refresh pairs and rotates refresh tokens.
+
+    One instance per process (see `token_service` below). All public
+    methods are thread-safe.
+    """
+
+    _HMAC_ALGORITHMS = {
+        'HS256': hashlib.sha256,
+        'HS384': hashlib.sha384,
+        'HS512': hashlib.sha512,
+    }
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._signer = None
+        self._header_segment = None
+
+        # Pending writes, flushed together
+        self._pending_outstanding = {}  # jti -> OutstandingToken (unsaved)
+        self._last_flush = time.monotonic()
+
+        # Blacklist lookups
+        self._bloom = None
+        self._bloom_high_water = 0  # highest BlacklistedToken.id loaded
+        self._last_sync = 0.0
+
+    # ------------------------------------------------------------------
+    # Configuration
+    # ------------------------------------------------------------------
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'TOKEN_BLACKLIST_BATCH_SIZE', 100)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'TOKEN_BLACKLIST_FLUSH_INTERVAL', 2.0)
+
+    @property
+    def sync_interval(self):
+        return getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 5.0)
+
+    @property
+    def bloom_capacity(self):
+        return getattr(settings, 'TOKEN_BLOOM_CAPACITY', 100000)
+
+    @property
+    def bloom_error_rate(self):
+        return getattr(settings, 'TOKEN_BLOOM_ERROR_RATE', 0.001)
+
+    # ------------------------------------------------------------------
+    # Signing
+    # ------------------------------------------------------------------
+
+    def _prepare_signer(self):
+        """
+        Prepare the JWT header segment and a keyed HMAC once.
+        Each token then only costs an HMAC copy() plus the payload digest.
+        """
+        digestmod = self._HMAC_ALGORITHMS.get(token_backend.algorithm)
+        if digestmod is None or token_backend.audience or token_backend.issuer:
+            # Asymmetric algorithms (or aud/iss claims): defer to simplejwt
+            self._signer = False
+            return
+
+        header = json.dumps(
+            {'alg': token_backend.algorithm, 'typ': 'JWT'},
+            separators=(',', ':'),
+            sort_keys=True,
+        ).encode()
+        self._header_segment = _b64(header)
+        key = token_backend.signing_key
+        if isinstance(key, str):
+            key = key.encode()
+        self._signer = hmac.new(key, digestmod=digestmod)
+
+    def encode(self, payload):
+        """
+        Sign a payload and return the compact JWT string.
+        """
+        if self._signer is None:
+            with self._lock:
+                if self._signer is None:
+                    self._prepare_signer()
+
+        if self._signer is False:
+            return token_backend.encode(payload)
+
+        payload_segment = _b64(
+            json.dumps(payload, separators=(',', ':'), cls=token_backend.json_encoder).encode()
+        )
+        signing_input = self._header_segment + b'.' + payload_segment
+        signer = self._signer.copy()
+        signer.update(signing_input)
+        return (signing_input + b'.' + _b64(signer.digest())).decode()
+
+    # ------------------------------------------------------------------
+    # Issuing
+    # ------------------------------------------------------------------
+
+    def _build_payloads(self, user_id, now):
+        iat = datetime_to_epoch(now)
+        refresh = {
+            api_settings.TOKEN_TYPE_CLAIM: 'refresh',
+            'exp': datetime_to_epoch(now + api_settings.REFRESH_TOKEN_LIFETIME),
+            'iat': iat,
+            api_settings.JTI_CLAIM: uuid4().hex,
+            api_settings.USER_ID_CLAIM: user_id,
+        }
+        access = {
+            api_settings.TOKEN_TYPE_CLAIM: 'access',
+            'exp': datetime_to_epoch(now + api_settings.ACCESS_TOKEN_LIFETIME),
+            'iat': iat,
+            api_settings.JTI_CLAIM: uuid4().hex,
+            api_settings.USER_ID_CLAIM: user_id,
+        }
+        return access, refresh
+
+    def issue_pair(self, user):
+        """
+        Issue a new access/refresh pair for an authenticated user.
+
+        Returns a dict with 'access' and 'refresh' token strings.
+        """
+        now = timezone.now()
+        user_id = str(getattr(user, api_settings.USER_ID_FIELD))
+        access, refresh = self._build_payloads(user_id, now)
+
+        refresh_token = self.encode(refresh)
+        self._queue_outstanding(user.pk, refresh, refresh_token, now)
+
+        return {
+            'access': self.encode(access),
+            'refresh': refresh_token,
+        }
+
+    def rotate(self, raw_refresh):
+        """
+        Exchange a refresh token for a new pair.
+
+        The old refresh token is blacklisted in the database before the new
+        pair is returned. Raises TokenError if the token is invalid, expired
+        or already used, or if its user is deleted or inactive.
+        """
+        # Signature and 'exp' are checked by the backend; the blacklist check
+        # is ours (simplejwt's verify() would run a query per refresh)
+        try:
+            payload = token_backend.decode(raw_refresh, verify=True)
+        except TokenBackendError:
+            raise TokenError('Token is invalid or expired')
+
+        if payload.get(api_settings.TOKEN_TYPE_CLAIM) != 'refresh':
+            raise TokenError('Token has wrong type')
+
+        jti = payload.get(api_settings.JTI_CLAIM)
+        if not jti:
+            raise TokenError('Token has no id')
+        # Known reuse is rejected without writing anything
+        if self.is_blacklisted(jti):
+            raise TokenError('Token is blacklisted')
+
+        # Same rule as simplejwt's TokenRefreshSerializer
+        user_id = payload.get(api_settings.USER_ID_CLAIM)
+        user = get_user_model()._default_manager.filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise TokenError('No active account found for the given token')
+
+        self._claim(jti, user.pk, raw_refresh, payload)
+
+        now = timezone.now()
+        access, refresh = self._build_payloads(user_id, now)
+        refresh_token = self.encode(refresh)
+        self._queue_outstanding(user.pk, refresh, refresh_token, now)
+
+        return {
+            'access': self.encode(access),
+            'refresh': refresh_token,
+        }
+
+    def _claim(self, jti, user_pk, raw_refresh, payload):
+        """
+        Blacklist `jti`, or raise TokenError if it already is.
+
+        The OutstandingToken row may still be buffered (here or in another
+        process), so it is written first, ignoring a duplicate. The
+        blacklist INSERT then either creates the row or conflicts with an
+        earlier rotation; its row count decides, atomically in the database.
+        """
+        with self._lock:
+            outstanding = self._pending_outstanding.pop(jti, None)
+        if outstanding is None:
+            # Refresh token issued by another process (or before a restart)
+            outstanding = OutstandingToken(
+                user_id=user_pk,
+                jti=jti,
+                token=raw_refresh,
+                created_at=datetime_from_epoch(payload['iat']) if 'iat' in payload else None,
+                expires_at=datetime_from_epoch(payload['exp']),
+            )
+        OutstandingToken.objects.bulk_create([outstanding], ignore_conflicts=True)
+
+        blacklist = connection.ops.quote_name(BlacklistedToken._meta.db_table)
+        tokens = connection.ops.quote_name(OutstandingToken._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {blacklist} (token_id, blacklisted_at) '
+                f'SELECT id, %s FROM {tokens} WHERE jti = %s '
+                f'ON CONFLICT DO NOTHING',
+                [connection.ops.adapt_datetimefield_value(timezone.now()), jti]
+            )
+            claimed = cursor.rowcount == 1
+
+        with self._lock:
+            self._get_bloom().add(jti)
+        if not claimed:
+            raise TokenError('Token is blacklisted')
+
+    def _queue_outstanding(self, user_pk, payload, raw_token, now):
+        jti = payload[api_settings.JTI_CLAIM]
+        with self._lock:
+            self._pending_outstanding[jti] = OutstandingToken(
+                user_id=user_pk,
+                jti=jti,
+                token=raw_token,
+                created_at=now,
+                expires_at=datetime_from_epoch(payload['exp']),
+            )
+        self._maybe_flush()
+
+    # ------------------------------------------------------------------
+    # Blacklist
+    # ------------------------------------------------------------------
+
+    def _get_bloom(self):
+        if self._bloom is None:
+            self._bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+        return self._bloom
+
+    def _rebuild_bloom(self, now):
+        """
+        Replace the bloom filter with one holding only unexpired entries.
+
+        Ids claimed by this process while the rows are read are not lost:
+        their rows come after the new high-water mark and are loaded by
+        the next sync.
+        """
+        rows = list(
+            BlacklistedToken.objects.filter(
+                token__expires_at__gt=timezone.now(),
+            ).values_list('id', 'token__jti').order_by('id')
+        )
+        # Leave room to grow if the live entries alone fill the capacity
+        bloom = BloomFilter(max(self.bloom_capacity, 2 * len(rows)), self.bloom_error_rate)
+        for row_id, jti in rows:
+            bloom.add(jti)
+
+        with self._lock:
+            self._bloom = bloom
+            if rows:
+                self._bloom_high_water = rows[-1][0]
+            self._last_sync = now
+
+    def _sync_bloom(self):
+        """
+        Load blacklist entries written since the last sync (by this or any
+        other process). Only unexpired tokens are relevant.
+        """
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_interval:
+            return
+
+        with self._lock:
+            bloom = self._get_bloom()
+            full = bloom.count > bloom.capacity
+        if full:
+            self._rebuild_bloom(now)
+            return
+
+        rows = BlacklistedToken.objects.filter(
+            id__gt=self._bloom_high_water,
+            token__expires_at__gt=timezone.now(),
+        ).values_list('id', 'token__jti').order_by('id')
+
+        with self._lock:
+            bloom = self._get_bloom()
+            for row_id, jti in rows.iterator(chunk_size=5000):
+                bloom.add(jti)
+                self._bloom_high_water = max(self._bloom_high_water, row_id)
+            self._last_sync = now
+
+    def is_blacklisted(self, jti):
+        """
+        Check whether a refresh token id has been blacklisted.
+
+        The bloom filter answers most lookups without touching the database;
+        only probable hits are confirmed with a query.
+        """
+        self._sync_bloom()
+
+        with self._lock:
+            if jti not in self._get_bloom():
+                record_cache('token_blacklist_bloom', hit=True)
+                return False
+
+        record_cache('token_blacklist_bloom', hit=False)
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    def _maybe_flush(self):
+        with self._lock:
+            pending = len(self._pending_outstanding)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if pending >= self.batch_size or (pending and due):
+            self.flush()
+
+    def flush(self):
+        """
+        Write all buffered OutstandingToken rows. Returns the number of
+        rows written.
+        """
+        with self._lock:
+            outstanding = list(self._pending_outstanding.values())
+            self._pending_outstanding = {}
+            self._last_flush = time.monotonic()
+
+        if not outstanding:
+            return 0
+
+        try:
+            OutstandingToken.objects.bulk_create(
+                outstanding,
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+        except Exception:
+            # Put everything back so the next flush retries
+            with self._lock:
+                for token in outstanding:
+                    self._pending_outstanding.setdefault(token.jti, token)
+            raise
+
+        return len(outstanding)
+
+
+# Shared per-process instance
+token_service = TokenService()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        token_service.flush()
+    except Exception:
+        pass
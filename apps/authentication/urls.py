@@ -1,7 +1,7 @@
 # apps/authentication/urls.py
 
 from django.urls import path
-from .views import UserRegistrationView, UserLoginView
+from .views import UserRegistrationView, UserLoginView, TokenRefreshView
 
 """
 Authentication URL patterns.
@@ -16,4 +16,8 @@ urlpatterns = [
     # User Login
     # POST /api/auth/login/
     path('login/', UserLoginView.as_view(), name='user-login'),
+    
+    # Token Refresh (rotates and blacklists the old refresh token)
+    # POST /api/auth/token/refresh/
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
 ]
\ No newline at end of file
@@ -4,7 +4,11 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from .serializers import UserRegistrationSerializer, UserLoginSerializer
+from .serializers import (
+    UserRegistrationSerializer,
+    UserLoginSerializer,
+    TokenRefreshSerializer
+)
 
 class UserRegistrationView(APIView):
     """
@@ -15,6 +19,9 @@ class UserRegistrationView(APIView):
     This endpoint is public (no authentication required).
     """
     permission_classes = [AllowAny]  # Anyone can register
+    throttle_scope = 'auth'
+    # +2 when the user is placed on a shard other than default (copy of the user row)
+    query_budget = 4
     
     def post(self, request):
         """
@@ -65,6 +72,9 @@ class UserLoginView(APIView):
     Returns JWT access and refresh tokens.
     """
     permission_classes = [AllowAny]
+    throttle_scope = 'auth'
+    # 1 user lookup + headroom for the token service's periodic batched flush
+    query_budget = 5
     
     def post(self, request):
         """
@@ -92,4 +102,48 @@ class UserLoginView(APIView):
                 'details': serializer.errors
             },
             status=status.HTTP_401_UNAUTHORIZED
+        )
+
+
+class TokenRefreshView(APIView):
+    """
+    API endpoint for refreshing JWT tokens.
+    
+    POST /api/auth/token/refresh/
+    
+    Rotates the refresh token: the old one is blacklisted and
+    a new access/refresh pair is returned.
+    """
+    permission_classes = [AllowAny]
+    throttle_scope = 'auth'
+    
+    def post(self, request):
+        """
+        Exchange a refresh token for a new token pair.
+        
+        Request body:
+        {
+            "refresh": "<refresh_token>"
+        }
+        """
+        serializer = TokenRefreshSerializer(data=request.data)
+        
+        if serializer.is_valid():
+            data = serializer.validated_data
+            
+            return Response(
+                {
+                    'message': 'Token refreshed successfully',
+                    'access': data['access'],
+                    'refresh': data['refresh'],
+                },
+                status=status.HTTP_200_OK
+            )
+        
+        return Response(
+            {
+                'error': 'Token refresh failed',
+                'details': serializer.errors
+            },
+            status=status.HTTP_401_UNAUTHORIZED
         )
\ No newline at end of file
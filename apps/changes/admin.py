@@ -0,0 +1,13 @@
+# apps/changes/admin.py
+
+from django.contrib import admin
+from apps.core.admin import LargeTableAdminMixin
+from .models import ChangeEvent
+
+@admin.register(ChangeEvent)
+class ChangeEventAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Admin interface for the change feed outbox"""
+    list_display = ['id', 'entity', 'object_id', 'action', 'owner_id', 'created_at']
+    list_filter = ['entity', 'action']
+    search_fields = ['object_id']
+    readonly_fields = ['entity', 'object_id', 'action', 'owner_id', 'data', 'created_at']
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('patient', 'Patient'), ('doctor', 'Doctor'), ('mapping', 'Mapping')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10)),
+                ('owner_id', models.BigIntegerField(blank=True, null=True)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Change Event',
+                'verbose_name_plural': 'Change Events',
+                'db_table': 'change_events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['owner_id', 'id'], name='change_even_owner_i_5ec20a_idx'), models.Index(fields=['entity', 'object_id'], name='change_even_entity_4eec93_idx')],
+            },
+        ),
+    ]
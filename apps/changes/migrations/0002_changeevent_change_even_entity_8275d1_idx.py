@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('changes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='changeevent',
+            index=models.Index(fields=['entity', 'action', 'created_at'], name='change_even_entity_8275d1_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# apps/changes/models.py
+
+from django.db import models
+
+class ChangeEvent(models.Model):
+    """
+    Outbox row: one create, update or delete of a patient, doctor or
+    mapping.
+    
+    Why an outbox table?
+    - Rows are written in the same transaction as the change itself, so
+      the feed never shows a change that was rolled back and never
+      misses one that was committed
+    - Consumers read /api/changes/?since=<cursor> instead of re-listing
+      whole tables to find what changed
+    
+    The auto-increment id is the feed cursor.
+    """
+    
+    ENTITY_PATIENT = 'patient'
+    ENTITY_DOCTOR = 'doctor'
+    ENTITY_MAPPING = 'mapping'
+    ENTITY_CHOICES = [
+        (ENTITY_PATIENT, 'Patient'),
+        (ENTITY_DOCTOR, 'Doctor'),
+        (ENTITY_MAPPING, 'Mapping'),
+    ]
+    
+    ACTION_CREATED = 'created'
+    ACTION_UPDATED = 'updated'
+    ACTION_DELETED = 'deleted'
+    ACTION_CHOICES = [
+        (ACTION_CREATED, 'Created'),
+        (ACTION_UPDATED, 'Updated'),
+        (ACTION_DELETED, 'Deleted'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=10, choices=ENTITY_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    
+    # User who can see this event; NULL for shared records (doctors).
+    # Plain id, not a ForeignKey: events outlive the rows they describe.
+    owner_id = models.BigIntegerField(null=True, blank=True)
+    
+    # Representation after the change (None for deletes)
+    data = models.JSONField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'change_events'
+        verbose_name = 'Change Event'
+        verbose_name_plural = 'Change Events'
+        ordering = ['id']
+        indexes = [
+            # Feed query: (owner_id = ? OR owner_id IS NULL) AND id > ?
+            models.Index(fields=['owner_id', 'id']),
+            models.Index(fields=['entity', 'object_id']),
+            # Tombstones for ?modified_since= (apps/changes/sync.py)
+            models.Index(fields=['entity', 'action', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.pk} {self.entity}:{self.object_id} {self.action}"
@@ -0,0 +1,61 @@
+# apps/changes/outbox.py
+
+from .models import ChangeEvent
+
+"""
+Writing change events.
+
+Call these inside the same transaction.atomic() block as the write they
+describe:
+
+    with transaction.atomic():
+        patient = serializer.save(created_by=request.user)
+        record_change('patient', patient.pk, 'created', owner_id=request.user.pk, data=serializer.data)
+
+If the transaction rolls back, the event goes with it.
+"""
+
+def record_change(entity, object_id, action, owner_id=None, data=None):
+    """
+    Append one event to the outbox.
+    """
+    return ChangeEvent.objects.create(
+        entity=entity,
+        object_id=object_id,
+        action=action,
+        owner_id=owner_id,
+        data=data
+    )
+
+
+def record_changes(entity, object_ids, action, owner_id=None, data=None):
+    """
+    Append one event per id with a single INSERT (bulk writes).
+    `data`, if given, maps each id to its representation.
+    """
+    return ChangeEvent.objects.bulk_create([
+        ChangeEvent(
+            entity=entity,
+            object_id=object_id,
+            action=action,
+            owner_id=owner_id,
+            data=data[object_id] if data is not None else None
+        )
+        for object_id in object_ids
+    ])
+
+
+def deletion_recorder(entity, owner_field=None):
+    """
+    Callback for apps.core.deletion (on_delete=...) that records the
+    deletion of the instance it is given. It runs in the same
+    transaction as the DELETE.
+    """
+    def record(instance):
+        record_change(
+            entity,
+            instance.pk,
+            ChangeEvent.ACTION_DELETED,
+            owner_id=getattr(instance, owner_field) if owner_field else None
+        )
+    return record
@@ -0,0 +1,21 @@
+# apps/changes/serializers.py
+
+from rest_framework import serializers
+from .models import ChangeEvent
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    """
+    One entry of the change feed.
+    """
+    cursor = serializers.CharField(source='id', read_only=True)
+    
+    class Meta:
+        model = ChangeEvent
+        fields = [
+            'cursor',
+            'entity',
+            'object_id',
+            'action',
+            'data',
+            'created_at'
+        ]
@@ -0,0 +1,77 @@
+# apps/changes/sync.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from .models import ChangeEvent
+
+"""
+Incremental sync for list endpoints (?modified_since=).
+
+A client stores next_modified_since from a list response and sends it
+back as ?modified_since= on the next launch. It then gets only rows
+whose updated_at is at or after that time, plus the ids of rows deleted
+since then (tombstones, read from the change_events outbox).
+
+The watermark handed out is SYNC_WATERMARK_LAG seconds behind the
+server clock. updated_at is set when a row is saved, but the row only
+becomes visible at COMMIT; the lag covers transactions still in flight,
+at the cost of re-sending a few rows the client already has.
+"""
+
+class IncrementalSyncMixin:
+    """
+    ViewSet mixin adding ?modified_since= to list actions.
+
+    Set on the viewset:
+    - sync_entity: ChangeEvent entity for tombstones, e.g. 'patient'
+    - sync_owned: True if tombstones are scoped to request.user
+    """
+    sync_entity = None
+    sync_owned = False
+
+    def get_modified_since(self):
+        """
+        Parse ?modified_since= (ISO 8601). Returns None when absent,
+        raises ValidationError when malformed.
+        """
+        value = self.request.query_params.get('modified_since')
+        if not value:
+            return None
+        # '+' in a query string decodes to a space
+        parsed = parse_datetime(value.replace(' ', '+'))
+        if parsed is None:
+            raise serializers.ValidationError({
+                'modified_since': ['Expected an ISO 8601 datetime, e.g. 2025-10-05T14:04:00Z.']
+            })
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, timezone.get_default_timezone())
+        return parsed
+
+    def next_watermark(self):
+        """
+        Value for the client's next ?modified_since=. Take it before
+        running the list query.
+        """
+        return timezone.now() - timedelta(seconds=settings.SYNC_WATERMARK_LAG)
+
+    def filter_modified_since(self, queryset, since):
+        if since is None:
+            return queryset
+        return queryset.filter(updated_at__gte=since)
+
+    def get_tombstones(self, since):
+        """
+        Ids deleted at or after `since`.
+        """
+        events = ChangeEvent.objects.filter(
+            entity=self.sync_entity,
+            action=ChangeEvent.ACTION_DELETED,
+            created_at__gte=since
+        )
+        if self.sync_owned:
+            events = events.filter(owner_id=self.request.user.pk)
+        return list(events.order_by('object_id').values_list('object_id', flat=True).distinct())
@@ -0,0 +1,113 @@
+# apps/changes/tests.py
+
+from django.test import override_settings
+
+from apps.core.testing import QueryCountTestCase, make_doctors, make_patients, make_user
+from .models import ChangeEvent
+
+
+@override_settings(CHANGES_FEED_DELAY=0)
+class ChangeFeedTests(QueryCountTestCase):
+    """
+    Writes through the viewsets append to the outbox, and the feed
+    returns them incrementally.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+
+    def feed(self, **params):
+        response = self.client.get('/api/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_patient_lifecycle(self):
+        response = self.client.post('/api/patients/', {
+            'name': 'Alice',
+            'email': 'alice@example.com',
+            'phone_number': '+1234567890',
+            'blood_group': 'A+',
+        }, format='json')
+        patient_id = response.data['patient']['id']
+        self.client.patch(f'/api/patients/{patient_id}/', {'name': 'Alice B'}, format='json')
+        self.client.delete(f'/api/patients/{patient_id}/')
+
+        data = self.feed()
+        self.assertEqual(
+            [(c['entity'], c['object_id'], c['action']) for c in data['changes']],
+            [
+                ('patient', patient_id, 'created'),
+                ('patient', patient_id, 'updated'),
+                ('patient', patient_id, 'deleted'),
+            ]
+        )
+        self.assertEqual(data['changes'][1]['data']['name'], 'Alice B')
+        self.assertIsNone(data['changes'][2]['data'])
+        self.assertFalse(data['has_more'])
+
+    @override_settings(UNIQUE_VALIDATION_MODE='constraint')
+    def test_failed_write_records_nothing(self):
+        # The duplicate is only caught by the INSERT, inside the transaction
+        patient = make_patients(self.user, 1)[0]
+        response = self.client.post('/api/patients/', {
+            'name': 'Copy',
+            'email': patient.email,
+            'phone_number': '+1234567890',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ChangeEvent.objects.exists())
+
+    def test_mapping_events(self):
+        patient = make_patients(self.user, 1)[0]
+        doctor = make_doctors(1)[0]
+        response = self.client.post('/api/mappings/', {'patient': patient.id, 'doctor': doctor.id}, format='json')
+        mapping_id = response.data['mapping']['id']
+        self.client.patch(f'/api/mappings/{mapping_id}/', {'notes': 'Follow-up'}, format='json')
+        self.client.delete(f'/api/mappings/{mapping_id}/')
+
+        data = self.feed(entity='mapping')
+        self.assertEqual(
+            [(c['object_id'], c['action']) for c in data['changes']],
+            [(mapping_id, 'created'), (mapping_id, 'updated'), (mapping_id, 'deleted')]
+        )
+        self.assertEqual(data['changes'][1]['data']['notes'], 'Follow-up')
+
+    def test_cursor_pagination(self):
+        for n in range(5):
+            self.client.post('/api/doctors/', {
+                'name': f'Doctor {n}',
+                'email': f'doctor{n}@example.com',
+                'phone_number': '+1234567890',
+                'specialization': 'General Physician',
+                'qualification': 'MBBS',
+                'license_number': f'LIC-{n}',
+                'clinic_address': '1 Test St',
+                'consultation_fee': '100.00',
+            }, format='json')
+
+        first = self.feed(limit=3)
+        self.assertEqual(len(first['changes']), 3)
+        self.assertTrue(first['has_more'])
+
+        second = self.feed(since=first['next_cursor'], limit=3)
+        self.assertEqual(len(second['changes']), 2)
+        self.assertFalse(second['has_more'])
+
+        third = self.feed(since=second['next_cursor'])
+        self.assertEqual(third['changes'], [])
+        self.assertEqual(third['next_cursor'], second['next_cursor'])
+
+    def test_only_own_and_shared_events(self):
+        other = make_user('other@example.com')
+        ChangeEvent.objects.create(entity='patient', object_id=1, action='created', owner_id=other.pk)
+        own = ChangeEvent.objects.create(entity='patient', object_id=2, action='created', owner_id=self.user.pk)
+        shared = ChangeEvent.objects.create(entity='doctor', object_id=1, action='created')
+
+        data = self.feed()
+        self.assertEqual([c['cursor'] for c in data['changes']], [str(own.pk), str(shared.pk)])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/changes/', {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,15 @@
+# apps/changes/urls.py
+
+from django.urls import path
+from .views import ChangeFeedView
+
+"""
+Change feed URL patterns.
+All change feed endpoints are prefixed with /api/changes/
+
+- GET /api/changes/?since=<cursor> -> changes after the cursor
+"""
+
+urlpatterns = [
+    path('', ChangeFeedView.as_view(), name='change-feed'),
+]
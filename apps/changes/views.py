@@ -0,0 +1,90 @@
+# apps/changes/views.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.core.sharding import current_shard, shard_id_range, sharding_enabled
+from apps.core.views import ShardedViewMixin
+from .models import ChangeEvent
+from .serializers import ChangeEventSerializer
+
+class ChangeFeedView(ShardedViewMixin, APIView):
+    """
+    Incremental feed of patient, doctor and mapping changes.
+    GET /api/changes/?since=<cursor>&limit=<n>&entity=<patient|doctor|mapping>
+    
+    Returns events after `since` in commit order, oldest first. Pass the
+    returned next_cursor as `since` on the next call; has_more tells
+    whether to call again right away.
+    
+    Users see events for their own patients and mappings plus all doctor
+    events. Deleting a patient or doctor also removes its mappings; those
+    mapping removals are implied and not listed separately.
+    
+    Events newer than CHANGES_FEED_DELAY seconds are held back. Ids are
+    assigned at INSERT but become visible at COMMIT, so a slow
+    transaction can commit a lower id after a consumer has already read
+    past it; the delay gives such transactions time to finish.
+    
+    With sharding, events live on the user's shard and ids come from the
+    shard's id block. A cursor from another block (the user was moved by
+    rebalance_shards) gets 409: start again from since=0.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    # Max queries (checked by apps.core.middleware.RequestTimingMiddleware),
+    # including the user lookup for the JWT
+    query_budget = 2
+    
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', settings.CHANGES_PAGE_SIZE))
+        except ValueError:
+            return Response(
+                {'error': 'since and limit must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, settings.CHANGES_MAX_PAGE_SIZE))
+        
+        if since and sharding_enabled():
+            first, last = shard_id_range(current_shard())
+            if not first - 1 <= since <= last:
+                return Response(
+                    {
+                        'error': 'Cursor is no longer valid',
+                        'details': 'Your data was moved; sync again from since=0.'
+                    },
+                    status=status.HTTP_409_CONFLICT
+                )
+        
+        queryset = ChangeEvent.objects.filter(
+            Q(owner_id=request.user.pk) | Q(owner_id__isnull=True),
+            id__gt=since
+        )
+        entity = request.query_params.get('entity')
+        if entity:
+            queryset = queryset.filter(entity=entity)
+        if settings.CHANGES_FEED_DELAY:
+            queryset = queryset.filter(
+                created_at__lte=timezone.now() - timedelta(seconds=settings.CHANGES_FEED_DELAY)
+            )
+        
+        # One extra row tells whether there is another page
+        events = list(queryset.order_by('id')[:limit + 1])
+        has_more = len(events) > limit
+        events = events[:limit]
+        
+        return Response(
+            {
+                'changes': ChangeEventSerializer(events, many=True).data,
+                'next_cursor': str(events[-1].id if events else since),
+                'has_more': has_more
+            }
+        )
@@ -0,0 +1,89 @@
+# apps/core/admin.py
+
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections, migrations
+from django.utils.functional import cached_property
+
+"""
+Admin helpers for tables with millions of rows.
+
+- EstimatedCountPaginator replaces the exact COUNT(*) behind the
+  changelist pager with the planner's row estimate once the result is
+  large
+- LargeTableAdminMixin uses that paginator and skips the second,
+  unfiltered COUNT(*) the changelist runs for "N of M selected"
+- trigram_search_indexes() builds the migration that makes the admin's
+  `search_fields` (icontains) use an index on PostgreSQL
+"""
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that only counts exactly up to ADMIN_EXACT_COUNT_LIMIT rows.
+    
+    Why?
+    - COUNT(*) on PostgreSQL reads every matching row; at millions of
+      rows each changelist page spends seconds counting
+    - Past the limit, page numbers only need to be roughly right, so the
+      planner's estimate from EXPLAIN is used instead (no rows are read)
+    
+    Other database backends always count exactly.
+    """
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().count
+        
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        # SELECT COUNT(*) FROM (... LIMIT n): reads at most n + 1 rows
+        exact = queryset.order_by()[:limit + 1].count()
+        if exact <= limit:
+            return exact
+        
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return max(int(plan[0]['Plan']['Plan Rows']), exact)
+
+
+class LargeTableAdminMixin:
+    """
+    ModelAdmin mixin for tables that grow without bound.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+def trigram_search_indexes(table, columns):
+    """
+    Migration operation adding a trigram GIN index on UPPER(column) for
+    each of `columns`, which is what the admin's icontains search
+    (UPPER(col::text) LIKE UPPER('%term%')) can use.
+    
+    Only runs on PostgreSQL, and needs permission to create the pg_trgm
+    extension (or the extension already installed).
+    """
+    def index_name(column):
+        return f'{table}_{column}_trgm'
+    
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        quote = schema_editor.quote_name
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in columns:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {quote(index_name(column))} '
+                f'ON {quote(table)} USING gin (UPPER({quote(column)}::text) gin_trgm_ops)'
+            )
+    
+    def backwards(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for column in columns:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index_name(column))}')
+    
+    return migrations.RunPython(forwards, backwards, elidable=False)
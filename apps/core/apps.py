@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.core'
+    label = 'core'
+
+    def ready(self):
+        # Count and time queries on every connection, including ones
+        # opened in sync_to_async threads for async views
+        from .instrumentation import install_query_recorder
+        install_query_recorder()
@@ -0,0 +1,106 @@
+# apps/core/catalog.py
+
+import hashlib
+import json
+import re
+from functools import lru_cache
+
+from django.urls import URLResolver, get_resolver
+
+"""
+Route catalog for the API root (GET /api/).
+
+The catalog is built from the URL resolver itself, so every route a
+router or urls.py registers (including extra ViewSet actions such as
+mapping-doctors-by-patient) is listed without maintaining a second copy
+by hand. It is built once per URLconf and kept as rendered JSON bytes
+with an ETag.
+"""
+
+# Routes that are not listed: the admin site, DRF's per-router root views
+# and `.json`-style format suffix variants
+SKIPPED_PREFIXES = ('admin/',)
+SKIPPED_NAMES = ('api-root',)
+
+_GROUP = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+_CONVERTER = re.compile(r'<(?:\w+:)?(\w+)>')
+
+
+def route_template(route):
+    """
+    'api/patients/^(?P<pk>[^/.]+)/$' -> '/api/patients/{pk}/'
+    """
+    route = _GROUP.sub(r'{\1}', route)
+    route = _CONVERTER.sub(r'{\1}', route)
+    return '/' + route.replace('^', '').replace('$', '').replace('\\', '')
+
+
+def _methods(callback):
+    # ViewSets: as_view() stores the method -> action mapping
+    actions = getattr(callback, 'actions', None)
+    if actions:
+        return sorted(method.upper() for method in actions if method not in ('head', 'options'))
+    view_class = getattr(callback, 'cls', None)
+    if view_class is None:
+        return None
+    return sorted(
+        method.upper() for method in view_class.http_method_names
+        if method not in ('head', 'options') and hasattr(view_class, method)
+    )
+
+
+def _walk(patterns, prefix=''):
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns, route)
+        else:
+            yield route, pattern
+
+
+def build_catalog(urlconf=None):
+    """
+    {group: {url name: {'path': ..., 'methods': [...]}}}, where group is
+    the first path segment after /api/ (e.g. 'patients').
+    """
+    catalog = {}
+    has_admin = False
+    for route, pattern in _walk(get_resolver(urlconf).url_patterns):
+        if route.startswith(SKIPPED_PREFIXES):
+            has_admin = True
+            continue
+        if pattern.name is None or pattern.name in SKIPPED_NAMES or 'format>' in route:
+            continue
+        
+        path = route_template(route)
+        segments = path.strip('/').split('/')
+        if segments[0] == 'api':
+            segments = segments[1:]
+        group = catalog.setdefault(segments[0], {})
+        if pattern.name in group:
+            continue
+        
+        entry = {'path': path}
+        methods = _methods(pattern.callback)
+        if methods:
+            entry['methods'] = methods
+        group[pattern.name] = entry
+    
+    return catalog, has_admin
+
+
+@lru_cache(maxsize=None)
+def rendered_api_root(urlconf=None):
+    """
+    (body bytes, ETag) for GET /api/, built once per URLconf.
+    """
+    catalog, has_admin = build_catalog(urlconf)
+    data = {
+        'message': 'Welcome to Healthcare Backend API',
+        'version': '1.0',
+        'endpoints': catalog,
+    }
+    if has_admin:
+        data['documentation'] = '/admin/'
+    body = json.dumps(data, separators=(',', ':')).encode()
+    return body, '"%s"' % hashlib.sha256(body).hexdigest()[:32]
@@ -0,0 +1,119 @@
+# apps/core/deletion.py
+
+from django.conf import settings
+from django.db import router, transaction
+
+from apps.core.instrumentation import current_metrics
+
+"""
+Deleting rows with a large CASCADE fan-out.
+
+Django's collector deletes every dependent row in the same transaction
+as the parent. For a doctor with 100k mappings that is one long DELETE
+holding row locks and building a huge transaction. If a delete signal
+receiver is ever added to the dependent model, the collector also stops
+using its fast path and loads every row into memory.
+
+delete_with_dependents() deletes the dependent rows first, in chunks of
+CASCADE_DELETE_CHUNK_SIZE. Each chunk is its own short statement and
+skips the collector. Only then is the parent deleted. If there are more
+than CASCADE_DELETE_BACKGROUND_THRESHOLD dependent rows, the work is
+handed to a background job (apps/jobs) that reports its progress.
+
+The chunked path raises the current request's query budget by the
+queries it adds, so endpoint budgets only need to cover the common
+single-chunk case.
+"""
+
+
+def _delete_ids(queryset, ids):
+    return queryset.model._base_manager.using(queryset.db).filter(pk__in=ids)._raw_delete(queryset.db)
+
+
+def _raise_query_budget(queries):
+    metrics = current_metrics()
+    if metrics is not None and metrics.query_budget is not None:
+        metrics.query_budget += queries
+
+
+def _delete_parent(instance, on_delete=None):
+    """
+    Delete `instance`; `on_delete(instance)` runs in the same transaction.
+    """
+    if on_delete is None:
+        instance.delete()
+        return
+    with transaction.atomic(using=router.db_for_write(type(instance))):
+        on_delete(instance)
+        instance.delete()
+
+
+def delete_in_chunks(queryset, chunk_size=None, on_progress=None):
+    """
+    Delete every row of `queryset` in chunks, without the collector.
+
+    Only for models with no dependent rows or delete signals (the
+    collector would normally handle those). Returns the number of rows
+    deleted.
+    """
+    chunk_size = chunk_size or settings.CASCADE_DELETE_CHUNK_SIZE
+    deleted = 0
+
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            break
+        deleted += _delete_ids(queryset, ids)
+        if on_progress is not None:
+            on_progress(deleted)
+        if len(ids) < chunk_size:
+            break
+
+    return deleted
+
+
+def delete_with_dependents(instance, dependents, background_job, owner=None, on_delete=None):
+    """
+    Delete `dependents` (a queryset) in chunks, then delete `instance`.
+    `on_delete(instance)`, if given, runs in the same transaction as the
+    final DELETE of `instance`.
+
+    Returns None if everything was deleted before returning. Otherwise
+    the registered job `background_job` was enqueued with
+    pk=instance.pk, and the Job is returned.
+    """
+    from apps.jobs.registry import enqueue
+
+    chunk_size = settings.CASCADE_DELETE_CHUNK_SIZE
+
+    # Common case: fewer rows than one chunk. The collector's fast path
+    # deletes them with a single DELETE, no need to chunk or COUNT.
+    if not dependents.order_by()[chunk_size - 1:chunk_size].exists():
+        _delete_parent(instance, on_delete)
+        return None
+
+    total = dependents.count()
+    if total <= settings.CASCADE_DELETE_BACKGROUND_THRESHOLD:
+        # COUNT, a SELECT and a DELETE per chunk, and at most one final
+        # empty SELECT
+        _raise_query_budget(1 + 2 * -(-total // chunk_size) + 1)
+        delete_in_chunks(dependents, chunk_size)
+        _delete_parent(instance, on_delete)
+        return None
+
+    job = enqueue(background_job, pk=instance.pk, created_by=owner)
+    job.set_progress(deleted=0, total=total)
+    return job
+
+
+def run_chunked_delete(job, instance, dependents, on_delete=None):
+    """
+    Body of a background deletion job: delete in chunks, reporting
+    progress on `job`, then delete `instance`.
+    """
+    deleted = delete_in_chunks(
+        dependents,
+        on_progress=lambda count: job.set_progress(deleted=count)
+    )
+    _delete_parent(instance, on_delete)
+    return {'deleted': deleted}
@@ -0,0 +1,146 @@
+# apps/core/instrumentation.py
+
+import contextvars
+import time
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+"""
+Per-request performance counters.
+
+A RequestMetrics object is bound to the current request through a
+context variable (so it follows the request into sync_to_async threads)
+and filled in by:
+- a database execute wrapper installed on every connection (queries, DB time)
+- TimedSerializerMixin (serialization time)
+- RequestTimingMiddleware (render and total time)
+"""
+
+_current_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised (when QUERY_BUDGET_ENFORCE is on) if an endpoint runs more
+    queries than its declared budget. Subclasses AssertionError so it
+    reads as a test failure.
+    """
+
+
+class RequestMetrics:
+    """
+    Counters collected for a single request.
+    """
+
+    __slots__ = (
+        'query_count',
+        'db_time',
+        'serialize_time',
+        'render_time',
+        'total_time',
+        'route',
+        'action',
+        'query_budget',
+        '_serialize_depth',
+        '_render_started',
+    )
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.total_time = 0.0
+        self.route = None
+        self.action = None
+        self.query_budget = None
+        self._serialize_depth = 0
+        self._render_started = None
+
+    def as_dict(self):
+        return {
+            'route': self.route,
+            'action': self.action,
+            'queries': self.query_count,
+            'db_ms': round(self.db_time * 1000, 3),
+            'serialize_ms': round(self.serialize_time * 1000, 3),
+            'render_ms': round(self.render_time * 1000, 3),
+            'total_ms': round(self.total_time * 1000, 3),
+        }
+
+    def server_timing(self):
+        """
+        Value for the Server-Timing response header.
+        """
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.query_count} queries"',
+            f'serialize;dur={self.serialize_time * 1000:.2f}',
+            f'render;dur={self.render_time * 1000:.2f}',
+            f'total;dur={self.total_time * 1000:.2f}',
+        ])
+
+
+def current_metrics():
+    """
+    Return the RequestMetrics for the request being handled, if any.
+    """
+    return _current_metrics.get()
+
+
+def bind_metrics(metrics):
+    return _current_metrics.set(metrics)
+
+
+def unbind_metrics(token):
+    _current_metrics.reset(token)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.query_count += 1
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install_query_recorder():
+    """
+    Attach the query recorder to all current and future connections.
+    """
+    connection_created.connect(_on_connection_created, dispatch_uid='core.record_query')
+    for connection in connections.all(initialized_only=True):
+        _on_connection_created(None, connection)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin that adds time spent in to_representation() to the
+    current request's serialization time.
+
+    Nested serializers (and the children of a many=True list) are only
+    counted once, at the outermost level.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current_metrics.get()
+        if metrics is None or metrics._serialize_depth:
+            return super().to_representation(instance)
+
+        metrics._serialize_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialize_time += time.perf_counter() - started
+            metrics._serialize_depth -= 1
@@ -0,0 +1,115 @@
+# apps/core/management/commands/rebalance_shards.py
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count
+
+from apps.core.rebalance import move_user, plan_moves, prepare_shards, shard_usage, sync_shared
+from apps.core.sharding import shard_aliases, sharding_enabled
+from apps.patients.models import Patient
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Inspect and rebalance owner shards (SHARD_DATABASES). Without options, '
+        'print users and patients per shard.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prepare',
+            action='store_true',
+            help='Set each shard\'s id block and copy users and doctors (run after migrating a new shard)'
+        )
+        parser.add_argument(
+            '--sync-shared',
+            action='store_true',
+            help='Copy users and doctors from default to the other shards again'
+        )
+        parser.add_argument(
+            '--move',
+            metavar='EMAIL',
+            default=None,
+            help='Move this user\'s data to the shard given by --to'
+        )
+        parser.add_argument(
+            '--to',
+            metavar='ALIAS',
+            default=None,
+            help='Target shard for --move'
+        )
+        parser.add_argument(
+            '--auto',
+            action='store_true',
+            help='Plan moves that even out patients per shard (add --apply to run them)'
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Run the moves planned by --auto'
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=None,
+            help='Seconds to wait after locking a user (default: SHARD_MOVE_GRACE)'
+        )
+
+    def handle(self, *args, **options):
+        if not sharding_enabled():
+            self.stdout.write('SHARD_DATABASES has a single database, nothing to do')
+            return
+
+        if options['prepare']:
+            doctors, users = prepare_shards()
+            self.stdout.write(self.style.SUCCESS(
+                f'Reserved id blocks; copied {doctors} doctor(s) and {users} user(s)'
+            ))
+        elif options['sync_shared']:
+            doctors, users = sync_shared()
+            self.stdout.write(self.style.SUCCESS(f'Copied {doctors} doctor(s) and {users} user(s)'))
+        elif options['move']:
+            self.move(options['move'], options['to'], options['grace'])
+        elif options['auto']:
+            self.auto(options['apply'], options['grace'])
+        else:
+            for alias, (users, patients) in shard_usage().items():
+                self.stdout.write(f'{alias}: {users} user(s), {patients} patient(s)')
+
+    def move(self, email, target, grace):
+        if target not in shard_aliases():
+            raise CommandError(f'--to must be one of: {", ".join(shard_aliases())}')
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            raise CommandError(f'No user with email {email}')
+        moved = move_user(user, target, grace=grace, log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f'Moved {email} ({moved} patient(s)) to {target}'))
+
+    def auto(self, apply, grace):
+        usage = {}
+        for alias in shard_aliases():
+            # Users created before sharding have shard=''
+            shards = [alias] if alias != DEFAULT_DB_ALIAS else ['', DEFAULT_DB_ALIAS]
+            owners = User.objects.filter(shard__in=shards)
+            owner_ids = set(owners.values_list('pk', flat=True))
+            counts = Patient._base_manager.using(alias).order_by().values_list('created_by_id').annotate(count=Count('id'))
+            for user_id, count in counts:
+                # Leftovers of an interrupted move belong to another shard
+                if user_id in owner_ids:
+                    usage[(user_id, alias)] = count
+
+        moves = plan_moves(usage, shard_aliases())
+        if not moves:
+            self.stdout.write('Shards are balanced')
+            return
+        users = User.objects.in_bulk([user_id for user_id, _, _ in moves])
+        for user_id, source, target in moves:
+            user = users[user_id]
+            self.stdout.write(f'{user.email}: {source} -> {target} ({usage[(user_id, source)]} patient(s))')
+            if apply:
+                move_user(user, target, grace=grace, log=self.stdout.write)
+        if not apply:
+            self.stdout.write('Dry run; add --apply to move')
@@ -0,0 +1,249 @@
+# apps/core/metrics.py
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+
+"""
+Prometheus-style metrics, collected in-process.
+
+Why not prometheus_client?
+- We only need counters and histograms with a handful of labels
+- Observations are pre-aggregated in plain dicts under one lock
+  (a few hundred nanoseconds per request)
+
+Multi-process (gunicorn): when METRICS_MULTIPROC_DIR is set, each worker
+periodically writes its aggregated snapshot to <dir>/<pid>-<token>.json
+and the /metrics endpoint sums all snapshots. Snapshots of exited workers
+are kept:
+- The token is new for every process, so a worker that gets a recycled
+  pid does not overwrite the totals of the dead worker that had it
+- A final snapshot is written at interpreter exit, so a graceful worker
+  restart loses nothing
+- A worker killed without exiting (SIGKILL, OOM, gunicorn timeout) loses
+  the counts since its last write (up to METRICS_WRITE_INTERVAL), and
+  totals drop by that much; Prometheus treats this as a counter reset
+"""
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Total HTTP requests', None),
+    'http_request_duration_seconds': ('histogram', 'Request latency in seconds', DURATION_BUCKETS),
+    'http_response_size_bytes': ('histogram', 'Response body size in bytes', SIZE_BUCKETS),
+    'http_request_db_queries': ('histogram', 'Database queries per request', QUERY_BUCKETS),
+    'http_request_db_seconds_total': ('counter', 'Time spent in database queries', None),
+    'http_auth_failures_total': ('counter', 'Requests rejected with 401 or 403', None),
+    'cache_requests_total': ('counter', 'Cache lookups by result (hit/miss)', None),
+}
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters and histograms keyed by label values.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> float
+        self._histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._last_write = 0.0
+        self._file_pid = None
+        self._file_name = None
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * (len(buckets) + 2)
+            series[bisect_left(buckets, value)] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(series)] for (name, labels), series in self._histograms.items()],
+            }
+
+    # ------------------------------------------------------------------
+    # Multi-process support
+    # ------------------------------------------------------------------
+
+    def maybe_write(self):
+        """
+        Write this process's snapshot to METRICS_MULTIPROC_DIR, at most
+        once per METRICS_WRITE_INTERVAL seconds.
+        """
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+        if not directory:
+            return
+        now = time.monotonic()
+        if now - self._last_write < getattr(settings, 'METRICS_WRITE_INTERVAL', 5.0):
+            return
+        self._last_write = now
+        self.write(directory)
+
+    def write_final(self):
+        """
+        Write the last snapshot of this process (registered with atexit).
+        """
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+        if directory:
+            self.write(directory)
+
+    def snapshot_filename(self):
+        """
+        Name of this process's snapshot file, <pid>-<token>.json.
+        """
+        pid = os.getpid()
+        # Checked on every call: gunicorn forks workers after the
+        # registry is created
+        if self._file_pid != pid:
+            self._file_pid = pid
+            self._file_name = f'{pid}-{uuid.uuid4().hex[:12]}.json'
+        return self._file_name
+
+    def write(self, directory):
+        data = json.dumps(self.snapshot())
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as handle:
+            handle.write(data)
+        os.replace(tmp_path, os.path.join(directory, self.snapshot_filename()))
+
+    def collect(self):
+        """
+        Merge this process's live values with other workers' snapshots.
+        """
+        snapshots = [self.snapshot()]
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+        if directory and os.path.isdir(directory):
+            own_file = self.snapshot_filename()
+            for filename in os.listdir(directory):
+                if not filename.endswith('.json') or filename == own_file:
+                    continue
+                try:
+                    with open(os.path.join(directory, filename)) as handle:
+                        snapshots.append(json.load(handle))
+                except (OSError, ValueError):
+                    continue
+
+        counters = {}
+        histograms = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, series in snapshot['histograms']:
+                key = (name, tuple(labels))
+                merged = histograms.get(key)
+                if merged is None:
+                    histograms[key] = list(series)
+                else:
+                    for index, value in enumerate(series):
+                        merged[index] += value
+        return counters, histograms
+
+
+registry = MetricsRegistry()
+atexit.register(registry.write_final)
+
+# Label names per metric (values are stored positionally)
+LABELS = {
+    'http_requests_total': ('route', 'method', 'status'),
+    'http_request_duration_seconds': ('route', 'method'),
+    'http_response_size_bytes': ('route', 'method'),
+    'http_request_db_queries': ('route', 'method'),
+    'http_request_db_seconds_total': ('route', 'method'),
+    'http_auth_failures_total': ('route', 'status'),
+    'cache_requests_total': ('cache', 'result'),
+}
+
+
+def record_cache(cache_name, hit):
+    """
+    Count a cache lookup. Call from any code that serves from a cache.
+    """
+    registry.inc('cache_requests_total', (cache_name, 'hit' if hit else 'miss'))
+
+
+def record_request(route, method, status, duration, size, query_count, db_time):
+    labels = (route, method)
+    registry.inc('http_requests_total', (route, method, str(status)))
+    registry.observe('http_request_duration_seconds', labels, duration)
+    registry.observe('http_response_size_bytes', labels, size)
+    registry.observe('http_request_db_queries', labels, query_count)
+    registry.inc('http_request_db_seconds_total', labels, db_time)
+    if status in (401, 403):
+        registry.inc('http_auth_failures_total', (route, str(status)))
+    registry.maybe_write()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render_text():
+    """
+    Render all metrics in the Prometheus text exposition format.
+    """
+    counters, histograms = registry.collect()
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        label_names = LABELS[name]
+
+        if metric_type == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(label_names, labels)} {_format_value(value)}')
+            continue
+
+        for (metric, labels), series in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, series):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{_format_labels(label_names, labels, ("le", bound))} {cumulative}'
+                )
+            cumulative += series[len(buckets)]
+            lines.append(f'{name}_bucket{_format_labels(label_names, labels, ("le", "+Inf"))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(label_names, labels)} {_format_value(series[-1])}')
+            lines.append(f'{name}_count{_format_labels(label_names, labels)} {cumulative}')
+
+    return '\n'.join(lines) + '\n'
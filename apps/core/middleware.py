@@ -0,0 +1,182 @@
+# apps/core/middleware.py
+
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .instrumentation import (
+    QueryBudgetExceeded,
+    RequestMetrics,
+    bind_metrics,
+    unbind_metrics,
+)
+from .metrics import record_request
+
+logger = logging.getLogger('apps.core.requests')
+
+
+def _resolve_budget(view_func, method):
+    """
+    Find the declared query budget for the view handling this request.
+
+    Views declare budgets as a class attribute:
+    - query_budgets = {'list': 2, 'retrieve': 2, ...}  (ViewSets, by action)
+    - query_budget = 3                                 (any view)
+    Returns (action, budget); either may be None.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return None, None
+
+    # ViewSets: as_view() stores the method -> action mapping on the function
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower())
+
+    budgets = getattr(view_class, 'query_budgets', None) or {}
+    if action in budgets:
+        return action, budgets[action]
+    return action, getattr(view_class, 'query_budget', None)
+
+
+class RequestTimingMiddleware:
+    """
+    Records query count, DB time, serialization time and render time
+    for every request.
+
+    Results are:
+    - returned in a Server-Timing header (visible in browser dev tools)
+      when SERVER_TIMING_HEADER is True; off by default outside DEBUG
+      so timings aren't exposed to every client
+    - logged as one JSON line per request on the 'apps.core.requests' logger
+    - checked against the view's declared query budget; exceeding it
+      raises QueryBudgetExceeded when QUERY_BUDGET_ENFORCE is True
+      (tests), and logs a warning otherwise
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics, token, started = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            unbind_metrics(token)
+        return self._finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics, token, started = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            unbind_metrics(token)
+        return self._finish(request, response, metrics, started)
+
+    def _start(self, request):
+        metrics = RequestMetrics()
+        request.perf_metrics = metrics
+        return metrics, bind_metrics(metrics), time.perf_counter()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = request.perf_metrics
+        match = request.resolver_match
+        metrics.route = match.route if match else None
+        metrics.action, metrics.query_budget = _resolve_budget(view_func, request.method)
+        return None
+
+    def process_template_response(self, request, response):
+        # DRF Responses are rendered right after this hook returns
+        metrics = request.perf_metrics
+        metrics._render_started = time.perf_counter()
+
+        def _rendered(rendered_response):
+            metrics.render_time = time.perf_counter() - metrics._render_started
+
+        response.add_post_render_callback(_rendered)
+        return response
+
+    def _finish(self, request, response, metrics, started):
+        metrics.total_time = time.perf_counter() - started
+
+        if getattr(settings, 'SERVER_TIMING_HEADER', False):
+            response['Server-Timing'] = metrics.server_timing()
+
+        record = metrics.as_dict()
+        record.update({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+        })
+        logger.info(json.dumps(record), extra={'request_metrics': record})
+
+        budget = metrics.query_budget
+        if budget is not None and metrics.query_count > budget:
+            message = (
+                f'{request.method} {request.path} ({metrics.action or metrics.route}) '
+                f'ran {metrics.query_count} queries, budget is {budget}'
+            )
+            if getattr(settings, 'QUERY_BUDGET_ENFORCE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Feeds per-route request metrics into apps/core/metrics.py.
+
+    Must sit directly above RequestTimingMiddleware in MIDDLEWARE so that
+    request.perf_metrics is complete when the response comes back.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    def _record(self, request, response, started):
+        duration = time.perf_counter() - started
+        metrics = getattr(request, 'perf_metrics', None)
+
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+
+        record_request(
+            route=(metrics.route if metrics else None) or 'unmatched',
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            size=size,
+            query_count=metrics.query_count if metrics else 0,
+            db_time=metrics.db_time if metrics else 0.0,
+        )
@@ -0,0 +1,207 @@
+# apps/core/rebalance.py
+
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+
+from apps.changes.models import ChangeEvent
+from apps.doctors.models import Doctor
+from apps.mappings.models import MappingArchive, PatientDoctorMapping
+from apps.patients.models import Patient
+from apps.stats.models import DashboardSnapshot
+from .deletion import delete_in_chunks
+from .sharding import replicate, reserve_id_ranges, shard_aliases, shard_for_user
+
+"""
+Shard maintenance behind `manage.py rebalance_shards`.
+
+Moving a user copies their rows to the target shard and only then points
+User.shard at it, so a failed move leaves them where they were. The
+copies keep their primary keys (each shard allocates from its own id
+block), except change events, which get new ids on the target so the
+feed stays in commit order there; the user's feed clients are told to
+start over (ChangeFeedView answers 409 to an old cursor).
+"""
+
+User = get_user_model()
+
+SHARDED_TABLES = (
+    Patient._meta.db_table,
+    PatientDoctorMapping._meta.db_table,
+    MappingArchive._meta.db_table,
+    ChangeEvent._meta.db_table,
+)
+
+
+def _chunks(queryset, chunk_size):
+    """
+    Rows of `queryset` in primary key order, `chunk_size` at a time.
+    """
+    last = None
+    while True:
+        chunk = queryset.order_by('pk')
+        if last is not None:
+            chunk = chunk.filter(pk__gt=last)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        # Taken before yielding: the caller may reset pks (change events
+        # get new ids on the target shard)
+        last = chunk[-1].pk
+        yield chunk
+
+
+def sync_shared(chunk_size=None):
+    """
+    Copy every doctor, and every user to their own shard, from 'default'.
+    Returns (doctors, users) copied.
+    """
+    chunk_size = chunk_size or settings.CASCADE_DELETE_CHUNK_SIZE
+    doctors = 0
+    for chunk in _chunks(Doctor.objects.all(), chunk_size):
+        replicate(Doctor, [doctor.pk for doctor in chunk])
+        doctors += len(chunk)
+
+    users = 0
+    for alias in shard_aliases():
+        owners = User.objects.filter(shard=alias) if alias != DEFAULT_DB_ALIAS else User.objects.none()
+        for chunk in _chunks(owners.only('pk'), chunk_size):
+            replicate(User, [user.pk for user in chunk], aliases=[alias])
+            users += len(chunk)
+    return doctors, users
+
+
+def prepare_shards():
+    """
+    Give each shard its id block, then copy the shared rows.
+    """
+    for alias in shard_aliases():
+        reserve_id_ranges(alias, SHARDED_TABLES)
+    return sync_shared()
+
+
+def shard_usage():
+    """
+    {alias: (users, patients)} for every shard.
+    """
+    users = dict(
+        User.objects.order_by().values_list('shard').annotate(count=Count('id'))
+    )
+    # Users created before sharding have shard=''
+    users[DEFAULT_DB_ALIAS] = users.pop('', 0) + users.get(DEFAULT_DB_ALIAS, 0)
+    return {
+        alias: (users.get(alias, 0), Patient._base_manager.using(alias).count())
+        for alias in shard_aliases()
+    }
+
+
+def _owned(source, user):
+    """
+    Querysets of the rows `user` owns on `source`, in deletion order.
+    """
+    return (
+        PatientDoctorMapping._base_manager.using(source).filter(patient__created_by_id=user.pk),
+        MappingArchive._base_manager.using(source).filter(patient__created_by_id=user.pk),
+        Patient._base_manager.using(source).filter(created_by_id=user.pk),
+        ChangeEvent._base_manager.using(source).filter(owner_id=user.pk),
+        DashboardSnapshot._base_manager.using(source).filter(user_id=user.pk),
+    )
+
+
+def move_user(user, target, grace=None, chunk_size=None, log=None):
+    """
+    Move `user`'s patients, mappings (live and archived) and change
+    events to shard `target`.
+
+    1. Lock the user (writes get 503) and wait `grace` seconds for
+       requests already past the check
+    2. Copy the rows to `target` in one transaction; leftovers of an
+       earlier failed move are removed first
+    3. Point the user at `target` and unlock
+    4. Delete the rows from the old shard, in chunks
+
+    Returns the number of patients moved.
+    """
+    grace = settings.SHARD_MOVE_GRACE if grace is None else grace
+    chunk_size = chunk_size or settings.CASCADE_DELETE_CHUNK_SIZE
+    log = log or (lambda message: None)
+    source = shard_for_user(user)
+    if target == source:
+        return 0
+    if target not in shard_aliases():
+        raise ValueError(f'{target!r} is not in SHARD_DATABASES')
+
+    User.objects.filter(pk=user.pk).update(shard_locked=True)
+    try:
+        if grace:
+            log(f'Locked {user.email}, waiting {grace}s')
+            time.sleep(grace)
+
+        mappings, archives, patients, events, _ = _owned(source, user)
+        assigners = set(mappings.values_list('assigned_by_id', flat=True)) - {None}
+        replicate(User, [user.pk, *assigners], aliases=[target])
+
+        moved = 0
+        with transaction.atomic(using=target):
+            for queryset in _owned(target, user):
+                delete_in_chunks(queryset, chunk_size)
+            for chunk in _chunks(patients, chunk_size):
+                Patient._base_manager.using(target).bulk_create(chunk)
+                moved += len(chunk)
+            for chunk in _chunks(mappings, chunk_size):
+                PatientDoctorMapping._base_manager.using(target).bulk_create(chunk)
+            for chunk in _chunks(archives, chunk_size):
+                MappingArchive._base_manager.using(target).bulk_create(chunk)
+            for chunk in _chunks(events, chunk_size):
+                for event in chunk:
+                    event.pk = None
+                ChangeEvent._base_manager.using(target).bulk_create(chunk)
+        log(f'Copied {moved} patient(s) to {target}')
+
+        User.objects.filter(pk=user.pk).update(shard=target, shard_locked=False)
+        user.shard, user.shard_locked = target, False
+    except Exception:
+        User.objects.filter(pk=user.pk).update(shard_locked=False)
+        raise
+
+    # The dashboard snapshot is rebuilt on the new shard by refresh_stats
+    for queryset in _owned(source, user):
+        delete_in_chunks(queryset, chunk_size)
+    log(f'Removed {user.email} from {source}')
+    return moved
+
+
+def plan_moves(usage_by_user, aliases):
+    """
+    Greedy rebalancing plan: move users off the fullest shard to the
+    emptiest while that narrows the gap between them; each user moves at
+    most once.
+
+    `usage_by_user` maps (user id, shard) to a patient count. Returns a
+    list of (user id, source, target).
+    """
+    load = {alias: 0 for alias in aliases}
+    by_shard = {alias: [] for alias in aliases}
+    for (user_id, shard), count in usage_by_user.items():
+        load[shard] += count
+        by_shard[shard].append((count, user_id))
+
+    moves = []
+    while True:
+        fullest = max(load, key=load.get)
+        emptiest = min(load, key=load.get)
+        gap = load[fullest] - load[emptiest]
+        # Moving `count` narrows the gap only if count < gap, and most
+        # when count is closest to half of it
+        candidates = [item for item in by_shard[fullest] if 0 < item[0] < gap]
+        if not candidates:
+            return moves
+        count, user_id = min(candidates, key=lambda item: (abs(gap - 2 * item[0]), item[1]))
+        # Moved users stay put for the rest of the plan
+        by_shard[fullest].remove((count, user_id))
+        load[fullest] -= count
+        load[emptiest] += count
+        moves.append((user_id, fullest, emptiest))
@@ -0,0 +1,340 @@
+# apps/core/serializers.py
+
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.validators import UniqueValidator
+
+
+def atomic_write(model):
+    """
+    Context manager for a write that may raise IntegrityError.
+
+    In autocommit the INSERT/UPDATE is its own transaction and nothing
+    else is needed. Inside a transaction the write joins it without a
+    savepoint (no extra round trips); an IntegrityError marks the
+    transaction for rollback, so the caller must let the resulting
+    ValidationError propagate out of its atomic() block. The viewsets
+    do, since they save and write the change event in one block.
+    """
+    using = router.db_for_write(model)
+    if transaction.get_connection(using).in_atomic_block:
+        return transaction.atomic(using=using, savepoint=False)
+    return nullcontext()
+
+
+class UniqueFieldsMixin:
+    """
+    ModelSerializer mixin that validates all unique fields in one query.
+
+    By default DRF adds a UniqueValidator per unique model field (one
+    `exists()` query each), and hand-written validate_<field> methods
+    usually repeat the check. Declare the unique fields and their error
+    messages instead:
+
+        unique_field_messages = {
+            'email': 'A doctor with this email already exists.',
+        }
+
+    Modes (UNIQUE_VALIDATION_MODE setting, or `unique_validation` on the
+    serializer class):
+    - 'query': one SELECT checks every declared field that is being set
+      or changed, before saving
+    - 'constraint': no pre-check; rely on the database's unique
+      constraints and map the IntegrityError to the same field errors
+
+    In both modes an IntegrityError from a concurrent insert is reported
+    as the field error, never as a 500.
+    """
+    unique_field_messages = {}
+    unique_validation = None
+
+    def get_unique_validation_mode(self):
+        return self.unique_validation or getattr(settings, 'UNIQUE_VALIDATION_MODE', 'query')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.unique_field_messages:
+            field = fields.get(name)
+            if field is not None:
+                field.validators = [
+                    validator for validator in field.validators
+                    if not isinstance(validator, UniqueValidator)
+                ]
+        return fields
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if self.get_unique_validation_mode() == 'query':
+            self.check_unique_fields(attrs)
+        return attrs
+
+    def check_unique_fields(self, attrs):
+        """
+        Raise a field-level ValidationError for every declared unique field
+        whose new value is already taken.
+        """
+        values = {
+            name: attrs[name]
+            for name in self.unique_field_messages
+            if name in attrs
+        }
+        if self.instance is not None:
+            # Unchanged values can't conflict with anything but themselves
+            values = {
+                name: value for name, value in values.items()
+                if getattr(self.instance, name) != value
+            }
+        if not values:
+            return
+
+        condition = Q()
+        for name, value in values.items():
+            condition |= Q(**{name: value})
+
+        queryset = self.Meta.model._default_manager.filter(condition)
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+
+        errors = {}
+        for row in queryset.values_list(*values)[:len(values)]:
+            for name, existing in zip(values, row):
+                if existing == values[name]:
+                    errors[name] = [self.unique_field_messages[name]]
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+    def unique_field_for_error(self, exc):
+        """
+        Return the declared field whose unique constraint raised `exc`.
+        """
+        message = str(exc)
+        opts = self.Meta.model._meta
+        for name in self.unique_field_messages:
+            column = opts.get_field(name).column
+            # PostgreSQL: 'Key (email)=(...) already exists' / constraint 'doctors_email_key'
+            # SQLite: 'UNIQUE constraint failed: doctors.email'
+            if (
+                f'({column})=' in message
+                or f'{opts.db_table}.{column}' in message
+                or f'{opts.db_table}_{column}_' in message
+            ):
+                return name
+        return None
+
+    def save(self, **kwargs):
+        try:
+            with atomic_write(self.Meta.model):
+                return super().save(**kwargs)
+        except IntegrityError as exc:
+            name = self.unique_field_for_error(exc)
+            if name is None:
+                raise
+            raise serializers.ValidationError({name: [self.unique_field_messages[name]]})
+
+
+class VersionConflict(Exception):
+    """
+    Raised by VersionedUpdateMixin when the row was saved by someone
+    else after the version the client read.
+    """
+
+
+class VersionedUpdateMixin:
+    """
+    ModelSerializer mixin for updates that write only what changed,
+    optionally guarded by a version check.
+
+    ModelSerializer.update() sets every validated field and calls
+    save(), which rewrites every column of the row (and its indexes)
+    even when the client resent the values it just read. Here only the
+    fields whose value differs are written, in one statement:
+
+        UPDATE ... SET <changed fields>, updated_at = now
+        WHERE id = ? [AND updated_at = ?]
+
+    The version condition is added when the view passes
+    `expected_version` in the serializer context (see
+    ConditionalUpdateMixin in apps/core/views.py). If no row matches,
+    the row changed or was deleted in between and VersionConflict is
+    raised; nothing was written.
+
+    A queryset update() is used rather than save(update_fields=...)
+    since save() can't add the version condition. It skips the model's
+    save() and pre/post_save signals, so only use this on models that
+    don't rely on them. After save(), `changed_fields` lists the fields
+    that were written (empty if the update was a no-op).
+    """
+    version_field = 'updated_at'
+
+    def get_changed_fields(self, instance, validated_data):
+        opts = instance._meta
+        changed = {}
+        for name, value in validated_data.items():
+            field = opts.get_field(name)
+            if field.many_to_one or field.one_to_one:
+                # Compare ids; reading the relation would fetch the row
+                current, new = getattr(instance, field.attname), getattr(value, 'pk', value)
+            else:
+                current, new = getattr(instance, name), value
+            if current != new:
+                changed[name] = value
+        return changed
+
+    def update(self, instance, validated_data):
+        changed = self.get_changed_fields(instance, validated_data)
+        self.changed_fields = list(changed)
+        if not changed:
+            return instance
+
+        changed[self.version_field] = timezone.now()
+        queryset = type(instance)._base_manager.filter(pk=instance.pk)
+        expected = self.context.get('expected_version')
+        if expected is not None:
+            queryset = queryset.filter(**{self.version_field: expected})
+
+        if not queryset.update(**changed):
+            raise VersionConflict()
+
+        for name, value in changed.items():
+            setattr(instance, name, value)
+        return instance
+
+
+def _query_param_list(request, name):
+    value = request.query_params.get(name, '')
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer mixin for sparse fieldsets and expansion on reads.
+
+    - ?fields=id,name renders only the listed fields
+    - ?expand=doctor_details adds a nested field from expandable_fields;
+      on serializers that already declare it, it keeps it when
+      ?fields= is also given
+
+    Declare the expandable fields as (serializer path, kwargs):
+
+        expandable_fields = {
+            'doctor_details': ('apps.doctors.serializers.DoctorSerializer', {'source': 'doctor'}),
+        }
+
+    Only the top-level serializer of a GET/HEAD request reads the
+    parameters; nested serializers and writes are unaffected. Use
+    prune_queryset() to load only the columns and joins that the
+    remaining fields need.
+    """
+    expandable_fields = {}
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self._is_root():
+            return fields
+
+        requested = _query_param_list(request, 'fields')
+        expand = [name for name in _query_param_list(request, 'expand') if name in self.expandable_fields]
+
+        for name in expand:
+            if name not in fields:
+                path, kwargs = self.expandable_fields[name]
+                fields[name] = import_string(path)(read_only=True, **kwargs)
+
+        if requested:
+            keep = set(requested) | set(expand)
+            for name in list(fields):
+                if name not in keep:
+                    del fields[name]
+        return fields
+
+
+def query_plan(serializer, prefix=''):
+    """
+    Work out which columns and joins `serializer` reads.
+
+    Returns (only, select_related) as sets of ORM paths, or None when a
+    field's source can't be mapped to model fields (methods, properties,
+    reverse relations); the caller should then load everything.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = serializer.Meta.model
+    only, related = set(), set()
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            return None
+
+        current, path = model, prefix
+        for position, attr in enumerate(field.source_attrs):
+            last = position == len(field.source_attrs) - 1
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+
+            if not model_field.is_relation:
+                if not last:
+                    return None
+                only.add(path + attr)
+                break
+
+            if not (model_field.many_to_one or model_field.one_to_one) or not model_field.concrete:
+                return None
+
+            only.add(path + attr)
+            if last and not isinstance(field, serializers.BaseSerializer):
+                # Rendered as the foreign key value, no join needed
+                break
+
+            related.add(path + attr)
+            if last:
+                nested = query_plan(field, f'{path}{attr}__')
+                if nested is None:
+                    return None
+                only |= nested[0]
+                related |= nested[1]
+            else:
+                current, path = model_field.related_model, f'{path}{attr}__'
+
+    return only, related
+
+
+def prune_queryset(queryset, serializer, prefix=''):
+    """
+    Restrict `queryset` to the columns and joins `serializer` renders
+    (see query_plan). Related objects serialized by it live under
+    `prefix`, e.g. 'doctor__' for mappings rendered as doctors.
+    """
+    plan = query_plan(serializer, prefix)
+    if plan is None:
+        return queryset
+    only, related = plan
+    if prefix:
+        # The relation the prefix walks through must be joined too
+        relation = prefix[:-2]
+        only.add(relation)
+        related.add(relation)
+    queryset = queryset.select_related(None)
+    if related:
+        # select_related() with no arguments would follow every relation
+        queryset = queryset.select_related(*related)
+    return queryset.only(*only)
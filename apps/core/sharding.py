@@ -0,0 +1,208 @@
+# apps/core/sharding.py
+
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+"""
+Owner-keyed sharding.
+
+Every user's patients, mappings (live and archived), change events and
+dashboard snapshot live together on one database alias, their shard
+(User.shard). Every alias in SHARD_DATABASES is a complete database
+with all migrations applied; 'default' is also the primary for shared
+data.
+
+Sharded models (SHARDED_MODELS) are routed to the shard of the user
+being served. The shard is activated per request by ShardedViewMixin
+(DRF views), async_jwt_required (async views) and the job worker, all
+from the already loaded user, so routing costs no query.
+
+Shared models (users, doctors, jobs, ...) are always read and written
+on 'default'. Users and doctors are also copied to the other shards
+(replicate()), because sharded rows reference them: foreign keys are
+enforced per database, and select_related() joins run on the shard.
+Doctors are copied after every write through the API; users when they
+register or are moved. After editing either in the admin, run
+`manage.py rebalance_shards --sync-shared`.
+
+Primary keys of sharded tables come from a separate block per shard
+(SHARD_ID_BLOCK ids, `rebalance_shards --prepare`), so rows keep their
+ids when an owner is moved to another shard.
+
+With the default SHARD_DATABASES = ['default'] all of this reduces to a
+single database. The admin and management commands without an active
+shard work on 'default' only.
+"""
+
+SHARDED_MODELS = {
+    'patients.patient',
+    'mappings.patientdoctormapping',
+    'mappings.mappingarchive',
+    'changes.changeevent',
+    'stats.dashboardsnapshot',
+}
+
+_current = ContextVar('current_shard', default=None)
+
+
+def shard_aliases():
+    return list(settings.SHARD_DATABASES)
+
+
+def sharding_enabled():
+    return len(settings.SHARD_DATABASES) > 1
+
+
+def replica_aliases():
+    """
+    Shards that receive copies of the shared rows.
+    """
+    return [alias for alias in settings.SHARD_DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def pick_shard(key):
+    """
+    Shard for a new owner, spread by a stable hash of `key` (the email).
+    The choice is stored on the user, so adding a shard later doesn't
+    move anyone.
+    """
+    aliases = shard_aliases()
+    return aliases[zlib.crc32(key.encode()) % len(aliases)]
+
+
+def shard_for_user(user):
+    return user.shard or DEFAULT_DB_ALIAS
+
+
+def current_shard():
+    return _current.get()
+
+
+def activate_shard(alias):
+    """
+    Route sharded models to `alias` until deactivate_shard(token).
+    """
+    return _current.set(alias)
+
+
+def deactivate_shard(token):
+    _current.reset(token)
+
+
+@contextmanager
+def use_shard(alias):
+    token = activate_shard(alias)
+    try:
+        yield alias
+    finally:
+        deactivate_shard(token)
+
+
+def for_each_shard():
+    """
+    Iterate over the shards with each one active in turn.
+    """
+    for alias in shard_aliases():
+        with use_shard(alias):
+            yield alias
+
+
+def shard_id_range(alias):
+    """
+    (first, last) primary key allocated by `alias` for sharded tables.
+    """
+    index = shard_aliases().index(alias)
+    return index * settings.SHARD_ID_BLOCK + 1, (index + 1) * settings.SHARD_ID_BLOCK
+
+
+class ShardRouter:
+    """
+    Database router for SHARDED_MODELS (see module docstring).
+    """
+
+    def _db(self, model, **hints):
+        if model._meta.label_lower not in SHARDED_MODELS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._meta.label_lower in SHARDED_MODELS and instance._state.db:
+            return instance._state.db
+        return current_shard() or DEFAULT_DB_ALIAS
+
+    db_for_read = _db
+    db_for_write = _db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Shared rows exist on every shard
+        if obj1._meta.label_lower not in SHARDED_MODELS or obj2._meta.label_lower not in SHARDED_MODELS:
+            return True
+        return obj1._state.db == obj2._state.db
+
+
+def replicate(model, pks, aliases=None):
+    """
+    Copy the rows of `model` with `pks` from 'default' to `aliases`
+    (default: every other shard), inserting or updating them. Rows no
+    longer on 'default' are deleted there, with their dependent rows.
+    Returns the pks that were deleted.
+    """
+    aliases = replica_aliases() if aliases is None else [a for a in aliases if a != DEFAULT_DB_ALIAS]
+    pks = list(pks)
+    if not aliases or not pks:
+        return []
+
+    manager = model._base_manager
+    rows = list(manager.using(DEFAULT_DB_ALIAS).filter(pk__in=pks))
+    missing = set(pks) - {row.pk for row in rows}
+    fields = [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    for alias in aliases:
+        with transaction.atomic(using=alias, savepoint=False):
+            if rows:
+                manager.using(alias).bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=[model._meta.pk.name],
+                    update_fields=fields
+                )
+            if missing:
+                manager.using(alias).filter(pk__in=missing).delete()
+    return sorted(missing)
+
+
+def reserve_id_ranges(alias, tables):
+    """
+    Move the id sequences of `tables` on `alias` to the start of the
+    shard's block (never backwards). The next id handed out is the
+    block's first id, or MAX(id) + 1 if rows already go past it.
+    """
+    first, _ = shard_id_range(alias)
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        for table in tables:
+            if connection.vendor == 'postgresql':
+                # is_called = false: nextval() returns this value itself, so
+                # it can be 1 (setval(seq, 0) is out of range on an empty table)
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f'GREATEST(%s, (SELECT COALESCE(MAX(id), 0) + 1 FROM {quote(table)})), false)',
+                    [table, first]
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    'UPDATE sqlite_sequence SET seq = MAX(seq, %s) WHERE name = %s',
+                    [first - 1, table]
+                )
+                if not cursor.rowcount:
+                    cursor.execute(
+                        'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                        [table, first - 1]
+                    )
+            else:
+                raise NotImplementedError(f'Id blocks are not supported on {connection.vendor}')
@@ -0,0 +1,147 @@
+# apps/core/testing.py
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from .throttling import reset_buckets
+
+"""
+Test helpers shared by the apps' test suites.
+
+QueryCountTestCase runs an endpoint against growing datasets and asserts
+the number of queries stays the same, so N+1 patterns fail the build.
+"""
+
+User = get_user_model()
+
+TEST_PASSWORD = 'TestPass123!'
+
+# Dataset sizes every query-count test is run against
+DATASET_SIZES = (1, 100, 1000)
+
+
+def make_user(email='owner@example.com', name='Owner', password=TEST_PASSWORD):
+    return User.objects.create_user(
+        username=email,
+        email=email,
+        name=name,
+        password=password
+    )
+
+
+def bearer(user):
+    """
+    Authorization header value with a fresh access token for `user`.
+    """
+    return f'Bearer {AccessToken.for_user(user)}'
+
+
+def make_patients(owner, count, prefix='patient'):
+    """
+    Bulk-create `count` patients for `owner`, return them in id order.
+    """
+    from apps.patients.models import Patient
+
+    start = Patient.objects.count()
+    Patient.objects.bulk_create([
+        Patient(
+            created_by=owner,
+            name=f'Patient {start + i}',
+            email=f'{prefix}{start + i}@example.com',
+            phone_number='+1234567890',
+            blood_group='O+',
+        )
+        for i in range(count)
+    ])
+    return list(Patient.objects.filter(email__startswith=prefix).order_by('-id')[:count])[::-1]
+
+
+def make_doctors(count, prefix='doctor'):
+    """
+    Bulk-create `count` doctors, return them in id order.
+    """
+    from apps.doctors.models import Doctor
+
+    start = Doctor.objects.count()
+    Doctor.objects.bulk_create([
+        Doctor(
+            name=f'Doctor {start + i}',
+            email=f'{prefix}{start + i}@example.com',
+            phone_number='+1234567890',
+            specialization='General Physician',
+            qualification='MBBS',
+            license_number=f'{prefix.upper()}-{start + i}',
+            clinic_address='1 Test St',
+            consultation_fee=100,
+        )
+        for i in range(count)
+    ])
+    return list(Doctor.objects.filter(email__startswith=prefix).order_by('-id')[:count])[::-1]
+
+
+def make_mappings(patients, doctors, assigned_by=None):
+    """
+    Map every patient to every doctor.
+    """
+    from apps.mappings.models import PatientDoctorMapping
+
+    return PatientDoctorMapping.objects.bulk_create([
+        PatientDoctorMapping(patient=patient, doctor=doctor, assigned_by=assigned_by)
+        for patient in patients
+        for doctor in doctors
+    ])
+
+
+@override_settings(
+    QUERY_BUDGET_ENFORCE=True,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    SHARD_DATABASES=['default'],
+)
+class QueryCountTestCase(APITestCase):
+    """
+    Base class for query-count regression tests.
+
+    QUERY_BUDGET_ENFORCE is on, so every request is also checked against
+    the view's declared query_budgets. Counts are measured on a single
+    database (SHARD_DATABASES=['default']).
+
+    Use authenticate() rather than client.force_authenticate(): it sends
+    a real access token, so the JWT user lookup is counted like it is in
+    production.
+    """
+    dataset_sizes = DATASET_SIZES
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=bearer(user))
+
+    @classmethod
+    def _pre_setup(cls):
+        super()._pre_setup()
+        # Rate-limit buckets are per process; start every test with full ones
+        reset_buckets()
+
+    def assertConstantQueries(self, grow, request):
+        """
+        For each dataset size N: call grow(N) to bring the dataset to N
+        rows, then request(N) and count its queries. Fails if the count
+        differs between sizes or if any request fails.
+        """
+        counts = {}
+        for size in self.dataset_sizes:
+            grow(size)
+            with CaptureQueriesContext(connection) as queries:
+                response = request(size)
+            self.assertLess(
+                response.status_code, 400,
+                f'N={size}: {response.status_code} {getattr(response, "data", "")}'
+            )
+            counts[size] = len(queries)
+
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'Query count grows with dataset size: {counts}'
+        )
+        return counts
@@ -0,0 +1,516 @@
+# apps/core/tests.py
+
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.changes.models import ChangeEvent
+from apps.changes.views import ChangeFeedView
+from apps.doctors.models import Doctor
+from apps.mappings.archive import archive_mappings
+from apps.mappings.models import MappingArchive, PatientDoctorMapping
+from apps.patients.models import Patient
+from apps.patients.views import PatientViewSet
+from . import metrics, views
+from .instrumentation import QueryBudgetExceeded
+from .middleware import _resolve_budget
+from .rebalance import plan_moves, prepare_shards
+from .sharding import replicate, reserve_id_ranges, shard_id_range, use_shard
+from .testing import TEST_PASSWORD, QueryCountTestCase, make_doctors, make_mappings, make_patients, make_user
+from .throttling import CacheBucketStore, LocalBucketStore, reset_buckets
+
+
+class ApiRootTests(SimpleTestCase):
+    """
+    GET /api/ lists the routes from the resolver and supports ETags.
+    """
+
+    def test_catalog(self):
+        response = self.client.get('/api/')
+
+        self.assertEqual(response.status_code, 200)
+        endpoints = response.json()['endpoints']
+        self.assertEqual(
+            endpoints['mappings']['mapping-doctors-by-patient'],
+            {'path': '/api/mappings/patient/{patient_id}/', 'methods': ['GET']}
+        )
+        self.assertEqual(endpoints['patients']['patient-detail']['path'], '/api/patients/{pk}/')
+        self.assertIn('stats', endpoints)
+        self.assertIn('max-age=', response['Cache-Control'])
+
+    def test_not_modified(self):
+        etag = self.client.get('/api/')['ETag']
+
+        response = self.client.get('/api/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+
+class HealthTests(TestCase):
+    """
+    Liveness never queries; readiness caches its database check.
+    """
+
+    def setUp(self):
+        views._readiness['checked_at'] = None
+
+    def test_live(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/health/live')
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    @override_settings(HEALTH_CHECK_CACHE_SECONDS=60)
+    def test_ready_is_cached(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/health/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok', 'database': 'ok'})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/health/ready').status_code, 200)
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class TokenBucketTests(SimpleTestCase):
+    """
+    The in-process bucket refills continuously up to its capacity.
+    """
+
+    def test_refill(self):
+        store = LocalBucketStore()
+        # 2 tokens, one more every 10 seconds
+        consume = lambda now: store.consume('key', 0.1, 2, now=now)
+
+        self.assertEqual(consume(0), 0.0)
+        self.assertEqual(consume(0), 0.0)
+        self.assertAlmostEqual(consume(0), 10.0)
+        self.assertAlmostEqual(consume(5), 5.0)
+        self.assertEqual(consume(10), 0.0)
+        # Never more than the capacity
+        self.assertEqual(consume(1000), 0.0)
+        self.assertEqual(consume(1000), 0.0)
+        self.assertGreater(consume(1000), 0.0)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'throttle': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'throttle-tests'},
+})
+class CacheBucketTests(SimpleTestCase):
+    """
+    The shared bucket is a fixed-window counter in the cache.
+    """
+
+    def setUp(self):
+        self.store = CacheBucketStore('throttle')
+        self.store.cache.clear()
+        # 2 tokens per 20 second window
+        self.consume = lambda now: self.store.consume('key', 0.1, 2, now=now)
+
+    def test_fixed_window(self):
+        self.assertEqual(self.consume(100), 0.0)
+        self.assertEqual(self.consume(101), 0.0)
+        # Retry-After: until the window [100, 120) ends
+        self.assertEqual(self.consume(105), 15.0)
+        self.assertEqual(self.consume(119.5), 0.5)
+        # A new window starts full, with no gradual refill
+        self.assertEqual(self.consume(120), 0.0)
+        self.assertEqual(self.consume(121), 0.0)
+        self.assertGreater(self.consume(121), 0.0)
+
+    def test_window_boundary_burst(self):
+        # Twice the capacity within one second across a window boundary
+        # (a token bucket would allow 2 plus 0.1 refilled)
+        self.assertEqual([self.consume(now) for now in (119, 119, 120, 120)], [0.0] * 4)
+        self.assertGreater(self.consume(120), 0.0)
+
+    def test_keys_are_separate(self):
+        self.consume(100)
+        self.consume(100)
+        self.assertEqual(self.store.consume('other', 0.1, 2, now=100), 0.0)
+
+    def test_eviction_between_add_and_incr(self):
+        with mock.patch.object(self.store.cache, 'incr', side_effect=ValueError):
+            self.assertEqual(self.consume(100), 0.0)
+        # The counter was recreated with this request counted
+        self.assertEqual(self.store.cache.get('throttle:key:5'), 1)
+        self.assertEqual(self.consume(100), 0.0)
+        self.assertEqual(self.consume(100), 20.0)
+
+    @throttle_rates(auth='1/min', read='100/min', write='100/min')
+    def test_throttle_with_cache_store(self):
+        login = lambda: self.client.post('/api/auth/login/', {}, content_type='application/json')
+        with override_settings(THROTTLE_STORE='cache', THROTTLE_CACHE='throttle'):
+            reset_buckets()
+            self.addCleanup(reset_buckets)
+            self.assertNotEqual(login().status_code, 429)
+            response = login()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+
+
+class ThrottleTests(QueryCountTestCase):
+    """
+    Requests beyond a scope's rate get 429 with Retry-After.
+    """
+
+    @throttle_rates(auth='2/min', read='100/min', write='100/min')
+    def test_auth_scope(self):
+        user = make_user()
+        login = lambda: self.client.post(
+            '/api/auth/login/',
+            {'email': user.email, 'password': TEST_PASSWORD},
+            format='json'
+        )
+
+        self.assertEqual(login().status_code, 200)
+        self.assertEqual(login().status_code, 200)
+        response = login()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    @throttle_rates(auth='100/min', read='2/min', write='100/min')
+    def test_per_user_read_scope(self):
+        user = make_user()
+        self.authenticate(user)
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/patients/').status_code, 200)
+        self.assertEqual(self.client.get('/api/patients/').status_code, 429)
+
+        # Writes have their own bucket, other users their own
+        self.assertEqual(self.client.post('/api/patients/', {}, format='json').status_code, 400)
+        self.authenticate(make_user('other@example.com'))
+        self.assertEqual(self.client.get('/api/patients/').status_code, 200)
+
+
+class RequestTimingMiddlewareTests(QueryCountTestCase):
+    """
+    RequestTimingMiddleware reports timings, finds the view's budget
+    and enforces it.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+
+    def test_server_timing_header(self):
+        with override_settings(SERVER_TIMING_HEADER=False):
+            self.assertNotIn('Server-Timing', self.client.get('/api/patients/'))
+
+        with override_settings(SERVER_TIMING_HEADER=True):
+            response = self.client.get('/api/patients/')
+        header = response['Server-Timing']
+        self.assertRegex(header, r'^db;dur=[\d.]+;desc="\d+ queries", ')
+        for part in ('serialize;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(part, header)
+
+    def test_resolve_budget(self):
+        patients = resolve('/api/patients/').func
+        self.assertEqual(_resolve_budget(patients, 'GET'), ('list', PatientViewSet.query_budgets['list']))
+        self.assertEqual(_resolve_budget(patients, 'POST'), ('create', PatientViewSet.query_budgets['create']))
+        # Plain APIViews use query_budget
+        self.assertEqual(_resolve_budget(resolve('/api/changes/').func, 'GET'), (None, ChangeFeedView.query_budget))
+        # Non-DRF views have no budget
+        self.assertEqual(_resolve_budget(resolve('/metrics').func, 'GET'), (None, None))
+
+    def test_budget_exceeded(self):
+        with mock.patch.dict(PatientViewSet.query_budgets, {'list': 0}):
+            with self.assertRaisesRegex(QueryBudgetExceeded, r'GET /api/patients/ \(list\) ran \d+ queries, budget is 0'):
+                self.client.get('/api/patients/')
+
+            with override_settings(QUERY_BUDGET_ENFORCE=False):
+                with self.assertLogs('apps.core.requests', 'WARNING') as logs:
+                    response = self.client.get('/api/patients/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('budget is 0', logs.output[0])
+
+
+class MetricsTests(SimpleTestCase):
+    """
+    MetricsRegistry aggregation, the multi-process merge, the text
+    exposition format and access to /metrics.
+    """
+
+    def setUp(self):
+        self.registry = metrics.MetricsRegistry()
+        patcher = mock.patch.object(metrics, 'registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_registry(self):
+        self.registry.inc('http_requests_total', ('/a', 'GET', '200'))
+        self.registry.inc('http_requests_total', ('/a', 'GET', '200'), 2)
+        # Values equal to a bound land in that bucket (le = "less or equal")
+        for value in (0, 1, 1, 1000):
+            self.registry.observe('http_request_db_queries', ('/a', 'GET'), value)
+
+        snapshot = self.registry.snapshot()
+        self.assertEqual(snapshot['counters'], [['http_requests_total', ['/a', 'GET', '200'], 3]])
+        [[name, labels, series]] = snapshot['histograms']
+        self.assertEqual(series, [1, 2, 0, 0, 0, 0, 0, 0, 0, 1, 1002])
+
+    def test_multiprocess_merge(self):
+        self.registry.inc('http_requests_total', ('/a', 'GET', '200'))
+        self.registry.observe('http_request_db_queries', ('/a', 'GET'), 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            other = metrics.MetricsRegistry()
+            other.inc('http_requests_total', ('/a', 'GET', '200'), 4)
+            other.inc('http_requests_total', ('/b', 'GET', '500'))
+            other.observe('http_request_db_queries', ('/a', 'GET'), 3)
+            other.write(directory)
+            # Snapshots of other workers; ours is read live, broken files are skipped
+            with open(os.path.join(directory, '2-dead.json'), 'w') as handle:
+                handle.write('{not json')
+            with open(os.path.join(directory, self.registry.snapshot_filename()), 'w') as handle:
+                json.dump({'counters': [['http_requests_total', ['/a', 'GET', '200'], 100]], 'histograms': []}, handle)
+
+            with override_settings(METRICS_MULTIPROC_DIR=directory):
+                counters, histograms = self.registry.collect()
+
+        self.assertEqual(counters, {
+            ('http_requests_total', ('/a', 'GET', '200')): 5,
+            ('http_requests_total', ('/b', 'GET', '500')): 1,
+        })
+        series = histograms[('http_request_db_queries', ('/a', 'GET'))]
+        self.assertEqual(series[:5], [0, 1, 0, 1, 0])
+        self.assertEqual(series[-1], 4)
+
+    def test_snapshot_filename(self):
+        filename = self.registry.snapshot_filename()
+
+        self.assertTrue(filename.startswith(f'{os.getpid()}-'))
+        self.assertEqual(self.registry.snapshot_filename(), filename)
+        # Another process with the same pid (e.g. a recycled one) gets its own file
+        self.assertNotEqual(metrics.MetricsRegistry().snapshot_filename(), filename)
+
+    def test_write_final(self):
+        self.registry.inc('http_requests_total', ('/a', 'GET', '200'))
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_MULTIPROC_DIR=directory):
+                self.registry.write_final()
+            with open(os.path.join(directory, self.registry.snapshot_filename())) as handle:
+                snapshot = json.load(handle)
+
+        self.assertEqual(snapshot['counters'], [['http_requests_total', ['/a', 'GET', '200'], 1]])
+
+    def test_exposition_format(self):
+        self.registry.inc('cache_requests_total', ('api "root"', 'hit'))
+        self.registry.observe('http_request_duration_seconds', ('/a', 'GET'), 0.02)
+        self.registry.observe('http_request_duration_seconds', ('/a', 'GET'), 20)
+
+        lines = metrics.render_text().splitlines()
+
+        self.assertIn('# TYPE http_request_duration_seconds histogram', lines)
+        self.assertIn('cache_requests_total{cache="api \\"root\\"",result="hit"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{route="/a",method="GET",le="0.01"} 0', lines)
+        # Buckets are cumulative
+        self.assertIn('http_request_duration_seconds_bucket{route="/a",method="GET",le="0.025"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{route="/a",method="GET",le="10.0"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{route="/a",method="GET",le="+Inf"} 2', lines)
+        self.assertIn('http_request_duration_seconds_sum{route="/a",method="GET"} 20.02', lines)
+        self.assertIn('http_request_duration_seconds_count{route="/a",method="GET"} 2', lines)
+
+    def test_metrics_view_access(self):
+        with override_settings(METRICS_TOKEN='', DEBUG=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(METRICS_TOKEN='', DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'# TYPE http_requests_total counter', response.content)
+
+
+class PlanMovesTests(SimpleTestCase):
+    """
+    rebalance_shards --auto moves the users that narrow the gap most.
+    """
+
+    def test_plan(self):
+        usage = {(1, 'default'): 50, (2, 'default'): 30, (3, 'default'): 5, (4, 'shard1'): 10}
+        moves = plan_moves(usage, ['default', 'shard1'])
+
+        self.assertEqual(moves, [(2, 'default', 'shard1'), (3, 'default', 'shard1')])
+
+    def test_balanced(self):
+        self.assertEqual(plan_moves({(1, 'default'): 10, (2, 'shard1'): 10}, ['default', 'shard1']), [])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'sequences are PostgreSQL only')
+class ReserveIdRangesTests(TestCase):
+    """
+    reserve_id_ranges moves a sequence to the start of the block, or past
+    the rows already there, on empty and non-empty tables.
+    """
+
+    def setUp(self):
+        self.owner = make_user()
+
+    def reserve(self, shards):
+        with override_settings(SHARD_DATABASES=shards, SHARD_ID_BLOCK=1000):
+            reserve_id_ranges('default', ['patients'])
+
+    def test_first_block_empty_table(self):
+        self.reserve(['default'])
+        self.assertEqual(make_patients(self.owner, 1)[0].pk, 1)
+
+    def test_later_block(self):
+        self.reserve(['shard0', 'default'])
+        self.assertEqual(make_patients(self.owner, 1)[0].pk, 1001)
+
+    def test_never_backwards(self):
+        self.reserve(['shard0', 'default'])
+        existing = make_patients(self.owner, 2)
+        self.reserve(['shard0', 'default'])
+        self.assertEqual(make_patients(self.owner, 1, prefix='next')[0].pk, existing[-1].pk + 1)
+
+
+@skipUnless(len(settings.SHARD_DATABASES) > 1, 'needs SHARD_DATABASES with several aliases')
+@override_settings(CHANGES_FEED_DELAY=0)
+class ShardingTests(APITestCase):
+    """
+    Sharded rows follow their owner's shard; users and doctors are
+    copied to every shard. Runs with SHARD_DATABASES=default,shard1,...
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        self.shard = settings.SHARD_DATABASES[1]
+        # Last alias other than self.shard (default when there are only two)
+        self.other_shard = [alias for alias in settings.SHARD_DATABASES if alias != self.shard][-1]
+        prepare_shards()
+        self.user = self.make_owner('owner@example.com', self.shard)
+        self.client.force_authenticate(self.user)
+
+    def make_owner(self, email, shard):
+        user = make_user(email)
+        user.shard = shard
+        user.save(update_fields=['shard'])
+        replicate(get_user_model(), [user.pk], aliases=[shard])
+        return user
+
+    def create_patient(self, name='Alice'):
+        response = self.client.post('/api/patients/', {
+            'name': name,
+            'email': f'{name.lower()}@example.com',
+            'phone_number': '+1234567890',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['patient']['id']
+
+    def test_registration_assigns_shard(self):
+        response = self.client.post('/api/auth/register/', {
+            'name': 'New User',
+            'email': 'new@example.com',
+            'password': TEST_PASSWORD,
+            'password2': TEST_PASSWORD,
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        user = get_user_model().objects.get(email='new@example.com')
+        self.assertIn(user.shard, settings.SHARD_DATABASES)
+        self.assertTrue(get_user_model().objects.using(user.shard).filter(pk=user.pk).exists())
+
+    def test_writes_go_to_owner_shard(self):
+        patient_id = self.create_patient()
+
+        first, last = shard_id_range(self.shard)
+        self.assertTrue(first <= patient_id <= last)
+        self.assertTrue(Patient.objects.using(self.shard).filter(pk=patient_id).exists())
+        self.assertFalse(Patient.objects.using('default').filter(pk=patient_id).exists())
+        self.assertEqual(self.client.get('/api/patients/').data['count'], 1)
+
+        changes = self.client.get('/api/changes/').data['changes']
+        self.assertEqual([(c['entity'], c['object_id']) for c in changes], [('patient', patient_id)])
+
+    def test_doctor_replicated(self):
+        with self.captureOnCommitCallbacks(using='default', execute=True):
+            response = self.client.post('/api/doctors/', {
+                'name': 'Doctor',
+                'email': 'doctor@example.com',
+                'phone_number': '+1234567890',
+                'specialization': 'General Physician',
+                'qualification': 'MBBS',
+                'license_number': 'LIC-1',
+                'clinic_address': '1 Test St',
+                'consultation_fee': '100.00',
+            }, format='json')
+        doctor_id = response.data['doctor']['id']
+
+        for alias in settings.SHARD_DATABASES:
+            self.assertTrue(Doctor.objects.using(alias).filter(pk=doctor_id).exists())
+            self.assertTrue(
+                ChangeEvent.objects.using(alias).filter(entity='doctor', object_id=doctor_id).exists()
+            )
+        # Mappings on the shard can reference it
+        patient_id = self.create_patient()
+        response = self.client.post('/api/mappings/', {'patient': patient_id, 'doctor': doctor_id}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        with self.captureOnCommitCallbacks(using='default', execute=True):
+            self.client.delete(f'/api/doctors/{doctor_id}/')
+        self.assertFalse(Doctor.objects.using(self.shard).filter(pk=doctor_id).exists())
+        self.assertFalse(PatientDoctorMapping.objects.using(self.shard).exists())
+
+    def test_locked_user_cannot_write(self):
+        self.user.shard_locked = True
+        self.user.save(update_fields=['shard_locked'])
+
+        self.assertEqual(self.client.get('/api/patients/').status_code, 200)
+        response = self.client.post('/api/patients/', {'name': 'Alice'}, format='json')
+        self.assertEqual(response.status_code, 503)
+
+    def test_move_user(self):
+        doctors = make_doctors(1)
+        replicate(Doctor, [doctor.pk for doctor in doctors])
+        with use_shard(self.shard):
+            patients = make_patients(self.user, 3)
+            mappings = make_mappings(patients, doctors, assigned_by=self.user)
+            PatientDoctorMapping.objects.filter(pk=mappings[0].pk).update(is_active=False)
+            archive_mappings(before=timezone.now() + timedelta(days=1))
+        patient_ids = [patient.pk for patient in patients] + [self.create_patient()]
+        cursor = self.client.get('/api/changes/').data['next_cursor']
+
+        call_command(
+            'rebalance_shards', '--move', self.user.email, '--to', self.other_shard, '--grace', '0',
+            stdout=StringIO()
+        )
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.shard, self.other_shard)
+        self.assertFalse(self.user.shard_locked)
+        self.assertFalse(Patient.objects.using(self.shard).exists())
+        self.assertFalse(PatientDoctorMapping.objects.using(self.shard).exists())
+        moved = Patient.objects.using(self.other_shard).filter(created_by=self.user)
+        self.assertEqual(sorted(moved.values_list('pk', flat=True)), sorted(patient_ids))
+        self.assertEqual(PatientDoctorMapping.objects.using(self.other_shard).count(), 2)
+        self.assertEqual(MappingArchive.objects.using(self.other_shard).count(), 1)
+        self.assertFalse(MappingArchive.objects.using(self.shard).exists())
+
+        # The old cursor belongs to another shard's id block
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/changes/', {'since': cursor}).status_code, 409)
+        self.assertEqual(len(self.client.get('/api/changes/').data['changes']), 1)
+
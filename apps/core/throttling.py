@@ -0,0 +1,180 @@
+# apps/core/throttling.py
+
+import math
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+"""
+Rate limiting with token buckets.
+
+Every (scope, client) pair has a bucket holding up to N tokens that
+refills at N per period ('100/min'). A request takes one token; with
+none left it gets 429 and a Retry-After header. Unlike DRF's
+SimpleRateThrottle there is no per-request list of timestamps to load,
+trim and store, so a check is a few arithmetic operations.
+
+Scopes (REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']):
+- auth: register, login and token refresh (password hashing is slow)
+- write: any other non-GET request
+- read: GET/HEAD
+A view can set `throttle_scope` to use a scope of its own.
+
+Limits are kept in one of two stores (THROTTLE_STORE):
+- 'local': token buckets in this process's memory. Exact and
+  lock-protected, but each worker process has its own buckets.
+- 'cache': not a token bucket but a fixed-window counter in the
+  THROTTLE_CACHE cache (e.g. Django's Redis backend), shared by every
+  process. Uses add() + incr(), which are atomic there. The allowance
+  resets all at once at the end of each period, so a client can make up
+  to 2N requests around a window boundary (N at the end of one window,
+  N at the start of the next).
+"""
+
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """
+    '100/min' -> (tokens per second, bucket capacity). Like DRF, only
+    the first letter of the period counts ('min', 'minute', 'm').
+    """
+    count, period = rate.split('/')
+    count = int(count)
+    return count / _PERIODS[period[0]], count
+
+
+class LocalBucketStore:
+    """
+    Token buckets in process memory.
+    """
+    # Buckets that have refilled completely are dropped this often
+    prune_interval = 60.0
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_prune = time.monotonic() + self.prune_interval
+
+    def consume(self, key, rate, capacity, now=None):
+        """
+        Take one token from bucket `key`. Returns 0.0 if one was taken,
+        otherwise the seconds until one will be available.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            # (tokens, updated at, full at)
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+
+            if now >= self._next_prune:
+                self._buckets = {k: b for k, b in self._buckets.items() if b[2] > now}
+                self._next_prune = now + self.prune_interval
+        return wait
+
+
+class CacheBucketStore:
+    """
+    Fixed-window counters shared through a Django cache, one counter
+    per key and period (see module docstring for the burst this allows
+    at a window boundary).
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def consume(self, key, rate, capacity, now=None):
+        now = time.time() if now is None else now
+        period = capacity / rate
+        window = int(now // period)
+        cache_key = f'throttle:{key}:{window}'
+
+        self.cache.add(cache_key, 0, timeout=math.ceil(period) + 1)
+        try:
+            used = self.cache.incr(cache_key)
+        except ValueError:
+            # Evicted between add() and incr()
+            self.cache.set(cache_key, 1, timeout=math.ceil(period) + 1)
+            used = 1
+
+        if used <= capacity:
+            return 0.0
+        return (window + 1) * period - now
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.THROTTLE_STORE == 'cache':
+                    _store = CacheBucketStore(settings.THROTTLE_CACHE)
+                else:
+                    _store = LocalBucketStore()
+    return _store
+
+
+def reset_buckets():
+    """
+    Start over with full buckets (tests).
+    """
+    global _store
+    _store = None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Per-client, per-scope token bucket (see module docstring).
+
+    Authenticated requests are limited per user, anonymous ones per
+    client IP.
+    """
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        return 'read' if request.method in SAFE_METHODS else 'write'
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED:
+            return True
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if not rate:
+            return True
+
+        user = request.user
+        if user is not None and user.is_authenticated:
+            ident = f'user:{user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+
+        tokens_per_second, capacity = parse_rate(rate)
+        self._wait = get_bucket_store().consume(f'{scope}:{ident}', tokens_per_second, capacity)
+        return self._wait == 0.0
+
+    def wait(self):
+        return self._wait
@@ -0,0 +1,232 @@
+# apps/core/views.py
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from .catalog import rendered_api_root
+from .metrics import render_text
+from .serializers import prune_queryset
+from .sharding import activate_shard, deactivate_shard, shard_for_user
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint.
+    GET /metrics
+
+    The scraper must send `Authorization: Bearer <METRICS_TOKEN>`.
+    Without a METRICS_TOKEN the endpoint is open only in DEBUG and
+    answers 403 otherwise, so a missing setting never exposes metrics.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        header = request.headers.get('Authorization', '')
+        if not constant_time_compare(header, f'Bearer {token}'):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        return HttpResponse(status=403)
+
+    return HttpResponse(
+        render_text(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def api_root(request):
+    """
+    Root API endpoint - lists every route (see apps/core/catalog.py).
+    GET /api/
+
+    The body is rendered once per process and served with an ETag, so
+    clients polling it get a 304 with no body.
+    """
+    body, etag = rendered_api_root(getattr(request, 'urlconf', None))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={settings.API_ROOT_MAX_AGE}'
+    return response
+
+
+LIVE_BODY = b'{"status":"ok"}'
+
+_readiness_lock = threading.Lock()
+_readiness = {'checked_at': None, 'ok': False, 'body': b''}
+
+
+def health_live(request):
+    """
+    Liveness probe: the process is serving requests.
+    GET /health/live
+
+    Touches nothing else, not even the database.
+    """
+    return HttpResponse(LIVE_BODY, content_type='application/json')
+
+
+def _check_database():
+    try:
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True, {'status': 'ok', 'database': 'ok'}
+    except DatabaseError as e:
+        return False, {'status': 'unavailable', 'database': str(e) or type(e).__name__}
+
+
+def health_ready(request):
+    """
+    Readiness probe: the database answers.
+    GET /health/ready
+
+    The result is reused for HEALTH_CHECK_CACHE_SECONDS, so frequent
+    probes from several sources cost at most one SELECT 1 per interval
+    per process. Returns 503 while the database is unreachable.
+    """
+    now = time.monotonic()
+    with _readiness_lock:
+        checked_at = _readiness['checked_at']
+        if checked_at is None or now - checked_at >= settings.HEALTH_CHECK_CACHE_SECONDS:
+            ok, data = _check_database()
+            _readiness.update(checked_at=now, ok=ok, body=json.dumps(data).encode())
+        ok, body = _readiness['ok'], _readiness['body']
+
+    return HttpResponse(body, status=200 if ok else 503, content_type='application/json')
+
+
+class DynamicFieldsViewMixin:
+    """
+    ViewSet mixin: when a read asks for ?fields= or ?expand=, load only
+    the columns and joins the serializer will render (see
+    apps.core.serializers.DynamicFieldsMixin and prune_queryset).
+
+    Applied in filter_queryset(), so list actions must build their
+    queryset with self.filter_queryset(self.get_queryset()).
+    """
+    prune_actions = ('list', 'retrieve')
+
+    def wants_sparse_fields(self):
+        params = self.request.query_params
+        return 'fields' in params or 'expand' in params
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.prune_actions and self.wants_sparse_fields():
+            queryset = prune_queryset(queryset, self.get_serializer())
+        return queryset
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class ConditionalUpdateMixin:
+    """
+    ViewSet mixin: ETags on detail responses, If-Match on PUT/PATCH.
+
+    The ETag is the row's updated_at (microseconds since the epoch). A
+    client that sends it back as If-Match only overwrites the row if
+    nobody saved it since it was read; otherwise it gets 412 Precondition
+    Failed and should fetch the row again. The check is part of the
+    UPDATE itself (see apps.core.serializers.VersionedUpdateMixin), so
+    two concurrent writers can't both pass it.
+
+    Without If-Match an update still writes only the changed columns,
+    so concurrent edits of different fields don't undo each other.
+
+    In update():
+
+        response = self.check_if_match(instance, 'Failed to update patient')
+        if response is not None:
+            return response
+    """
+    version_field = 'updated_at'
+
+    def get_etag(self, instance):
+        if self.version_field in instance.get_deferred_fields():
+            # Sparse ?fields= read; don't load the column just for this
+            return None
+        version = getattr(instance, self.version_field)
+        return f'"{(version - _EPOCH) // timedelta(microseconds=1)}"'
+
+    def set_etag(self, response, instance):
+        etag = self.get_etag(instance)
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+    def precondition_failed(self, error):
+        return Response(
+            {
+                'error': error,
+                'details': {
+                    'If-Match': ['The resource was modified since it was read. Fetch it again and retry.']
+                }
+            },
+            status=status.HTTP_412_PRECONDITION_FAILED
+        )
+
+    def check_if_match(self, instance, error):
+        """
+        Compare If-Match with `instance` as just loaded. Returns a 412
+        response if it doesn't match; otherwise None, and the update is
+        made conditional on that version.
+        """
+        header = self.request.headers.get('If-Match')
+        if not header:
+            return None
+        etags = parse_etags(header)
+        if '*' in etags:
+            return None
+        if self.get_etag(instance) not in etags:
+            return self.precondition_failed(error)
+        self.expected_version = getattr(instance, self.version_field)
+        return None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expected_version'] = getattr(self, 'expected_version', None)
+        return context
+
+
+class ShardLocked(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Your records are being moved to another database. Retry in a few seconds.'
+    default_code = 'shard_locked'
+
+
+class ShardedViewMixin:
+    """
+    View mixin: route sharded models (apps/core/sharding.py) to the
+    authenticated user's shard for the rest of the request.
+
+    Writes are refused with 503 while rebalance_shards is moving the
+    user (User.shard_locked).
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user = request.user
+        if not user.is_authenticated:
+            return
+        if user.shard_locked and request.method not in SAFE_METHODS:
+            raise ShardLocked()
+        self._shard_token = activate_shard(shard_for_user(user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        token = self.__dict__.pop('_shard_token', None)
+        if token is not None:
+            deactivate_shard(token)
+        return response
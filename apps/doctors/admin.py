@@ -1,10 +1,11 @@
 # apps/doctors/admin.py
 
 from django.contrib import admin
+from apps.core.admin import LargeTableAdminMixin
 from .models import Doctor
 
 @admin.register(Doctor)
-class DoctorAdmin(admin.ModelAdmin):
+class DoctorAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Admin interface for Doctor model"""
     list_display = ['name', 'specialization', 'email', 'phone_number', 'experience_years', 'is_available']
     list_filter = ['specialization', 'is_available', 'created_at']
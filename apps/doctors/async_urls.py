@@ -0,0 +1,17 @@
+# apps/doctors/async_urls.py
+
+from django.urls import path
+from .async_views import doctor_list, doctor_detail
+
+"""
+Async doctor URL patterns.
+All endpoints are prefixed with /api/async/doctors/
+"""
+
+urlpatterns = [
+    # GET /api/async/doctors/
+    path('', doctor_list, name='doctor-list-async'),
+    
+    # GET /api/async/doctors/{id}/
+    path('<int:pk>/', doctor_detail, name='doctor-detail-async'),
+]
@@ -0,0 +1,51 @@
+# apps/doctors/async_views.py
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from apps.authentication.async_auth import async_jwt_required
+from .models import Doctor
+from .serializers import DoctorSerializer, DoctorListSerializer
+
+"""
+Async (ASGI-native) read endpoints for doctors.
+
+Same responses as DoctorViewSet.list / retrieve, but served without
+a thread hop per request when running under an ASGI server.
+
+Read-only subset: ?fields=, ?modified_since=, throttling and query
+budgets are not applied here.
+"""
+
+
+@require_GET
+@async_jwt_required
+async def doctor_list(request):
+    """
+    List all doctors.
+    GET /api/async/doctors/
+    """
+    doctors = [doctor async for doctor in Doctor.objects.all().aiterator()]
+    serializer = DoctorListSerializer(doctors, many=True)
+
+    return JsonResponse(
+        {
+            'count': len(doctors),
+            'doctors': serializer.data
+        }
+    )
+
+
+@require_GET
+@async_jwt_required
+async def doctor_detail(request, pk):
+    """
+    Retrieve a specific doctor.
+    GET /api/async/doctors/{id}/
+    """
+    try:
+        doctor = await Doctor.objects.aget(pk=pk)
+    except Doctor.DoesNotExist:
+        return JsonResponse({'detail': 'No Doctor matches the given query.'}, status=404)
+
+    serializer = DoctorSerializer(doctor)
+    return JsonResponse(serializer.data)
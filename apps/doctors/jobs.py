@@ -0,0 +1,32 @@
+# apps/doctors/jobs.py
+
+from django.db import DEFAULT_DB_ALIAS
+from apps.core.deletion import run_chunked_delete
+from apps.core.sharding import use_shard
+from apps.jobs.registry import job
+from .models import Doctor
+from .replication import on_doctor_deleted
+
+"""
+Background jobs for the doctors app (run by `manage.py run_worker`).
+"""
+
+@job('doctors.delete_doctor', priority=5)
+def delete_doctor(job, pk):
+    """
+    Delete a doctor with a large number of patient mappings.
+    """
+    doctor = Doctor.objects.filter(pk=pk).first()
+    if doctor is None:
+        # Already deleted (e.g. a retried job that had finished)
+        return {'deleted': 0}
+    # The worker activates the requesting user's shard; the chunked
+    # delete is for the mappings on 'default'. Copies on the other shards
+    # go with the doctor once it is deleted (apps/doctors/replication.py).
+    with use_shard(DEFAULT_DB_ALIAS):
+        return run_chunked_delete(
+            job,
+            doctor,
+            doctor.patient_mappings.all(),
+            on_delete=on_doctor_deleted
+        )
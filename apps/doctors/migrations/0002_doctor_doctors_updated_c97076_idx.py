@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['updated_at'], name='doctors_updated_c97076_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from apps.core.admin import trigram_search_indexes
+
+
+class Migration(migrations.Migration):
+    """
+    Trigram indexes behind the admin search_fields (PostgreSQL only).
+    """
+
+    dependencies = [
+        ('doctors', '0002_doctor_doctors_updated_c97076_idx'),
+    ]
+
+    operations = [
+        trigram_search_indexes('doctors', ['name', 'email', 'specialization', 'license_number']),
+    ]
@@ -1,7 +1,57 @@
 # apps/doctors/models.py
 
 from django.db import models
+from django.db.models import Case, Q, Value, When
 from django.core.validators import RegexValidator
+from django.utils import timezone
+
+class DoctorQuerySet(models.QuerySet):
+    """
+    QuerySet with a batch write path for availability.
+    """
+    
+    def set_availability(self, states):
+        """
+        Set is_available for several doctors with one UPDATE.
+        
+        `states` maps doctor id -> bool. Returns (doctors, changed):
+        every requested doctor that exists, locked and in id order, with
+        the new values applied, and the ids whose value actually changed.
+        Call inside transaction.atomic() so the rows stay locked until
+        the change events are written.
+        
+        Why not partial_update per doctor?
+        - One request and two statements for the whole batch instead of
+          a validation query and a full-row UPDATE per doctor
+        - Only is_available and updated_at are written, as
+          SET is_available = CASE WHEN id IN (...) THEN true ELSE false END
+        - Doctors already in the requested state are not rewritten, so
+          their updated_at (and ETag) stays the same
+        """
+        if not states:
+            return [], []
+        
+        doctors = list(self.select_for_update().filter(pk__in=list(states)).order_by('pk'))
+        changed = [doctor.pk for doctor in doctors if doctor.is_available != states[doctor.pk]]
+        if not changed:
+            return doctors, []
+        
+        now = timezone.now()
+        available = [pk for pk in changed if states[pk]]
+        self.filter(pk__in=changed).update(
+            is_available=Case(
+                When(Q(pk__in=available), then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField()
+            ),
+            updated_at=now
+        )
+        
+        for doctor in doctors:
+            if doctor.is_available != states[doctor.pk]:
+                doctor.is_available = states[doctor.pk]
+                doctor.updated_at = now
+        return doctors, changed
 
 class Doctor(models.Model):
     """
@@ -50,6 +100,8 @@ class Doctor(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = DoctorQuerySet.as_manager()
+    
     class Meta:
         db_table = 'doctors'
         verbose_name = 'Doctor'
@@ -59,6 +111,8 @@ class Doctor(models.Model):
             models.Index(fields=['email']),
             models.Index(fields=['specialization']),
             models.Index(fields=['is_available']),
+            # List ?modified_since= (apps/changes/sync.py)
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
@@ -0,0 +1,59 @@
+# apps/doctors/replication.py
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from apps.changes.models import ChangeEvent
+from apps.changes.outbox import deletion_recorder
+from apps.core.sharding import replica_aliases, replicate
+from .models import Doctor
+
+"""
+Keeping the doctor copies on the other shards current.
+
+Doctors live on 'default' and are copied to every other shard
+(apps/core/sharding.py): mappings on a shard reference them, and users
+on a shard read their change feed there. Call replicate_doctors() inside
+the transaction that writes the doctors. Once it commits, each shard gets
+the new rows (or loses the deleted ones, with their mappings) together
+with the matching change events, in one transaction per shard.
+
+If a shard can't be reached the error is logged by on_commit and the
+copy stays stale until `manage.py rebalance_shards --sync-shared`.
+With a single database this does nothing.
+"""
+
+
+def replicate_doctors(doctor_ids, action, data=None):
+    """
+    Copy `doctor_ids` to the other shards after the current transaction
+    commits and record `action` there. `data`, if given, maps each id to
+    its representation, as in record_changes().
+    """
+    aliases = replica_aliases()
+    doctor_ids = list(doctor_ids)
+    if not aliases or not doctor_ids:
+        return
+
+    def copy():
+        for alias in aliases:
+            with transaction.atomic(using=alias):
+                replicate(Doctor, doctor_ids, aliases=[alias])
+                ChangeEvent.objects.using(alias).bulk_create([
+                    ChangeEvent(
+                        entity=ChangeEvent.ENTITY_DOCTOR,
+                        object_id=doctor_id,
+                        action=action,
+                        data=data[doctor_id] if data is not None else None
+                    )
+                    for doctor_id in doctor_ids
+                ])
+
+    transaction.on_commit(copy, using=DEFAULT_DB_ALIAS, robust=True)
+
+
+def on_doctor_deleted(instance):
+    """
+    on_delete callback for apps.core.deletion: record the deletion and
+    remove the doctor from the other shards.
+    """
+    deletion_recorder(ChangeEvent.ENTITY_DOCTOR)(instance)
+    replicate_doctors([instance.pk], ChangeEvent.ACTION_DELETED)
@@ -1,13 +1,24 @@
 # apps/doctors/serializers.py
 
 from rest_framework import serializers
+from apps.core.instrumentation import TimedSerializerMixin
+from apps.core.serializers import DynamicFieldsMixin, UniqueFieldsMixin, VersionedUpdateMixin
 from .models import Doctor
 
-class DoctorSerializer(serializers.ModelSerializer):
+class DoctorSerializer(TimedSerializerMixin, DynamicFieldsMixin, UniqueFieldsMixin, VersionedUpdateMixin, serializers.ModelSerializer):
     """
     Serializer for Doctor model.
     Handles CRUD operations for doctors.
+    
+    Email and license number uniqueness is checked in a single query
+    (see UniqueFieldsMixin). Updates write only the changed columns,
+    guarded by If-Match (VersionedUpdateMixin).
     """
+    unique_field_messages = {
+        'email': "A doctor with this email already exists.",
+        'license_number': "A doctor with this license number already exists.",
+    }
+    
     class Meta:
         model = Doctor
         fields = [
@@ -27,48 +38,6 @@ class DoctorSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
-    def validate_email(self, value):
-        """
-        Ensure email is unique for doctors.
-        """
-        instance = self.instance
-        
-        if instance:
-            # Updating
-            if Doctor.objects.exclude(pk=instance.pk).filter(email=value).exists():
-                raise serializers.ValidationError(
-                    "A doctor with this email already exists."
-                )
-        else:
-            # Creating
-            if Doctor.objects.filter(email=value).exists():
-                raise serializers.ValidationError(
-                    "A doctor with this email already exists."
-                )
-        
-        return value
-    
-    def validate_license_number(self, value):
-        """
-        Ensure license number is unique.
-        """
-        instance = self.instance
-        
-        if instance:
-            # Updating
-            if Doctor.objects.exclude(pk=instance.pk).filter(license_number=value).exists():
-                raise serializers.ValidationError(
-                    "A doctor with this license number already exists."
-                )
-        else:
-            # Creating
-            if Doctor.objects.filter(license_number=value).exists():
-                raise serializers.ValidationError(
-                    "A doctor with this license number already exists."
-                )
-        
-        return value
-    
     def validate_experience_years(self, value):
         """
         Ensure experience years is not negative.
@@ -90,7 +59,7 @@ class DoctorSerializer(serializers.ModelSerializer):
         return value
 
 
-class DoctorListSerializer(serializers.ModelSerializer):
+class DoctorListSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Lightweight serializer for listing doctors.
     """
@@ -103,4 +72,25 @@ class DoctorListSerializer(serializers.ModelSerializer):
             'experience_years',
             'consultation_fee',
             'is_available'
-        ]
\ No newline at end of file
+        ]
+
+
+class DoctorAvailabilityItemSerializer(serializers.Serializer):
+    """
+    One entry of an availability batch.
+    """
+    id = serializers.IntegerField(min_value=1)
+    is_available = serializers.BooleanField()
+
+
+class DoctorAvailabilitySerializer(serializers.Serializer):
+    """
+    Input for setting availability of several doctors at once.
+    """
+    doctors = DoctorAvailabilityItemSerializer(many=True, allow_empty=False, max_length=1000)
+    
+    def validate_doctors(self, value):
+        ids = [item['id'] for item in value]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each doctor may only appear once.")
+        return value
\ No newline at end of file
@@ -1,3 +1,313 @@
-from django.test import TestCase
+# apps/doctors/tests.py
 
-# Create your tests here.
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.core.testing import (
+    QueryCountTestCase,
+    make_doctors,
+    make_mappings,
+    make_patients,
+    make_user,
+)
+from apps.changes.models import ChangeEvent
+from apps.jobs.worker import Worker
+from apps.mappings.models import PatientDoctorMapping
+from .models import Doctor
+
+
+def doctor_payload(n):
+    return {
+        'name': f'New Doctor {n}',
+        'email': f'new{n}@doctors.example.com',
+        'phone_number': '+1234567890',
+        'specialization': 'Cardiologist',
+        'qualification': 'MBBS, MD',
+        'experience_years': 5,
+        'license_number': f'NEW-{n}',
+        'clinic_address': '1 Test St',
+        'consultation_fee': '150.00',
+        'is_available': True,
+    }
+
+
+class DoctorViewSetQueryCountTests(QueryCountTestCase):
+    """
+    Every DoctorViewSet action runs the same number of queries
+    whether there are 1, 100 or 1,000 doctors.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.doctor = make_doctors(1, prefix='first')[0]
+
+    def grow_doctors(self, size):
+        missing = size - Doctor.objects.count()
+        if missing > 0:
+            make_doctors(missing)
+
+    def test_list(self):
+        self.assertConstantQueries(
+            self.grow_doctors,
+            lambda n: self.client.get('/api/doctors/')
+        )
+
+    def test_retrieve(self):
+        self.assertConstantQueries(
+            self.grow_doctors,
+            lambda n: self.client.get(f'/api/doctors/{self.doctor.id}/')
+        )
+
+    def test_create(self):
+        self.assertConstantQueries(
+            self.grow_doctors,
+            lambda n: self.client.post('/api/doctors/', doctor_payload(n), format='json')
+        )
+
+    def test_update(self):
+        self.assertConstantQueries(
+            self.grow_doctors,
+            lambda n: self.client.put(
+                f'/api/doctors/{self.doctor.id}/',
+                doctor_payload(n),
+                format='json'
+            )
+        )
+
+    def test_partial_update(self):
+        self.assertConstantQueries(
+            self.grow_doctors,
+            lambda n: self.client.patch(
+                f'/api/doctors/{self.doctor.id}/',
+                {'experience_years': n % 40},
+                format='json'
+            )
+        )
+
+    def test_destroy(self):
+        # The deleted doctor is assigned to N patients
+        targets = {}
+
+        def grow(size):
+            targets[size] = make_doctors(1, prefix=f'target{size}-')[0]
+            make_mappings(make_patients(self.user, size, prefix=f'pat{size}-'), [targets[size]], self.user)
+
+        self.assertConstantQueries(
+            grow,
+            lambda n: self.client.delete(f'/api/doctors/{targets[n].id}/')
+        )
+
+
+class DoctorUniqueFieldsTests(QueryCountTestCase):
+    """
+    Duplicate email/license_number are reported as field errors, found
+    with one query ('query' mode) or from the constraint ('constraint' mode).
+    """
+
+    def setUp(self):
+        self.authenticate(make_user())
+        self.doctor = make_doctors(1)[0]
+        self.payload = doctor_payload(1)
+
+    def test_duplicates_checked_in_one_query(self):
+        payload = dict(self.payload, email=self.doctor.email, license_number=self.doctor.license_number)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/doctors/', payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['details']), {'email', 'license_number'})
+        # User lookup for the JWT + one uniqueness check
+        self.assertEqual(len(queries), 2)
+
+    def test_unchanged_values_not_checked_on_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f'/api/doctors/{self.doctor.id}/',
+                {'email': self.doctor.email, 'license_number': self.doctor.license_number},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('license_number" AS' in q['sql'] for q in queries))
+
+    @override_settings(UNIQUE_VALIDATION_MODE='constraint')
+    def test_constraint_mode(self):
+        payload = dict(self.payload, license_number=self.doctor.license_number)
+        response = self.client.post('/api/doctors/', payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['details'],
+            {'license_number': ['A doctor with this license number already exists.']}
+        )
+        self.assertEqual(Doctor.objects.count(), 1)
+
+
+class DoctorConditionalUpdateTests(QueryCountTestCase):
+    """
+    Doctor updates honour If-Match and skip no-op writes.
+    """
+
+    def setUp(self):
+        self.authenticate(make_user())
+        self.doctor = make_doctors(1)[0]
+        self.url = f'/api/doctors/{self.doctor.id}/'
+
+    def patch(self, data, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, data, format='json', headers=headers)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "doctors"')]
+        return response, updates
+
+    def test_stale_if_match(self):
+        etag = self.client.get(self.url)['ETag']
+        self.patch({'experience_years': 10})
+
+        response, updates = self.patch({'experience_years': 20}, if_match=etag)
+
+        self.assertEqual(response.status_code, 412)
+        self.assertIn('If-Match', response.data['details'])
+        self.assertEqual(updates, [])
+        self.doctor.refresh_from_db()
+        self.assertEqual(self.doctor.experience_years, 10)
+
+    def test_matching_if_match(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response, updates = self.patch({'experience_years': 20}, if_match=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(updates), 1)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_noop_update_writes_nothing(self):
+        response, updates = self.patch({
+            'name': self.doctor.name,
+            'consultation_fee': str(self.doctor.consultation_fee),
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(updates, [])
+        self.assertFalse(ChangeEvent.objects.exists())
+
+
+@override_settings(
+    CASCADE_DELETE_CHUNK_SIZE=10,
+    CASCADE_DELETE_BACKGROUND_THRESHOLD=30,
+)
+class DoctorCascadeDeleteTests(QueryCountTestCase):
+    """
+    Doctors with many mappings are deleted in chunks, and in the
+    background above CASCADE_DELETE_BACKGROUND_THRESHOLD.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.doctor = make_doctors(1)[0]
+
+    def assign_patients(self, count):
+        make_mappings(make_patients(self.user, count), [self.doctor], self.user)
+
+    def test_chunked_delete(self):
+        self.assign_patients(25)
+        response = self.client.delete(f'/api/doctors/{self.doctor.id}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Doctor.objects.filter(id=self.doctor.id).exists())
+        self.assertFalse(PatientDoctorMapping.objects.exists())
+
+    def test_chunked_delete_full_chunks(self):
+        # Ends with an empty SELECT after the last full chunk
+        self.assign_patients(30)
+        response = self.client.delete(f'/api/doctors/{self.doctor.id}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(PatientDoctorMapping.objects.exists())
+
+    def test_background_delete(self):
+        self.assign_patients(35)
+        response = self.client.delete(f'/api/doctors/{self.doctor.id}/')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['job']['name'], 'doctors.delete_doctor')
+        self.assertEqual(response.data['job']['progress'], {'deleted': 0, 'total': 35})
+        self.assertTrue(Doctor.objects.filter(id=self.doctor.id).exists())
+
+        Worker(worker_id='test').run(burst=True)
+
+        status_response = self.client.get(response.data['status_url'])
+        self.assertEqual(status_response.data['job']['status'], 'succeeded')
+        self.assertEqual(status_response.data['job']['progress']['deleted'], 35)
+        self.assertFalse(Doctor.objects.filter(id=self.doctor.id).exists())
+        self.assertFalse(PatientDoctorMapping.objects.exists())
+
+
+class DoctorAvailabilityTests(QueryCountTestCase):
+    """
+    POST /api/doctors/availability/ flips a batch with one UPDATE.
+    """
+    # Batch sizes; above ~999 parameters SQLite splits the change event
+    # bulk INSERT into several statements
+    dataset_sizes = (1, 10, 100)
+
+    def setUp(self):
+        self.authenticate(make_user())
+        self.doctors = make_doctors(3)
+
+    def post(self, states):
+        return self.client.post(
+            '/api/doctors/availability/',
+            {'doctors': [{'id': pk, 'is_available': value} for pk, value in states]},
+            format='json'
+        )
+
+    def test_batch(self):
+        first, second, third = self.doctors
+        Doctor.objects.filter(pk=third.id).update(is_available=False)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post([(first.id, False), (second.id, True), (third.id, True), (999999, False)])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['changed'], [first.id, third.id])
+        self.assertEqual(response.data['not_found'], [999999])
+        self.assertEqual(
+            dict(Doctor.objects.values_list('id', 'is_available')),
+            {first.id: False, second.id: True, third.id: True}
+        )
+
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "doctors"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('CASE WHEN', updates[0])
+        self.assertNotIn('"email"', updates[0])
+        # Unchanged doctors keep their version
+        self.assertEqual(Doctor.objects.get(pk=second.id).updated_at, second.updated_at)
+
+        events = ChangeEvent.objects.filter(entity='doctor', action='updated').order_by('object_id')
+        self.assertEqual([e.object_id for e in events], [first.id, third.id])
+        self.assertFalse(events[0].data['is_available'])
+        self.assertTrue(events[1].data['is_available'])
+
+    def test_constant_queries(self):
+        ids = []
+
+        def grow(size):
+            missing = size - Doctor.objects.count()
+            if missing > 0:
+                make_doctors(missing)
+            Doctor.objects.update(is_available=False)
+            ids[:] = Doctor.objects.values_list('id', flat=True)[:size]
+
+        # Every doctor in the batch changes
+        self.assertConstantQueries(
+            grow,
+            lambda n: self.post([(pk, True) for pk in ids])
+        )
+
+    def test_duplicate_ids(self):
+        response = self.post([(self.doctors[0].id, False), (self.doctors[0].id, True)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('doctors', response.data['details'])
@@ -23,6 +23,7 @@ The router automatically generates these URLs:
 - PUT    /api/doctors/{id}/     -> update a doctor
 - PATCH  /api/doctors/{id}/     -> partial update a doctor
 - DELETE /api/doctors/{id}/     -> delete a doctor
+- POST   /api/doctors/availability/ -> set availability of several doctors
 """
 
 urlpatterns = [
@@ -1,12 +1,23 @@
 # apps/doctors/views.py
 
-from rest_framework import viewsets, status
+from django.db import transaction
+from rest_framework import serializers, viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from apps.changes.models import ChangeEvent
+from apps.changes.outbox import record_change, record_changes
+from apps.changes.sync import IncrementalSyncMixin
+from apps.core.deletion import delete_with_dependents
+from apps.core.serializers import VersionConflict
+from apps.core.views import ConditionalUpdateMixin, DynamicFieldsViewMixin
+from apps.idempotency.mixins import IdempotencyMixin
+from apps.jobs.views import job_accepted_response
 from .models import Doctor
-from .serializers import DoctorSerializer, DoctorListSerializer
+from .replication import on_doctor_deleted, replicate_doctors
+from .serializers import DoctorSerializer, DoctorListSerializer, DoctorAvailabilitySerializer
 
-class DoctorViewSet(viewsets.ModelViewSet):
+class DoctorViewSet(IdempotencyMixin, ConditionalUpdateMixin, DynamicFieldsViewMixin, IncrementalSyncMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing doctors.
     
@@ -16,15 +27,34 @@ class DoctorViewSet(viewsets.ModelViewSet):
     - GET /api/doctors/{id}/ - Retrieve a specific doctor
     - PUT /api/doctors/{id}/ - Update a doctor
     - PATCH /api/doctors/{id}/ - Partial update
+      (send the ETag from a previous read as If-Match to get 412
+      instead of overwriting someone else's change)
     - DELETE /api/doctors/{id}/ - Delete a doctor
+    - POST /api/doctors/availability/ - Set availability of several doctors
     
     All endpoints require authentication.
     Note: Unlike patients, doctors are system-wide resources.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = DoctorSerializer
+    
+    # ?modified_since= on list (apps/changes/sync.py)
+    sync_entity = ChangeEvent.ENTITY_DOCTOR
     queryset = Doctor.objects.all()
     
+    # Max queries per action (checked by apps.core.middleware.RequestTimingMiddleware),
+    # including the user lookup for the JWT
+    # Writes include SAVEPOINT/RELEASE when they run inside a transaction (e.g. tests)
+    query_budgets = {
+        'list': 4,
+        'retrieve': 2,
+        'create': 6,
+        'update': 7,
+        'partial_update': 7,
+        'destroy': 8,
+        'availability': 6,
+    }
+    
     def get_serializer_class(self):
         """
         Use lightweight serializer for list view.
@@ -40,7 +70,26 @@ class DoctorViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         
         if serializer.is_valid():
-            serializer.save()
+            try:
+                # The change event commits or rolls back with the write
+                with transaction.atomic():
+                    doctor = serializer.save()
+                    record_change(
+                        ChangeEvent.ENTITY_DOCTOR,
+                        doctor.pk,
+                        ChangeEvent.ACTION_CREATED,
+                        data=serializer.data
+                    )
+                    replicate_doctors([doctor.pk], ChangeEvent.ACTION_CREATED, {doctor.pk: serializer.data})
+            except serializers.ValidationError as e:
+                # Unique constraint hit by a concurrent request
+                return Response(
+                    {
+                        'error': 'Failed to create doctor',
+                        'details': e.detail
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             return Response(
                 {
                     'message': 'Doctor created successfully',
@@ -64,7 +113,7 @@ class DoctorViewSet(viewsets.ModelViewSet):
         try:
             instance = self.get_object()
             serializer = self.get_serializer(instance)
-            return Response(serializer.data)
+            return self.set_etag(Response(serializer.data), instance)
         except Doctor.DoesNotExist:
             return Response(
                 {'error': 'Doctor not found'},
@@ -85,6 +134,10 @@ class DoctorViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        response = self.check_if_match(instance, 'Failed to update doctor')
+        if response is not None:
+            return response
+        
         serializer = self.get_serializer(
             instance,
             data=request.data,
@@ -92,12 +145,37 @@ class DoctorViewSet(viewsets.ModelViewSet):
         )
         
         if serializer.is_valid():
-            serializer.save()
-            return Response(
-                {
-                    'message': 'Doctor updated successfully',
-                    'doctor': serializer.data
-                }
+            try:
+                # The change event commits or rolls back with the write
+                with transaction.atomic():
+                    doctor = serializer.save()
+                    # A no-op update writes nothing, so there is no change to record
+                    if serializer.changed_fields:
+                        record_change(
+                            ChangeEvent.ENTITY_DOCTOR,
+                            doctor.pk,
+                            ChangeEvent.ACTION_UPDATED,
+                            data=serializer.data
+                        )
+                        replicate_doctors([doctor.pk], ChangeEvent.ACTION_UPDATED, {doctor.pk: serializer.data})
+            except serializers.ValidationError as e:
+                return Response(
+                    {
+                        'error': 'Failed to update doctor',
+                        'details': e.detail
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            except VersionConflict:
+                return self.precondition_failed('Failed to update doctor')
+            return self.set_etag(
+                Response(
+                    {
+                        'message': 'Doctor updated successfully',
+                        'doctor': serializer.data
+                    }
+                ),
+                doctor
             )
         
         return Response(
@@ -121,7 +199,19 @@ class DoctorViewSet(viewsets.ModelViewSet):
         """
         try:
             instance = self.get_object()
-            instance.delete()
+            
+            # Mappings are deleted in chunks first; very large fan-outs
+            # run as a background job (see apps/core/deletion.py)
+            job = delete_with_dependents(
+                instance,
+                instance.patient_mappings.all(),
+                'doctors.delete_doctor',
+                owner=request.user,
+                on_delete=on_doctor_deleted
+            )
+            if job is not None:
+                return job_accepted_response(job, 'Doctor deletion started')
+            
             return Response(
                 {'message': 'Doctor deleted successfully'},
                 status=status.HTTP_204_NO_CONTENT
@@ -135,13 +225,88 @@ class DoctorViewSet(viewsets.ModelViewSet):
     def list(self, request, *args, **kwargs):
         """
         List all doctors.
+        
+        With ?modified_since=<ISO datetime> only rows changed since then
+        are returned, plus the ids deleted since then in `deleted`.
+        Clients pass the returned next_modified_since on their next sync.
         """
-        queryset = self.get_queryset()
+        try:
+            since = self.get_modified_since()
+        except serializers.ValidationError as e:
+            return Response(
+                {
+                    'error': 'Failed to list doctors',
+                    'details': e.detail
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        watermark = self.next_watermark()
+        queryset = self.filter_modified_since(self.filter_queryset(self.get_queryset()), since)
         serializer = self.get_serializer(queryset, many=True)
         
+        data = {
+            'count': queryset.count(),
+            'doctors': serializer.data,
+            'next_modified_since': watermark
+        }
+        if since is not None:
+            data['deleted'] = self.get_tombstones(since)
+        
+        return Response(data)
+    
+    @action(detail=False, methods=['post'])
+    def availability(self, request):
+        """
+        Set is_available for several doctors at once.
+        URL: POST /api/doctors/availability/
+        Body: {"doctors": [{"id": 1, "is_available": false}, ...]}
+        
+        Applied with one UPDATE (see DoctorQuerySet.set_availability);
+        the other doctor fields are neither validated nor rewritten.
+        Doctors whose updated_at changes show up in ?modified_since=
+        lists and the change feed like any other update. Ids that
+        don't exist are returned in not_found.
+        """
+        serializer = DoctorAvailabilitySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {
+                    'error': 'Failed to update availability',
+                    'details': serializer.errors
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        states = {item['id']: item['is_available'] for item in serializer.validated_data['doctors']}
+        
+        # The change events commit or roll back with the UPDATE
+        with transaction.atomic():
+            doctors, changed = Doctor.objects.set_availability(states)
+            if changed:
+                changed_ids = set(changed)
+                data = DoctorSerializer(
+                    [doctor for doctor in doctors if doctor.pk in changed_ids],
+                    many=True
+                ).data
+                data = {item['id']: item for item in data}
+                record_changes(
+                    ChangeEvent.ENTITY_DOCTOR,
+                    changed,
+                    ChangeEvent.ACTION_UPDATED,
+                    data=data
+                )
+                replicate_doctors(changed, ChangeEvent.ACTION_UPDATED, data)
+        
+        found = {doctor.pk for doctor in doctors}
         return Response(
             {
-                'count': queryset.count(),
-                'doctors': serializer.data
+                'message': f'{len(changed)} doctor(s) updated successfully',
+                'doctors': [
+                    {'id': doctor.pk, 'is_available': doctor.is_available}
+                    for doctor in doctors
+                ],
+                'changed': changed,
+                'not_found': [pk for pk in states if pk not in found]
             }
         )
\ No newline at end of file
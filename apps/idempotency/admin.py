@@ -0,0 +1,15 @@
+# apps/idempotency/admin.py
+
+from django.contrib import admin
+from apps.core.admin import LargeTableAdminMixin
+from .models import IdempotencyKey
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Admin interface for stored Idempotency-Key responses"""
+    list_display = ['key', 'user', 'status_code', 'created_at', 'expires_at']
+    list_filter = ['status_code']
+    search_fields = ['=key']
+    readonly_fields = ['user', 'key', 'fingerprint', 'status_code', 'content_type', 'created_at', 'expires_at']
+    exclude = ['response_body']
+    list_select_related = ['user']
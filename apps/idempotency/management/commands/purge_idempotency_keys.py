@@ -0,0 +1,15 @@
+# apps/idempotency/management/commands/purge_idempotency_keys.py
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.core.deletion import delete_in_chunks
+from apps.idempotency.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete expired Idempotency-Key responses (run periodically, e.g. from cron).'
+
+    def handle(self, *args, **options):
+        deleted = delete_in_chunks(IdempotencyKey.objects.filter(expires_at__lte=timezone.now()))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired key(s)'))
@@ -0,0 +1,173 @@
+# apps/idempotency/mixins.py
+
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+"""
+Idempotency-Key support for ViewSet actions.
+
+    POST /api/patients/
+    Idempotency-Key: 2f1c7a9e-...
+
+The first request with a key claims it (an IdempotencyKey row with no
+status yet), runs normally and stores its response. Repeats with the
+same key and the same request get that stored response back with an
+`Idempotent-Replayed: true` header, without running the view. Requests
+without the header are not affected.
+
+- same key, different method/path/body -> 422
+- same key while the first request is still running -> 409
+- 5xx responses and unhandled errors are not stored, so the client can
+  retry them
+"""
+
+HEADER = 'Idempotency-Key'
+
+
+class _ShortCircuit(Exception):
+    """
+    Raised from initial() to answer without running the action.
+    """
+
+    def __init__(self, response):
+        self.response = response
+
+
+class IdempotencyMixin:
+    """
+    ViewSet mixin: honour Idempotency-Key on `idempotent_actions`.
+    """
+    idempotent_actions = ('create',)
+    
+    # Queries added to the action's query budget when a key is sent:
+    # SELECT, INSERT (in a SAVEPOINT or BEGIN/COMMIT) and the UPDATE
+    # storing the response
+    idempotency_query_budget = 5
+    
+    _idempotency_claim = None
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(HEADER)
+        if key is None or self.action not in self.idempotent_actions or not request.user.is_authenticated:
+            return
+        
+        metrics = getattr(request._request, 'perf_metrics', None)
+        if metrics is not None and metrics.query_budget is not None:
+            metrics.query_budget += self.idempotency_query_budget
+        
+        if not key or len(key) > 255:
+            raise _ShortCircuit(Response(
+                {
+                    'error': 'Invalid Idempotency-Key',
+                    'details': 'Expected 1 to 255 characters.'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            ))
+        
+        fingerprint = hashlib.sha256(
+            b'\n'.join([request.method.encode(), request.get_full_path().encode(), request.body])
+        ).hexdigest()
+        self._idempotency_claim = self._claim_key(request.user, key, fingerprint)
+    
+    def _claim_key(self, user, key, fingerprint):
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        
+        if record is not None:
+            stale = record.status_code is None and \
+                record.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+            if record.expires_at <= now or stale:
+                # Expired, or abandoned by a process that died mid-request:
+                # take the row over, unless a concurrent retry got there first
+                taken = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).update(
+                    fingerprint=fingerprint,
+                    status_code=None,
+                    content_type='',
+                    response_body=b'',
+                    created_at=now,
+                    expires_at=expires_at
+                )
+                if not taken:
+                    raise _ShortCircuit(self._in_progress())
+                return record
+            if record.fingerprint != fingerprint:
+                raise _ShortCircuit(Response(
+                    {'error': 'This Idempotency-Key was already used with a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                ))
+            elif record.status_code is None:
+                raise _ShortCircuit(self._in_progress())
+            else:
+                replay = HttpResponse(
+                    bytes(record.response_body),
+                    status=record.status_code,
+                    content_type=record.content_type
+                )
+                replay['Idempotent-Replayed'] = 'true'
+                raise _ShortCircuit(replay)
+        
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=user,
+                    key=key,
+                    fingerprint=fingerprint,
+                    created_at=now,
+                    expires_at=expires_at
+                )
+        except IntegrityError:
+            # A concurrent request claimed it first
+            raise _ShortCircuit(self._in_progress())
+    
+    def _in_progress(self):
+        return Response(
+            {'error': 'A request with this Idempotency-Key is still in progress'},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    def _release_claim(self):
+        claim, self._idempotency_claim = self._idempotency_claim, None
+        if claim is not None:
+            IdempotencyKey.objects.filter(pk=claim.pk).delete()
+    
+    def handle_exception(self, exc):
+        if isinstance(exc, _ShortCircuit):
+            return exc.response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            self._release_claim()
+            raise
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        claim, self._idempotency_claim = self._idempotency_claim, None
+        if claim is None:
+            return response
+        
+        if response.status_code >= 500:
+            IdempotencyKey.objects.filter(pk=claim.pk).delete()
+            return response
+        
+        def store(rendered):
+            IdempotencyKey.objects.filter(pk=claim.pk).update(
+                status_code=rendered.status_code,
+                content_type=rendered.get('Content-Type', ''),
+                response_body=rendered.content
+            )
+        
+        if getattr(response, 'is_rendered', True):
+            store(response)
+        else:
+            response.add_post_render_callback(store)
+        return response
@@ -0,0 +1,50 @@
+# apps/idempotency/models.py
+
+from django.db import models
+from django.conf import settings
+
+class IdempotencyKey(models.Model):
+    """
+    The stored outcome of a POST sent with an Idempotency-Key header.
+    
+    Why?
+    - A client that timed out can resend the same request with the same
+      key and get the original response back, byte for byte
+    - The replay is one indexed lookup: no validation, serializers or
+      writes to the domain tables run a second time
+    
+    status_code is NULL while the first request is still running.
+    Rows expire after IDEMPOTENCY_KEY_TTL seconds (see
+    `manage.py purge_idempotency_keys`).
+    """
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    key = models.CharField(max_length=255)
+    
+    # sha256 of method, path and body; a reused key must match it
+    fingerprint = models.CharField(max_length=64)
+    
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    response_body = models.BinaryField(blank=True, default=b'')
+    
+    created_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id}:{self.key} ({self.status_code or 'in progress'})"
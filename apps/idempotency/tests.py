@@ -0,0 +1,105 @@
+# apps/idempotency/tests.py
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.core.testing import QueryCountTestCase, make_doctors, make_patients, make_user
+from apps.mappings.models import PatientDoctorMapping
+from apps.patients.models import Patient
+from .models import IdempotencyKey
+
+
+class IdempotencyKeyTests(QueryCountTestCase):
+    """
+    Retried POSTs with the same Idempotency-Key replay the stored
+    response without running the view again.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.body = {
+            'name': 'Alice',
+            'email': 'alice@example.com',
+            'phone_number': '+1234567890',
+        }
+
+    def post(self, url, body, key='key-1'):
+        return self.client.post(url, body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay(self):
+        first = self.post('/api/patients/', self.body)
+        self.assertEqual(first.status_code, 201)
+
+        # User lookup + key lookup; no validation or writes
+        with self.assertNumQueries(2):
+            second = self.post('/api/patients/', self.body)
+
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Patient.objects.count(), 1)
+
+    def test_validation_errors_are_replayed(self):
+        body = {**self.body, 'email': 'not-an-email'}
+        first = self.post('/api/patients/', body)
+        self.assertEqual(first.status_code, 400)
+
+        self.assertEqual(self.post('/api/patients/', body).content, first.content)
+
+    def test_different_request_same_key(self):
+        self.post('/api/patients/', self.body)
+
+        response = self.post('/api/patients/', {**self.body, 'name': 'Bob'})
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_in_progress(self):
+        self.post('/api/patients/', self.body)
+        # As if the first request were still running
+        IdempotencyKey.objects.update(status_code=None)
+
+        self.assertEqual(self.post('/api/patients/', self.body).status_code, 409)
+
+        # ...until IDEMPOTENCY_LOCK_TIMEOUT says it was abandoned
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        Patient.objects.all().delete()
+        self.assertEqual(self.post('/api/patients/', self.body).status_code, 201)
+
+    def test_expired_key_runs_again(self):
+        self.post('/api/patients/', self.body)
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        Patient.objects.all().delete()
+
+        response = self.post('/api/patients/', self.body)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Patient.objects.count(), 1)
+
+    def test_keys_are_per_user(self):
+        self.post('/api/patients/', self.body)
+        self.authenticate(make_user('other@example.com'))
+
+        response = self.post('/api/patients/', {**self.body, 'email': 'other@example.com'})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_mapping_create(self):
+        patient = make_patients(self.user, 1)[0]
+        doctor = make_doctors(1)[0]
+        body = {'patient': patient.id, 'doctor': doctor.id}
+
+        first = self.post('/api/mappings/', body)
+        second = self.post('/api/mappings/', body)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(PatientDoctorMapping.objects.count(), 1)
+
+    def test_without_header(self):
+        self.client.post('/api/patients/', self.body, format='json')
+        self.assertFalse(IdempotencyKey.objects.exists())
@@ -0,0 +1,26 @@
+# apps/jobs/admin.py
+
+from django.contrib import admin
+from django.utils import timezone
+from apps.core.admin import LargeTableAdminMixin
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Admin interface for background jobs"""
+    list_display = ['id', 'name', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'created_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'locked_by']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'locked_by', 'locked_at', 'error']
+    list_select_related = ['created_by']
+    actions = ['retry_jobs']
+    
+    @admin.action(description='Retry selected jobs now')
+    def retry_jobs(self, request, queryset):
+        count = queryset.exclude(status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_QUEUED,
+            attempts=0,
+            run_at=timezone.now(),
+            error=''
+        )
+        self.message_user(request, f'{count} job(s) queued again.')
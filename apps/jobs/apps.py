@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.jobs'
+    label = 'jobs'
+
+    def ready(self):
+        # Register the @job functions declared in every app's jobs.py
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('jobs')
@@ -0,0 +1,53 @@
+# apps/jobs/management/commands/run_worker.py
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run a background job worker (see apps/jobs/worker.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling forever'
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=None,
+            help='Exit after running this many jobs'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='Seconds to sleep when the queue is empty (default: JOB_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--worker-id',
+            default=None,
+            help='Name recorded on claimed jobs (default: hostname:pid)'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            worker_id=options['worker_id'],
+            poll_interval=options['poll_interval']
+        )
+
+        # Finish the current job, then exit
+        def stop(signum, frame):
+            self.stdout.write('Stopping after the current job...')
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f'Worker {worker.worker_id} started')
+        processed = worker.run(burst=options['burst'], max_jobs=options['max_jobs'])
+        self.stdout.write(self.style.SUCCESS(f'Worker stopped, {processed} job(s) run'))
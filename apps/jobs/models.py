@@ -0,0 +1,97 @@
+# apps/jobs/models.py
+
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+
+class Job(models.Model):
+    """
+    A unit of background work, stored in the database.
+
+    Why a database-backed queue?
+    - No broker (Redis/RabbitMQ) to run, locally or in production
+    - Jobs are enqueued in the same transaction as the data they act on
+    - Status and progress can be read with a normal query
+
+    Workers (manage.py run_worker) claim jobs with
+    SELECT ... FOR UPDATE SKIP LOCKED, so several workers can poll the
+    same table without taking each other's jobs.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    # Registered job name, e.g. 'doctors.delete_doctor'
+    name = models.CharField(max_length=100)
+
+    # Keyword arguments for the job function (must be JSON-serializable)
+    payload = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED
+    )
+
+    # Higher runs first
+    priority = models.SmallIntegerField(default=0)
+
+    # Not picked up before this time (used for retry backoff)
+    run_at = models.DateTimeField(default=timezone.now)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+
+    # Worker that currently holds the job
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    # Reported by the job while running, e.g. {'deleted': 5000, 'total': 120000}
+    progress = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    # Who enqueued this job (only they can see it through the API)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'jobs'
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        ordering = ['-created_at']
+        indexes = [
+            # Worker poll: status = queued ORDER BY priority DESC, run_at
+            models.Index(fields=['status', '-priority', 'run_at']),
+            models.Index(fields=['created_by', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    def set_progress(self, **values):
+        """
+        Merge `values` into progress and save it right away, so the
+        status endpoint can show it while the job is still running.
+        Also refreshes locked_at: a job reporting progress is alive.
+        """
+        self.progress = {**self.progress, **values}
+        self.locked_at = timezone.now()
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, locked_at=self.locked_at)
@@ -0,0 +1,91 @@
+# apps/jobs/registry.py
+
+from django.conf import settings
+from django.utils import timezone
+
+"""
+Job registration and enqueueing.
+
+Declare a job in any app's jobs.py (found by JobsConfig.ready):
+
+    from apps.jobs.registry import job
+
+    @job('doctors.delete_doctor', priority=5)
+    def delete_doctor(job, doctor_id):
+        ...
+
+and enqueue it from a view:
+
+    enqueue('doctors.delete_doctor', doctor_id=doctor.id, created_by=request.user)
+
+The function receives the Job row first (for job.set_progress()) and
+the payload as keyword arguments. Whatever it returns is stored in
+Job.result, so it must be JSON-serializable.
+"""
+
+_registry = {}
+
+
+class JobNotRegistered(LookupError):
+    pass
+
+
+class RegisteredJob:
+    """
+    A job function plus its defaults.
+    """
+
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, job, **payload):
+        return self.func(job, **payload)
+
+    def enqueue(self, **kwargs):
+        return enqueue(self.name, **kwargs)
+
+
+def job(name, priority=0, max_attempts=None):
+    """
+    Register the decorated function as job `name`.
+    """
+    def decorator(func):
+        registered = RegisteredJob(
+            func,
+            name,
+            priority,
+            max_attempts or settings.JOB_DEFAULT_MAX_ATTEMPTS
+        )
+        _registry[name] = registered
+        return registered
+    return decorator
+
+
+def get_job(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise JobNotRegistered(f'No job registered as {name!r}')
+
+
+def enqueue(name, *, priority=None, run_at=None, created_by=None, using=None, **payload):
+    """
+    Create a queued Job for the registered job `name`.
+
+    Enqueue inside the transaction that changes the data the job works
+    on: if the transaction rolls back, the job disappears with it.
+    """
+    from .models import Job
+
+    registered = get_job(name)
+    return Job.objects.db_manager(using).create(
+        name=name,
+        payload=payload,
+        priority=registered.priority if priority is None else priority,
+        max_attempts=registered.max_attempts,
+        run_at=run_at or timezone.now(),
+        created_by=created_by,
+    )
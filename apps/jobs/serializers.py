@@ -0,0 +1,29 @@
+# apps/jobs/serializers.py
+
+from rest_framework import serializers
+from apps.core.serializers import DynamicFieldsMixin
+from .models import Job
+
+class JobSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Read-only view of a job's status, progress and outcome.
+    """
+    
+    class Meta:
+        model = Job
+        fields = [
+            'id',
+            'name',
+            'status',
+            'priority',
+            'attempts',
+            'max_attempts',
+            'progress',
+            'result',
+            'error',
+            'run_at',
+            'created_at',
+            'started_at',
+            'finished_at'
+        ]
+        read_only_fields = fields
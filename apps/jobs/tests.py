@@ -0,0 +1,151 @@
+# apps/jobs/tests.py
+
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.core.testing import QueryCountTestCase, make_user
+from .models import Job
+from .registry import enqueue, job
+from .worker import Worker
+
+calls = []
+
+
+@job('tests.record', max_attempts=2)
+def record(job, value):
+    calls.append(value)
+    job.set_progress(done=True)
+    return {'value': value}
+
+
+@job('tests.slow')
+def slow(job):
+    time.sleep(0.2)
+
+
+@job('tests.flaky', max_attempts=2)
+def flaky(job):
+    raise RuntimeError('boom')
+
+
+class WorkerTests(TestCase):
+    """
+    Claiming, priorities, retries and stale job recovery.
+    """
+
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(worker_id='test')
+
+    def test_runs_job(self):
+        queued = enqueue('tests.record', value=1)
+
+        self.assertEqual(self.worker.run(burst=True), 1)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(queued.result, {'value': 1})
+        self.assertEqual(queued.progress, {'done': True})
+        self.assertEqual(queued.attempts, 1)
+
+    def test_priority_order(self):
+        enqueue('tests.record', value='low')
+        enqueue('tests.record', value='high', priority=10)
+        enqueue('tests.record', value='later', run_at=timezone.now() + timedelta(hours=1))
+
+        self.worker.run(burst=True)
+
+        self.assertEqual(calls, ['high', 'low'])
+
+    @override_settings(JOB_RETRY_BACKOFF=60)
+    def test_retry_then_fail(self):
+        queued = enqueue('tests.flaky')
+
+        self.worker.run(burst=True)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.STATUS_QUEUED)
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=50))
+        self.assertIn('RuntimeError: boom', queued.error)
+
+        # Backoff elapsed
+        Job.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        self.worker.run(burst=True)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.STATUS_FAILED)
+        self.assertEqual(queued.attempts, 2)
+
+    @override_settings(JOB_LEASE_TIMEOUT=60)
+    def test_requeue_stale(self):
+        queued = enqueue('tests.record', value=1)
+        Job.objects.filter(pk=queued.pk).update(
+            status=Job.STATUS_RUNNING,
+            locked_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        self.worker.run(burst=True)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.STATUS_SUCCEEDED)
+
+    @override_settings(JOB_LEASE_TIMEOUT=60)
+    def test_progress_extends_lease(self):
+        enqueue('tests.record', value=1)
+        claimed = self.worker.claim()
+        Job.objects.filter(pk=claimed.pk).update(locked_at=timezone.now() - timedelta(minutes=5))
+
+        claimed.set_progress(done=False)
+
+        self.assertEqual(self.worker.requeue_stale(), 0)
+
+    def test_touch(self):
+        enqueue('tests.record', value=1)
+        claimed = self.worker.claim()
+        old = timezone.now() - timedelta(minutes=5)
+        Job.objects.filter(pk=claimed.pk).update(locked_at=old)
+
+        self.assertTrue(self.worker.touch(claimed))
+        self.assertGreater(Job.objects.get(pk=claimed.pk).locked_at, old)
+        # Another worker's job is left alone
+        self.assertFalse(Worker(worker_id='other').touch(claimed))
+
+    @override_settings(JOB_HEARTBEAT_INTERVAL=0.01)
+    def test_heartbeat_while_running(self):
+        queued = enqueue('tests.slow')
+
+        with mock.patch.object(Worker, 'touch') as touch:
+            self.worker.run(burst=True)
+
+        self.assertGreater(touch.call_count, 1)
+        self.assertEqual(touch.call_args.args[0].pk, queued.pk)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.STATUS_SUCCEEDED)
+
+
+class JobViewSetTests(QueryCountTestCase):
+    """
+    Users only see the jobs they enqueued.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.job = enqueue('tests.record', value=1, created_by=self.user)
+        self.other_job = enqueue('tests.record', value=2, created_by=make_user('other@example.com'))
+
+    def test_list(self):
+        response = self.client.get('/api/jobs/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['jobs']], [self.job.id])
+
+    def test_retrieve(self):
+        response = self.client.get(f'/api/jobs/{self.job.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['job']['status'], Job.STATUS_QUEUED)
+
+        response = self.client.get(f'/api/jobs/{self.other_job.id}/')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,23 @@
+# apps/jobs/urls.py
+
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import JobViewSet
+
+"""
+Background job URL patterns.
+All job endpoints are prefixed with /api/jobs/
+"""
+
+router = DefaultRouter()
+router.register(r'', JobViewSet, basename='job')
+
+"""
+The router automatically generates these URLs:
+- GET    /api/jobs/          -> list your jobs
+- GET    /api/jobs/{id}/     -> status of one job
+"""
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,70 @@
+# apps/jobs/views.py
+
+from rest_framework import viewsets, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .models import Job
+from .serializers import JobSerializer
+
+def job_accepted_response(job, message):
+    """
+    202 response for work that was moved to a background job.
+    """
+    return Response(
+        {
+            'message': message,
+            'job': JobSerializer(job).data,
+            'status_url': f'/api/jobs/{job.pk}/'
+        },
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status of background jobs started by the current user.
+    
+    Endpoints:
+    - GET /api/jobs/ - List your jobs (newest first)
+    - GET /api/jobs/{id}/ - Status, progress and result of one job
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = JobSerializer
+    
+    # Max queries per action (checked by apps.core.middleware.RequestTimingMiddleware),
+    # including the user lookup for the JWT
+    query_budgets = {
+        'list': 3,
+        'retrieve': 2,
+    }
+    
+    def get_queryset(self):
+        """
+        Return only jobs enqueued by the current user.
+        """
+        return Job.objects.filter(created_by=self.request.user)
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List the current user's jobs, optionally filtered by ?status=.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        job_status = request.query_params.get('status')
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+        serializer = self.get_serializer(queryset, many=True)
+        
+        return Response(
+            {
+                'count': queryset.count(),
+                'jobs': serializer.data
+            }
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get the status of a single job.
+        """
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return Response({'job': serializer.data})
@@ -0,0 +1,211 @@
+# apps/jobs/worker.py
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, close_old_connections, connections, transaction
+from django.utils import timezone
+
+from apps.core.sharding import sharding_enabled, use_shard
+from .models import Job
+from .registry import JobNotRegistered, get_job
+
+"""
+Job worker: claims queued jobs one at a time and runs them.
+
+Claiming is one short transaction:
+
+    SELECT ... WHERE status = 'queued' AND run_at <= now()
+    ORDER BY priority DESC, run_at, id
+    LIMIT 1 FOR UPDATE SKIP LOCKED
+
+followed by an UPDATE to 'running'. The job itself runs outside that
+transaction, so a long job holds no locks.
+
+Failed jobs are retried with exponential backoff
+(JOB_RETRY_BACKOFF * 2 ** (attempt - 1) seconds) until max_attempts.
+While a job runs, its locked_at is refreshed every JOB_HEARTBEAT_INTERVAL
+seconds (and on every job.set_progress()). Running jobs whose locked_at
+is older than JOB_LEASE_TIMEOUT (e.g. the worker was killed) are put
+back in the queue; long jobs with a live worker are not.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Worker:
+
+    def __init__(self, worker_id=None, poll_interval=None):
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval if poll_interval is not None else settings.JOB_POLL_INTERVAL
+        self._stopping = False
+
+    def stop(self):
+        self._stopping = True
+
+    def claim(self):
+        """
+        Lock the next runnable job and mark it running. Returns None if
+        the queue is empty.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                Job.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=Job.STATUS_QUEUED, run_at__lte=now)
+                .order_by('-priority', 'run_at', 'id')
+                .first()
+            )
+            if job is None:
+                return None
+
+            job.status = Job.STATUS_RUNNING
+            job.attempts += 1
+            job.locked_by = self.worker_id
+            job.locked_at = now
+            job.started_at = job.started_at or now
+            job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at', 'started_at'])
+        return job
+
+    def run_job(self, job):
+        """
+        Run a claimed job and record the outcome.
+        """
+        logger.info('Running %s (attempt %s/%s)', job, job.attempts, job.max_attempts)
+        try:
+            with self._heartbeat(job), use_shard(self._shard_for(job)):
+                result = get_job(job.name)(job, **job.payload)
+        except Exception as exc:
+            self._fail(job, exc)
+        else:
+            job.status = Job.STATUS_SUCCEEDED
+            job.result = result
+            job.error = ''
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+            logger.info('Finished %s', job)
+
+    @contextmanager
+    def _heartbeat(self, job):
+        """
+        Call touch(job) every JOB_HEARTBEAT_INTERVAL seconds from a
+        background thread until the block exits.
+        """
+        interval = settings.JOB_HEARTBEAT_INTERVAL
+        if interval <= 0:
+            yield
+            return
+
+        stopped = threading.Event()
+
+        def beat():
+            try:
+                while not stopped.wait(interval):
+                    try:
+                        self.touch(job)
+                    except DatabaseError as exc:
+                        logger.warning('Heartbeat for %s failed: %s', job, exc)
+            finally:
+                # The thread's own connection
+                connections.close_all()
+
+        thread = threading.Thread(target=beat, name=f'job-heartbeat-{job.pk}', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def touch(self, job):
+        """
+        Extend this worker's lease on a running job. Returns False if the
+        job is no longer held by this worker (e.g. it was requeued).
+        """
+        return bool(
+            Job.objects
+            .filter(pk=job.pk, status=Job.STATUS_RUNNING, locked_by=self.worker_id)
+            .update(locked_at=timezone.now())
+        )
+
+    def _shard_for(self, job):
+        """
+        Shard of the user who enqueued `job`; sharded models used by the
+        job are routed there (apps/core/sharding.py).
+        """
+        if not sharding_enabled() or job.created_by_id is None:
+            return DEFAULT_DB_ALIAS
+        shard = get_user_model().objects.filter(pk=job.created_by_id).values_list('shard', flat=True).first()
+        return shard or DEFAULT_DB_ALIAS
+
+    def _fail(self, job, exc):
+        job.error = ''.join(traceback.format_exception(exc))
+        retry = job.attempts < job.max_attempts and not isinstance(exc, JobNotRegistered)
+        if retry:
+            delay = settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            job.status = Job.STATUS_QUEUED
+            job.run_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning('%s failed, retrying in %ss: %s', job, delay, exc)
+        else:
+            job.status = Job.STATUS_FAILED
+            job.finished_at = timezone.now()
+            logger.error('%s failed permanently: %s', job, exc)
+        job.locked_by = ''
+        job.save(update_fields=['status', 'run_at', 'error', 'locked_by', 'finished_at'])
+
+    def requeue_stale(self):
+        """
+        Put back jobs whose worker stopped without finishing them (no
+        heartbeat for JOB_LEASE_TIMEOUT seconds).
+        """
+        cutoff = timezone.now() - timedelta(seconds=settings.JOB_LEASE_TIMEOUT)
+        count = Job.objects.filter(
+            status=Job.STATUS_RUNNING,
+            locked_at__lt=cutoff
+        ).update(status=Job.STATUS_QUEUED, locked_by='')
+        if count:
+            logger.warning('Requeued %s stale job(s)', count)
+        return count
+
+    def run_once(self):
+        """
+        Claim and run one job. Returns False if there was nothing to do.
+        """
+        job = self.claim()
+        if job is None:
+            return False
+        self.run_job(job)
+        return True
+
+    def run(self, burst=False, max_jobs=None):
+        """
+        Process jobs until stopped. With burst=True, stop as soon as the
+        queue is empty. Returns the number of jobs run.
+        """
+        processed = 0
+        self.requeue_stale()
+        while not self._stopping:
+            close_old_connections()
+            if not self.run_once():
+                if burst:
+                    break
+                time.sleep(self.poll_interval)
+                self.requeue_stale()
+                continue
+            processed += 1
+            if max_jobs is not None and processed >= max_jobs:
+                break
+        return processed
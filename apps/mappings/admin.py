@@ -1,16 +1,22 @@
 # apps/mappings/admin.py
 
 from django.contrib import admin
-from .models import PatientDoctorMapping
+from apps.core.admin import LargeTableAdminMixin
+from .models import MappingArchive, PatientDoctorMapping
 
 @admin.register(PatientDoctorMapping)
-class PatientDoctorMappingAdmin(admin.ModelAdmin):
+class PatientDoctorMappingAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Admin interface for Patient-Doctor Mapping"""
     list_display = ['patient', 'doctor', 'assigned_by', 'assigned_date', 'is_active']
     list_filter = ['is_active', 'assigned_date']
     search_fields = ['patient__name', 'doctor__name']
     readonly_fields = ['assigned_date']
     
+    # One joined query per page instead of 3 per row
+    list_select_related = ['patient', 'doctor', 'assigned_by']
+    # Plain id inputs: a <select> would load every patient and doctor
+    raw_id_fields = ['patient', 'doctor', 'assigned_by']
+    
     fieldsets = (
         ('Mapping Details', {
             'fields': ('patient', 'doctor', 'assigned_by')
@@ -18,4 +24,14 @@ class PatientDoctorMappingAdmin(admin.ModelAdmin):
         ('Additional Information', {
             'fields': ('notes', 'is_active', 'assigned_date')
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(MappingArchive)
+class MappingArchiveAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Admin interface for archived mappings (read through the history API)"""
+    list_display = ['patient', 'count', 'first_assigned', 'last_assigned', 'archived_at']
+    readonly_fields = ['patient', 'count', 'first_assigned', 'last_assigned', 'archived_at']
+    # The compressed payload isn't editable
+    exclude = ['data']
+    list_select_related = ['patient']
\ No newline at end of file
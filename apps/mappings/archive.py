@@ -0,0 +1,136 @@
+# apps/mappings/archive.py
+
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core.sharding import for_each_shard
+from .models import MappingArchive, PatientDoctorMapping
+from .serializers import MappingHistorySerializer
+
+"""
+Archiving inactive mappings.
+
+Mappings that are inactive and were assigned more than
+MAPPING_ARCHIVE_AFTER_DAYS ago are moved from patient_doctor_mappings to
+patient_doctor_mappings_archive (MappingArchive), MAPPING_ARCHIVE_CHUNK_SIZE
+rows per transaction:
+
+1. SELECT the next chunk in (assigned_date, id) order, locking the rows
+   (FOR UPDATE SKIP LOCKED on PostgreSQL: rows being edited are left for
+   the next run)
+2. INSERT one compressed MappingArchive row per patient in the chunk
+3. DELETE the chunk from the hot table
+
+Walking the assigned_date index from the oldest row keeps each chunk's
+SELECT short; on PostgreSQL it only touches the oldest partitions
+(partitioning.py). Deleting an archived mapping frees its (patient,
+doctor) pair, so the doctor can be assigned again.
+
+Archiving isn't a change: no change event is recorded, and feed clients
+keep the last state they saw (inactive). Archived mappings are only
+read by GET /api/mappings/patient/{id}/history/?archived=true.
+"""
+
+
+def archive_cutoff(days=None, now=None):
+    """
+    Mappings assigned before this instant can be archived.
+    """
+    days = settings.MAPPING_ARCHIVE_AFTER_DAYS if days is None else days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def _archive_chunk(candidates, chunk_size, after):
+    """
+    Archive the next chunk after the (assigned_date, id) key `after`.
+    Returns (rows archived, key of the last row or None when done).
+    """
+    if after is not None:
+        date, pk = after
+        candidates = candidates.filter(Q(assigned_date__gt=date) | Q(assigned_date=date, pk__gt=pk))
+
+    using = router.db_for_write(PatientDoctorMapping)
+    with transaction.atomic(using=using):
+        mappings = list(
+            candidates.select_related('doctor').only(
+                'id', 'patient_id', 'doctor_id', 'doctor__name', 'doctor__specialization',
+                'assigned_by_id', 'assigned_date', 'notes', 'is_active'
+            ).select_for_update(skip_locked=True, of=('self',)).order_by('assigned_date', 'id')[:chunk_size]
+        )
+        if not mappings:
+            return 0, None
+
+        archives = []
+        by_patient = sorted(mappings, key=lambda mapping: (mapping.patient_id, mapping.assigned_date))
+        for patient_id, group in groupby(by_patient, key=lambda mapping: mapping.patient_id):
+            group = list(group)
+            archives.append(MappingArchive(
+                patient_id=patient_id,
+                first_assigned=group[0].assigned_date,
+                last_assigned=group[-1].assigned_date,
+                count=len(group),
+                data=MappingArchive.pack(MappingHistorySerializer(reversed(group), many=True).data)
+            ))
+        MappingArchive.objects.bulk_create(archives)
+        PatientDoctorMapping._base_manager.using(using).filter(
+            pk__in=[mapping.pk for mapping in mappings]
+        )._raw_delete(using)
+
+    last = mappings[-1]
+    if len(mappings) < chunk_size:
+        return len(mappings), None
+    return len(mappings), (last.assigned_date, last.pk)
+
+
+def archive_mappings(before=None, chunk_size=None, on_progress=None):
+    """
+    Archive the inactive mappings assigned before `before` (default:
+    archive_cutoff()) on the active shard. `on_progress(count)` is called
+    after each chunk. Returns the number of mappings archived.
+    """
+    before = before or archive_cutoff()
+    chunk_size = chunk_size or settings.MAPPING_ARCHIVE_CHUNK_SIZE
+    candidates = PatientDoctorMapping.objects.filter(is_active=False, assigned_date__lt=before)
+
+    archived = 0
+    after = None
+    while True:
+        count, after = _archive_chunk(candidates, chunk_size, after)
+        archived += count
+        if count and on_progress is not None:
+            on_progress(archived)
+        if after is None:
+            return archived
+
+
+def archive_all_shards(before=None, chunk_size=None, on_progress=None):
+    """
+    archive_mappings() on every shard. Returns {alias: archived}.
+    """
+    before = before or archive_cutoff()
+    done = {}
+    for alias in for_each_shard():
+        progress = None
+        if on_progress is not None:
+            progress = lambda count, alias=alias: on_progress(sum(done.values()) + count)
+        done[alias] = archive_mappings(before, chunk_size, progress)
+    return done
+
+
+def archived_history(patient):
+    """
+    Archived mappings of `patient`, newest first (same shape as
+    MappingHistorySerializer).
+    """
+    items = []
+    for archive in MappingArchive.objects.filter(patient=patient).only('data'):
+        items.extend(archive.unpack())
+    # Chunks of different runs can overlap in time
+    items.sort(key=lambda item: parse_datetime(item['assigned_date']), reverse=True)
+    return items
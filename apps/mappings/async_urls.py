@@ -0,0 +1,14 @@
+# apps/mappings/async_urls.py
+
+from django.urls import path
+from .async_views import doctors_by_patient
+
+"""
+Async mapping URL patterns.
+All endpoints are prefixed with /api/async/mappings/
+"""
+
+urlpatterns = [
+    # GET /api/async/mappings/patient/{patient_id}/
+    path('patient/<int:patient_id>/', doctors_by_patient, name='mapping-doctors-by-patient-async'),
+]
@@ -0,0 +1,47 @@
+# apps/mappings/async_views.py
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from apps.authentication.async_auth import async_jwt_required
+from apps.doctors.serializers import DoctorSerializer
+from apps.patients.models import Patient
+from .models import PatientDoctorMapping
+
+"""
+Async (ASGI-native) read endpoints for patient-doctor mappings.
+
+Read-only subset: ?fields=, ?modified_since=, throttling and query
+budgets are not applied here.
+"""
+
+
+@require_GET
+@async_jwt_required
+async def doctors_by_patient(request, patient_id):
+    """
+    Get all active doctors assigned to a patient.
+    GET /api/async/mappings/patient/{patient_id}/
+    """
+    try:
+        patient = await Patient.objects.only('id', 'name').aget(
+            id=patient_id,
+            created_by=request.user
+        )
+    except Patient.DoesNotExist:
+        return JsonResponse({'detail': 'No Patient matches the given query.'}, status=404)
+
+    mappings = PatientDoctorMapping.objects.filter(
+        patient_id=patient.id,
+        is_active=True
+    ).select_related('doctor')
+    doctors = [mapping.doctor async for mapping in mappings.aiterator()]
+    doctor_serializer = DoctorSerializer(doctors, many=True)
+
+    return JsonResponse(
+        {
+            'patient_id': patient.id,
+            'patient_name': patient.name,
+            'total_doctors': len(doctors),
+            'doctors': doctor_serializer.data
+        }
+    )
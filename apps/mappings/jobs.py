@@ -0,0 +1,50 @@
+# apps/mappings/jobs.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.jobs.models import Job
+from apps.jobs.registry import enqueue, job
+from .archive import archive_all_shards, archive_cutoff
+
+"""
+Background jobs for the mappings app (run by `manage.py run_worker`).
+"""
+
+@job('mappings.archive_mappings')
+def archive_inactive_mappings(job, days=None):
+    """
+    Move old inactive mappings to the archive table on every shard, then
+    queue the next run MAPPING_ARCHIVE_INTERVAL seconds from now.
+    """
+    archived = archive_all_shards(
+        archive_cutoff(days),
+        on_progress=lambda count: job.set_progress(archived=count)
+    )
+    next_job = schedule_next_archive(job, days)
+    return {
+        'archived': archived,
+        'next_run_at': next_job.run_at.isoformat() if next_job else None,
+    }
+
+
+def schedule_next_archive(job, days=None):
+    """
+    Queue the next archive run, unless recurrence is off
+    (MAPPING_ARCHIVE_INTERVAL = 0) or a run is already queued. Returns
+    the queued Job or None.
+    """
+    interval = settings.MAPPING_ARCHIVE_INTERVAL
+    if not interval:
+        return None
+    pending = Job.objects.filter(name=job.name, status=Job.STATUS_QUEUED).exclude(pk=job.pk)
+    if pending.exists():
+        return None
+    return enqueue(
+        job.name,
+        days=days,
+        run_at=timezone.now() + timedelta(seconds=interval),
+        created_by=job.created_by,
+    )
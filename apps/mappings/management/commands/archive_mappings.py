@@ -0,0 +1,41 @@
+# apps/mappings/management/commands/archive_mappings.py
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs.registry import enqueue
+from apps.mappings.archive import archive_all_shards, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        'Move inactive mappings older than MAPPING_ARCHIVE_AFTER_DAYS to the '
+        'compressed archive table (run periodically, e.g. nightly from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=None,
+            metavar='DAYS',
+            help='Archive mappings assigned more than DAYS days ago (default: MAPPING_ARCHIVE_AFTER_DAYS)'
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Queue a background job instead of archiving in this process; '
+                 'it re-queues itself every MAPPING_ARCHIVE_INTERVAL seconds'
+        )
+
+    def handle(self, *args, **options):
+        days = options['older_than']
+        if options['enqueue']:
+            job = enqueue('mappings.archive_mappings', days=days)
+            self.stdout.write(self.style.SUCCESS(f'Queued job #{job.pk}'))
+            return
+
+        archived = archive_all_shards(archive_cutoff(days))
+        if len(archived) > 1:
+            for alias, count in archived.items():
+                self.stdout.write(f'{alias}: {count} mapping(s)')
+        self.stdout.write(self.style.SUCCESS(f'Archived {sum(archived.values())} mapping(s)'))
@@ -0,0 +1,74 @@
+# apps/mappings/management/commands/mapping_partitions.py
+
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.mappings.partitioning import (
+    TABLE,
+    detach_partitions,
+    ensure_partitions,
+    is_partitioned,
+    monthly_partitions,
+    partition_name,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Create upcoming monthly partitions of patient_doctor_mappings, or detach '
+        'old ones (PostgreSQL only; run daily, e.g. from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=None,
+            help='Partitions to keep ready after the current month (default: MAPPING_PARTITION_MONTHS_AHEAD)'
+        )
+        parser.add_argument(
+            '--detach-before',
+            metavar='YYYY-MM',
+            default=None,
+            help='Detach every partition of a month before this one instead'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List the monthly partitions and exit'
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias (default: default)'
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        connection = connections[using]
+        if not is_partitioned(connection):
+            self.stdout.write(f'{TABLE} is not partitioned on this database (PostgreSQL only), nothing to do')
+            return
+
+        if options['list']:
+            for month in monthly_partitions(connection):
+                self.stdout.write(partition_name(month))
+            return
+
+        if options['detach_before']:
+            try:
+                before = datetime.strptime(options['detach_before'], '%Y-%m').replace(tzinfo=timezone.utc)
+            except ValueError:
+                raise CommandError('--detach-before must look like 2024-01')
+            detached = detach_partitions(before, using=using)
+            for name in detached:
+                self.stdout.write(f'Detached {name}; archive it with pg_dump -t {name}, then DROP TABLE {name}')
+            self.stdout.write(self.style.SUCCESS(f'Detached {len(detached)} partition(s)'))
+            return
+
+        created = ensure_partitions(using=using, months_ahead=options['months_ahead'])
+        for name in created:
+            self.stdout.write(f'Created {name}')
+        self.stdout.write(self.style.SUCCESS(f'Created {len(created)} partition(s)'))
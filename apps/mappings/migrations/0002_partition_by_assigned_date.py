@@ -0,0 +1,18 @@
+from django.db import migrations
+
+from apps.mappings.partitioning import partition_mappings_table
+
+
+class Migration(migrations.Migration):
+    """
+    Range-partition patient_doctor_mappings by month of assigned_date
+    (PostgreSQL only, see apps/mappings/partitioning.py).
+    """
+
+    dependencies = [
+        ('mappings', '0001_initial'),
+    ]
+
+    operations = [
+        partition_mappings_table(),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def store_data_uncompressed(apps, schema_editor):
+    # `data` is already zlib-compressed; skip TOAST's second compression pass
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE patient_doctor_mappings_archive ALTER COLUMN data SET STORAGE EXTERNAL'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mappings', '0002_partition_by_assigned_date'),
+        ('patients', '0003_patient_search_trgm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MappingArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_assigned', models.DateTimeField()),
+                ('last_assigned', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mapping_archives', to='patients.patient')),
+            ],
+            options={
+                'verbose_name': 'Archived Mappings',
+                'verbose_name_plural': 'Archived Mappings',
+                'db_table': 'patient_doctor_mappings_archive',
+            },
+        ),
+        migrations.RunPython(store_data_uncompressed, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,82 @@
 # apps/mappings/models.py
 
-from django.db import models
+import json
+import zlib
+
+from django.db import connections, models
 from django.conf import settings
 from apps.patients.models import Patient
 from apps.doctors.models import Doctor
 
+class PatientDoctorMappingQuerySet(models.QuerySet):
+    """
+    QuerySet with a lean delete path for mappings.
+    """
+    
+    def delete_owned(self, owner, ids):
+        """
+        Delete the mappings in `ids` whose patient belongs to `owner`,
+        in a single statement.
+        
+        Returns a list of (mapping_id, patient_name, doctor_name) for the
+        rows actually deleted; ids that don't exist or belong to another
+        user's patients are ignored.
+        
+        Meant to be called on the manager
+        (PatientDoctorMapping.objects.delete_owned(user, ids)); other
+        filters on the queryset are not applied.
+        
+        Why not queryset.delete()?
+        - delete() runs Django's collector: it SELECTs the rows first,
+          then DELETEs them, plus one query per related model
+        - Mappings have no dependent rows or signal receivers, so the
+          collector's work is pure overhead here
+        - DELETE ... RETURNING gets the names for the response message
+          in the same round trip
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        
+        connection = connections[self.db]
+        table = self.model._meta.db_table
+        patients = Patient._meta.db_table
+        doctors = Doctor._meta.db_table
+        
+        if connection.vendor == 'postgresql':
+            sql = (
+                f'DELETE FROM {table} AS m '
+                f'USING {patients} AS p, {doctors} AS d '
+                f'WHERE m.patient_id = p.id AND m.doctor_id = d.id '
+                f'AND p.created_by_id = %s AND m.id = ANY(%s) '
+                f'RETURNING m.id, p.name, d.name'
+            )
+            params = [owner.pk, ids]
+        elif connection.features.can_return_columns_from_insert:
+            # Other backends with RETURNING (SQLite 3.35+) but no DELETE ... USING
+            placeholders = ', '.join(['%s'] * len(ids))
+            sql = (
+                f'DELETE FROM {table} '
+                f'WHERE id IN ({placeholders}) AND patient_id IN '
+                f'(SELECT id FROM {patients} WHERE created_by_id = %s) '
+                f'RETURNING id, '
+                f'(SELECT name FROM {patients} WHERE {patients}.id = patient_id), '
+                f'(SELECT name FROM {doctors} WHERE {doctors}.id = doctor_id)'
+            )
+            params = [*ids, owner.pk]
+        else:
+            # No RETURNING: read the names, then delete without the collector
+            owned = self.filter(id__in=ids, patient__created_by=owner)
+            rows = list(owned.values_list('id', 'patient__name', 'doctor__name'))
+            if rows:
+                self.filter(id__in=[row[0] for row in rows])._raw_delete(self.db)
+            return rows
+        
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [tuple(row) for row in cursor.fetchall()]
+
+
 class PatientDoctorMapping(models.Model):
     """
     Many-to-Many relationship between Patients and Doctors.
@@ -53,13 +125,17 @@ class PatientDoctorMapping(models.Model):
         help_text="Set to False if patient is no longer seeing this doctor"
     )
     
+    objects = PatientDoctorMappingQuerySet.as_manager()
+    
     class Meta:
         db_table = 'patient_doctor_mappings'
         verbose_name = 'Patient-Doctor Mapping'
         verbose_name_plural = 'Patient-Doctor Mappings'
         ordering = ['-assigned_date']
         
-        # Ensure a patient can't be assigned to the same doctor twice
+        # Ensure a patient can't be assigned to the same doctor twice.
+        # On PostgreSQL the table is partitioned by assigned_date and this
+        # is enforced through a side table (see partitioning.py).
         unique_together = ['patient', 'doctor']
         
         indexes = [
@@ -75,4 +151,51 @@ class PatientDoctorMapping(models.Model):
         Override save to add custom validation.
         Ensure the patient belongs to the user making the assignment.
         """
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class MappingArchive(models.Model):
+    """
+    Inactive mappings moved out of patient_doctor_mappings by
+    `manage.py archive_mappings` (see archive.py).
+    
+    Why a separate, compressed table?
+    - Old inactive mappings are rarely read but make up most of the hot
+      table and its indexes
+    - One row holds all of a patient's mappings archived in one chunk, as
+      zlib-compressed JSON: a fraction of the space, and one small index
+    - Reads only happen when the history API asks for archived data
+    """
+    
+    patient = models.ForeignKey(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name='mapping_archives'
+    )
+    
+    # Range of assigned_date covered by `data`
+    first_assigned = models.DateTimeField()
+    last_assigned = models.DateTimeField()
+    
+    # Number of mappings in `data`
+    count = models.PositiveIntegerField()
+    
+    # zlib-compressed JSON list, in the shape of MappingHistorySerializer
+    data = models.BinaryField()
+    
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'patient_doctor_mappings_archive'
+        verbose_name = 'Archived Mappings'
+        verbose_name_plural = 'Archived Mappings'
+    
+    def __str__(self):
+        return f"{self.count} archived mapping(s) of patient {self.patient_id}"
+    
+    @staticmethod
+    def pack(items):
+        return zlib.compress(json.dumps(items, separators=(',', ':')).encode())
+    
+    def unpack(self):
+        return json.loads(zlib.decompress(self.data))
\ No newline at end of file
@@ -0,0 +1,339 @@
+# apps/mappings/partitioning.py
+
+import logging
+import re
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connections, migrations, transaction
+from django.db.migrations.exceptions import IrreversibleError
+
+"""
+Range partitioning of patient_doctor_mappings by assigned_date
+(PostgreSQL only; other databases keep the plain table).
+
+Why partition?
+- The table only grows. One heap and two indexes spanning every
+  mapping ever made means long vacuums and indexes that bloat as a
+  whole
+- With one partition per month, vacuum and index maintenance work on
+  small tables, and the newest month (the one being written) stays hot
+- An old month is removed with DETACH PARTITION, a catalog change,
+  instead of a DELETE of millions of rows
+
+Layout after migration 0002:
+- patient_doctor_mappings: the partitioned parent. Django queries it as
+  before; PostgreSQL routes INSERTs to the right partition and prunes
+  partitions when a query filters on assigned_date
+- patient_doctor_mappings_pYYYYMM: one partition per month, created
+  MAPPING_PARTITION_MONTHS_AHEAD months in advance by
+  `manage.py mapping_partitions`
+- patient_doctor_mappings_default: catches rows outside every monthly
+  partition, so a missed cron run never fails inserts
+- patient_doctor_mapping_pairs: one row per (patient_id, doctor_id)
+
+unique_together:
+A unique constraint on a partitioned table must include the partition
+key, so UNIQUE (patient_id, doctor_id) can't be declared on the parent
+(and UNIQUE (patient_id, doctor_id, assigned_date) would allow the
+same pair twice). Instead a trigger keeps the pair in
+patient_doctor_mapping_pairs, whose primary key enforces it across
+partitions. A duplicate assignment still fails with an IntegrityError
+during the INSERT, so PatientDoctorMappingSerializer is unchanged.
+The primary key becomes (id, assigned_date); id stays unique since it
+comes from a single sequence.
+
+Schema changes to this table on PostgreSQL (new fields, indexes) have
+to be written by hand from here on: Django's migration state still
+describes the plain table.
+"""
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'patient_doctor_mappings'
+PAIRS_TABLE = 'patient_doctor_mapping_pairs'
+DEFAULT_PARTITION = f'{TABLE}_default'
+UNPARTITIONED_TABLE = f'{TABLE}_unpartitioned'
+SEQUENCE = f'{TABLE}_id_seq'
+PAIRS_FUNCTION = f'{TABLE}_sync_pairs'
+# Foreign keys (column, referenced table); Django declares them on the model
+FOREIGN_KEYS = (
+    ('patient_id', 'patients'),
+    ('doctor_id', 'doctors'),
+    ('assigned_by_id', 'users'),
+)
+
+_PARTITION_RE = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+
+def month_start(value):
+    """
+    First instant (UTC) of the month containing `value`.
+    """
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def is_partitioned(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+            [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def monthly_partitions(connection):
+    """
+    Months (first instant, UTC) that have a partition, oldest first.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s)',
+            [TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    months = []
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        if match:
+            months.append(datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc))
+    return sorted(months)
+
+
+def _foreign_key_name(column):
+    return f'{TABLE}_{column}_fk'
+
+
+def _create_partition(cursor, quote, month):
+    # Bounds are generated here, not user input
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {quote(partition_name(month))} '
+        f'PARTITION OF {quote(TABLE)} '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def _default_has_rows(cursor, quote, month):
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {quote(DEFAULT_PARTITION)} '
+        f'WHERE assigned_date >= %s AND assigned_date < %s)',
+        [month, add_months(month, 1)]
+    )
+    return cursor.fetchone()[0]
+
+
+def _split_default(cursor, quote, month):
+    """
+    Create the partition for `month` when the DEFAULT partition already
+    holds rows of that month (CREATE ... PARTITION OF would fail on them).
+
+    The rows are moved into a standalone table, which is then attached
+    as the month's partition; ATTACH builds its indexes and foreign keys
+    from the parent. Deleting the rows from the default partition fires
+    the pairs trigger, so their pairs are put back afterwards. Runs in
+    one transaction; the default partition is locked while it runs.
+    """
+    name, default, pairs = quote(partition_name(month)), quote(DEFAULT_PARTITION), quote(PAIRS_TABLE)
+    bounds = [month, add_months(month, 1)]
+    cursor.execute(f'CREATE TABLE {name} (LIKE {quote(TABLE)} INCLUDING DEFAULTS)')
+    cursor.execute(
+        f'WITH moved AS ('
+        f'DELETE FROM {default} WHERE assigned_date >= %s AND assigned_date < %s RETURNING *'
+        f') INSERT INTO {name} SELECT * FROM moved',
+        bounds
+    )
+    moved = cursor.rowcount
+    cursor.execute(
+        f'ALTER TABLE {quote(TABLE)} ATTACH PARTITION {name} '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+    cursor.execute(f'INSERT INTO {pairs} (patient_id, doctor_id, mapping_id) SELECT patient_id, doctor_id, id FROM {name}')
+    logger.warning('Moved %s row(s) from %s into new partition %s', moved, DEFAULT_PARTITION, partition_name(month))
+    return moved
+
+
+def ensure_partitions(using='default', months_ahead=None, now=None):
+    """
+    Create the partitions from the current month up to `months_ahead`
+    months from now. Returns the names of the partitions created.
+
+    If the DEFAULT partition already holds rows for a missing month
+    (e.g. the cron job didn't run), they are moved into the new
+    partition (see _split_default).
+    """
+    connection = connections[using]
+    if months_ahead is None:
+        months_ahead = settings.MAPPING_PARTITION_MONTHS_AHEAD
+    current = month_start(now or datetime.now(timezone.utc))
+    existing = set(monthly_partitions(connection))
+    quote = connection.ops.quote_name
+
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month in existing:
+            continue
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if _default_has_rows(cursor, quote, month):
+                _split_default(cursor, quote, month)
+            else:
+                _create_partition(cursor, quote, month)
+        created.append(partition_name(month))
+    return created
+
+
+def detach_partitions(before, using='default', lock_timeout='5s'):
+    """
+    Detach every monthly partition that ends on or before the month
+    containing `before`. Returns the names of the detached tables.
+
+    DETACH only rewrites the catalog, but needs a brief exclusive lock on
+    the parent; lock_timeout makes it give up instead of queueing behind
+    long queries (and blocking everything queued after it). The pairs of
+    the detached rows are then deleted, so those patients can be
+    assigned to the same doctors again, and the detached table's foreign
+    keys are dropped.
+
+    The detached tables keep their data and can be dumped and dropped
+    (pg_dump -t <name>), or moved to cheaper storage.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    cutoff = month_start(before)
+
+    detached = []
+    for month in monthly_partitions(connection):
+        if add_months(month, 1) > cutoff:
+            break
+        name = partition_name(month)
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+            cursor.execute(f'ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}')
+            # The detached table keeps copies of the foreign keys, which
+            # would block deleting those patients and doctors
+            for column, _ in FOREIGN_KEYS:
+                cursor.execute(
+                    f'ALTER TABLE {quote(name)} DROP CONSTRAINT IF EXISTS {quote(_foreign_key_name(column))}'
+                )
+            cursor.execute(
+                f'DELETE FROM {quote(PAIRS_TABLE)} p USING {quote(name)} m '
+                f'WHERE p.mapping_id = m.id'
+            )
+        detached.append(name)
+    return detached
+
+
+def _partition_table(apps, schema_editor):
+    """
+    Migration step: replace the plain table with a partitioned one and
+    copy the rows over, in the migration's transaction.
+
+    Rewrites the whole table; on a large production table run it in a
+    maintenance window.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    quote = schema_editor.quote_name
+    table, old, pairs = quote(TABLE), quote(UNPARTITIONED_TABLE), quote(PAIRS_TABLE)
+    execute = schema_editor.execute
+
+    execute(f'ALTER TABLE {table} RENAME TO {old}')
+    # Columns, types and NOT NULL only: no identity (partitioned tables
+    # support it from PostgreSQL 17), indexes or constraints
+    execute(f'CREATE TABLE {table} (LIKE {old}) PARTITION BY RANGE (assigned_date)')
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(assigned_date) FROM {old}')
+        oldest = cursor.fetchone()[0]
+        now = datetime.now(timezone.utc)
+        month = month_start(oldest or now)
+        last = add_months(month_start(now), settings.MAPPING_PARTITION_MONTHS_AHEAD)
+        while month <= last:
+            _create_partition(cursor, quote, month)
+            month = add_months(month, 1)
+    execute(f'CREATE TABLE {quote(DEFAULT_PARTITION)} PARTITION OF {table} DEFAULT')
+
+    # Copy before building indexes; bulk index builds are much faster.
+    # Dropping the old table frees its constraint, index and sequence
+    # names for the new one.
+    execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    execute(f'DROP TABLE {old}')
+
+    execute(f'CREATE SEQUENCE {quote(SEQUENCE)} OWNED BY {table}.id')
+    execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+    execute(f"SELECT setval('{SEQUENCE}', COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)")
+    execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, assigned_date)')
+
+    # Same names as in Django's migration state
+    execute(f'CREATE INDEX {quote("patient_doc_patient_68e979_idx")} ON {table} (patient_id, doctor_id)')
+    execute(f'CREATE INDEX {quote("patient_doc_assigne_ddfdfc_idx")} ON {table} (assigned_date)')
+    execute(f'CREATE INDEX {quote(TABLE + "_doctor_id")} ON {table} (doctor_id)')
+    execute(f'CREATE INDEX {quote(TABLE + "_assigned_by_id")} ON {table} (assigned_by_id)')
+    for column, target in FOREIGN_KEYS:
+        execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {quote(_foreign_key_name(column))} '
+            f'FOREIGN KEY ({column}) REFERENCES {quote(target)} (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+    # unique_together (patient, doctor), across partitions
+    execute(
+        f'CREATE TABLE {pairs} ('
+        f'patient_id bigint NOT NULL, doctor_id bigint NOT NULL, mapping_id bigint NOT NULL, '
+        f'PRIMARY KEY (patient_id, doctor_id))'
+    )
+    execute(f'CREATE INDEX {quote(PAIRS_TABLE + "_mapping_id")} ON {pairs} (mapping_id)')
+    execute(f'INSERT INTO {pairs} (patient_id, doctor_id, mapping_id) SELECT patient_id, doctor_id, id FROM {table}')
+    execute(
+        f'CREATE FUNCTION {quote(PAIRS_FUNCTION)}() RETURNS trigger LANGUAGE plpgsql AS $$\n'
+        'BEGIN\n'
+        "    IF TG_OP = 'UPDATE' AND OLD.patient_id = NEW.patient_id AND OLD.doctor_id = NEW.doctor_id THEN\n"
+        '        RETURN NULL;\n'
+        '    END IF;\n'
+        "    IF TG_OP <> 'INSERT' THEN\n"
+        f'        DELETE FROM {pairs} WHERE mapping_id = OLD.id;\n'
+        '    END IF;\n'
+        "    IF TG_OP <> 'DELETE' THEN\n"
+        f'        INSERT INTO {pairs} (patient_id, doctor_id, mapping_id) VALUES (NEW.patient_id, NEW.doctor_id, NEW.id);\n'
+        '    END IF;\n'
+        '    RETURN NULL;\n'
+        'END\n'
+        '$$'
+    )
+    execute(
+        f'CREATE TRIGGER {quote(PAIRS_FUNCTION)} '
+        f'AFTER INSERT OR DELETE OR UPDATE OF patient_id, doctor_id ON {table} '
+        f'FOR EACH ROW EXECUTE FUNCTION {quote(PAIRS_FUNCTION)}()'
+    )
+
+
+def _unpartition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    raise IrreversibleError(
+        f'{TABLE} is partitioned; restore the plain table from a backup '
+        f'or copy it out by hand.'
+    )
+
+
+def partition_mappings_table():
+    """
+    Migration operation converting the table (see _partition_table).
+    """
+    return migrations.RunPython(_partition_table, _unpartition_table, elidable=False)
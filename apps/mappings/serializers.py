@@ -1,15 +1,61 @@
 # apps/mappings/serializers.py
 
+from django.db import IntegrityError
 from rest_framework import serializers
+from apps.core.instrumentation import TimedSerializerMixin
+from apps.core.serializers import DynamicFieldsMixin, atomic_write
 from .models import PatientDoctorMapping
+from apps.doctors.models import Doctor
 from apps.patients.models import Patient
 from apps.doctors.serializers import DoctorSerializer
 from apps.patients.serializers import PatientListSerializer
 
-class PatientDoctorMappingSerializer(serializers.ModelSerializer):
+
+def is_duplicate_pair(exc):
+    """
+    True if the IntegrityError `exc` came from the (patient, doctor)
+    uniqueness check, as opposed to e.g. a foreign key that vanished.
+
+    PostgreSQL: 'Key (patient_id, doctor_id)=(...) already exists'
+    (unique_together, or patient_doctor_mapping_pairs when partitioned)
+    SQLite: 'UNIQUE constraint failed: patient_doctor_mappings.patient_id, ...'
+    """
+    message = str(exc)
+    return (
+        '(patient_id, doctor_id)=' in message
+        or 'patient_doctor_mappings.patient_id, patient_doctor_mappings.doctor_id' in message
+    )
+
+
+class PatientDoctorMappingSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for creating and managing patient-doctor mappings.
+    
+    Creating a mapping runs a fixed number of queries:
+    - owner-scoped patient lookup (by created_by_id, no user row load)
+    - doctor lookup
+    - INSERT, relying on unique_together for duplicates
+    The view then reloads the mapping once with select_related for the
+    response. Updates rely on the same constraint, so re-pointing a
+    mapping at a doctor the patient already has is a 400, not a 500.
     """
+    # Only the current user's patients can be assigned
+    patient = serializers.PrimaryKeyRelatedField(
+        queryset=Patient.objects.none(),
+        error_messages={
+            'does_not_exist': 'You can only assign doctors to your own patients.',
+        }
+    )
+    doctor = serializers.PrimaryKeyRelatedField(
+        queryset=Doctor.objects.only('id')
+    )
+    
+    # ?fields=/?expand= (nested details are the heavy part)
+    expandable_fields = {
+        'patient_details': ('apps.patients.serializers.PatientListSerializer', {'source': 'patient'}),
+        'doctor_details': ('apps.doctors.serializers.DoctorSerializer', {'source': 'doctor'}),
+    }
+    
     # Display full details in responses
     patient_details = PatientListSerializer(source='patient', read_only=True)
     doctor_details = DoctorSerializer(source='doctor', read_only=True)
@@ -30,42 +76,48 @@ class PatientDoctorMappingSerializer(serializers.ModelSerializer):
             'is_active'
         ]
         read_only_fields = ['id', 'assigned_by', 'assigned_date']
+        # Duplicates are caught by the unique_together constraint in create()
+        validators = []
     
-    def validate(self, attrs):
-        """
-        Validate the mapping before creation.
-        """
-        patient = attrs.get('patient')
-        doctor = attrs.get('doctor')
-        
-        # Check if patient exists and belongs to the requesting user
+    def get_fields(self):
+        fields = super().get_fields()
         request = self.context.get('request')
         if request and request.user:
-            if patient.created_by != request.user:
-                raise serializers.ValidationError({
-                    'patient': 'You can only assign doctors to your own patients.'
-                })
-        
-        # Check if mapping already exists (when creating)
-        if not self.instance:
-            if PatientDoctorMapping.objects.filter(
-                patient=patient,
-                doctor=doctor
-            ).exists():
-                raise serializers.ValidationError({
-                    'error': 'This patient is already assigned to this doctor.'
-                })
-        
-        return attrs
+            fields['patient'].queryset = Patient.objects.filter(
+                created_by_id=request.user.id
+            ).only('id')
+        return fields
     
     def create(self, validated_data):
         """
         Create a new patient-doctor mapping.
         """
-        return PatientDoctorMapping.objects.create(**validated_data)
+        try:
+            with atomic_write(PatientDoctorMapping):
+                return PatientDoctorMapping.objects.create(**validated_data)
+        except IntegrityError as exc:
+            if not is_duplicate_pair(exc):
+                raise
+            raise serializers.ValidationError({
+                'error': 'This patient is already assigned to this doctor.'
+            })
+    
+    def update(self, instance, validated_data):
+        """
+        Update a mapping; changing patient or doctor can hit the unique pair.
+        """
+        try:
+            with atomic_write(PatientDoctorMapping):
+                return super().update(instance, validated_data)
+        except IntegrityError as exc:
+            if not is_duplicate_pair(exc):
+                raise
+            raise serializers.ValidationError({
+                'error': 'This patient is already assigned to this doctor.'
+            })
 
 
-class PatientDoctorListSerializer(serializers.ModelSerializer):
+class PatientDoctorListSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Lightweight serializer for listing mappings.
     """
@@ -73,6 +125,8 @@ class PatientDoctorListSerializer(serializers.ModelSerializer):
     doctor_name = serializers.CharField(source='doctor.name', read_only=True)
     doctor_specialization = serializers.CharField(source='doctor.specialization', read_only=True)
     
+    expandable_fields = PatientDoctorMappingSerializer.expandable_fields
+    
     class Meta:
         model = PatientDoctorMapping
         fields = [
@@ -92,4 +146,39 @@ class DoctorsByPatientSerializer(serializers.Serializer):
     patient_id = serializers.IntegerField()
     patient_name = serializers.CharField()
     doctors = DoctorSerializer(many=True)
-    total_doctors = serializers.IntegerField()
\ No newline at end of file
+    total_doctors = serializers.IntegerField()
+
+
+class BulkRemoveSerializer(serializers.Serializer):
+    """
+    Input for removing several mappings at once.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+
+
+class MappingHistorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    One entry of a patient's mapping history. Archived mappings are
+    stored in this shape (MappingArchive.data), so live and archived
+    entries look the same.
+    """
+    doctor_name = serializers.CharField(source='doctor.name', read_only=True)
+    doctor_specialization = serializers.CharField(source='doctor.specialization', read_only=True)
+    
+    class Meta:
+        model = PatientDoctorMapping
+        fields = [
+            'id',
+            'doctor',
+            'doctor_name',
+            'doctor_specialization',
+            'assigned_by',
+            'assigned_date',
+            'notes',
+            'is_active'
+        ]
+        read_only_fields = fields
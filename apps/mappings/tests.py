@@ -1,3 +1,486 @@
-from django.test import TestCase
+# apps/mappings/tests.py
+
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import skipUnless
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, override_settings
+
+from apps.core.testing import (
+    QueryCountTestCase,
+    bearer,
+    make_doctors,
+    make_mappings,
+    make_patients,
+    make_user,
+)
+from apps.jobs.models import Job
+from apps.jobs.worker import Worker
+from .archive import archive_cutoff, archive_mappings
+from .models import MappingArchive, PatientDoctorMapping
+from .serializers import is_duplicate_pair
+from .partitioning import (
+    add_months,
+    detach_partitions,
+    ensure_partitions,
+    is_partitioned,
+    month_start,
+    partition_name,
+)
+
+
+class PatientDoctorMappingViewSetQueryCountTests(QueryCountTestCase):
+    """
+    Every PatientDoctorMappingViewSet action runs the same number of
+    queries whether there are 1, 100 or 1,000 mappings.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.patient = make_patients(self.user, 1, prefix='main')[0]
+
+    def grow_patient_doctors(self, size):
+        # self.patient is assigned to N doctors
+        missing = size - PatientDoctorMapping.objects.filter(patient=self.patient).count()
+        if missing > 0:
+            make_mappings([self.patient], make_doctors(missing, prefix=f'doc{size}-'), self.user)
+
+    def grow_user_mappings(self, size):
+        # The user owns N mappings across N patients
+        missing = size - PatientDoctorMapping.objects.filter(patient__created_by=self.user).count()
+        if missing > 0:
+            doctor = make_doctors(1, prefix=f'shared{size}-')[0]
+            make_mappings(make_patients(self.user, missing, prefix=f'pat{size}-'), [doctor], self.user)
+
+    def test_create(self):
+        doctors = {}
+
+        def grow(size):
+            self.grow_patient_doctors(size)
+            doctors[size] = make_doctors(1, prefix=f'new{size}-')[0]
+
+        self.assertConstantQueries(
+            grow,
+            lambda n: self.client.post(
+                '/api/mappings/',
+                {'patient': self.patient.id, 'doctor': doctors[n].id, 'notes': 'Test'},
+                format='json'
+            )
+        )
+
+    def test_list(self):
+        self.assertConstantQueries(
+            self.grow_user_mappings,
+            lambda n: self.client.get('/api/mappings/')
+        )
+
+    def test_retrieve(self):
+        # GET /api/mappings/{patient_id}/ lists the patient's doctors
+        self.assertConstantQueries(
+            self.grow_patient_doctors,
+            lambda n: self.client.get(f'/api/mappings/{self.patient.id}/')
+        )
+
+    def test_doctors_by_patient(self):
+        self.assertConstantQueries(
+            self.grow_patient_doctors,
+            lambda n: self.client.get(f'/api/mappings/patient/{self.patient.id}/')
+        )
+
+    def test_list_expand(self):
+        self.assertConstantQueries(
+            self.grow_user_mappings,
+            lambda n: self.client.get('/api/mappings/', {'fields': 'id,patient', 'expand': 'doctor_details'})
+        )
+
+        mapping = self.client.get('/api/mappings/', {'fields': 'id', 'expand': 'doctor_details'}).data['mappings'][0]
+        self.assertEqual(list(mapping), ['id', 'doctor_details'])
+
+    def test_retrieve_fields(self):
+        make_mappings([self.patient], make_doctors(2))
+
+        response = self.client.get(f'/api/mappings/{self.patient.id}/', {'fields': 'id,name'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([list(doctor) for doctor in response.data['doctors']], [['id', 'name']] * 2)
+
+    def test_destroy(self):
+        targets = {}
+
+        def grow(size):
+            self.grow_user_mappings(size)
+            targets[size] = PatientDoctorMapping.objects.filter(
+                patient__created_by=self.user
+            ).order_by('id').first()
+
+        self.assertConstantQueries(
+            grow,
+            lambda n: self.client.delete(f'/api/mappings/{targets[n].id}/')
+        )
+
+
+class PatientDoctorMappingCreateTests(QueryCountTestCase):
+    """
+    Ownership and duplicate errors on mapping creation.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.patient = make_patients(self.user, 1, prefix='main')[0]
+        self.doctor = make_doctors(1)[0]
+
+    def test_duplicate_mapping(self):
+        make_mappings([self.patient], [self.doctor], self.user)
+        response = self.client.post(
+            '/api/mappings/',
+            {'patient': self.patient.id, 'doctor': self.doctor.id},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['details'],
+            {'error': 'This patient is already assigned to this doctor.'}
+        )
+        self.assertEqual(PatientDoctorMapping.objects.count(), 1)
+
+    def test_update_to_duplicate_doctor(self):
+        other_doctor = make_doctors(1, prefix='second')[0]
+        first, second = make_mappings([self.patient], [self.doctor, other_doctor], self.user)
+
+        response = self.client.patch(f'/api/mappings/{second.id}/', {'doctor': self.doctor.id}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'This patient is already assigned to this doctor.'})
+        self.assertEqual(PatientDoctorMapping.objects.get(pk=second.pk).doctor_id, other_doctor.id)
+
+    def test_other_integrity_errors_are_not_duplicates(self):
+        self.assertFalse(is_duplicate_pair(IntegrityError('FOREIGN KEY constraint failed')))
+        self.assertFalse(is_duplicate_pair(IntegrityError(
+            'insert or update on table "patient_doctor_mappings" violates foreign key constraint '
+            '"patient_doctor_mappings_doctor_id_fk"\nDETAIL:  Key (doctor_id)=(7) is not present in table "doctors".'
+        )))
+        self.assertTrue(is_duplicate_pair(IntegrityError(
+            'duplicate key value violates unique constraint "patient_doctor_mapping_pairs_pkey"\n'
+            'DETAIL:  Key (patient_id, doctor_id)=(1, 2) already exists.'
+        )))
+
+    def test_other_users_patient(self):
+        other_patient = make_patients(make_user('other@example.com'), 1, prefix='other')[0]
+        response = self.client.post(
+            '/api/mappings/',
+            {'patient': other_patient.id, 'doctor': self.doctor.id},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['details']['patient'],
+            ['You can only assign doctors to your own patients.']
+        )
+        self.assertFalse(PatientDoctorMapping.objects.exists())
+
+
+class PatientDoctorMappingDeleteTests(QueryCountTestCase):
+    """
+    Single and bulk mapping removal only touch the user's own mappings.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.patient = make_patients(self.user, 1, prefix='main')[0]
+        self.doctors = make_doctors(3)
+        self.mappings = make_mappings([self.patient], self.doctors, self.user)
+        other_patient = make_patients(make_user('other@example.com'), 1, prefix='other')[0]
+        self.other_mapping = make_mappings([other_patient], self.doctors[:1])[0]
+
+    def test_destroy(self):
+        mapping = self.mappings[0]
+        response = self.client.delete(f'/api/mappings/{mapping.id}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            response.data['message'],
+            f'Dr. {self.doctors[0].name} removed from patient {self.patient.name} successfully'
+        )
+        self.assertFalse(PatientDoctorMapping.objects.filter(id=mapping.id).exists())
+
+    def test_destroy_other_users_mapping(self):
+        response = self.client.delete(f'/api/mappings/{self.other_mapping.id}/')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(PatientDoctorMapping.objects.filter(id=self.other_mapping.id).exists())
+
+    def test_bulk_remove(self):
+        ids = [self.mappings[0].id, self.mappings[1].id, self.other_mapping.id, 999999]
+        # User lookup, SAVEPOINT, DELETE ... RETURNING, INSERT of change events, RELEASE
+        with self.assertNumQueries(5):
+            response = self.client.post('/api/mappings/bulk-remove/', {'ids': ids}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(row['id'] for row in response.data['removed']),
+            sorted(ids[:2])
+        )
+        self.assertEqual(response.data['not_found'], ids[2:])
+        self.assertEqual(PatientDoctorMapping.objects.count(), 2)
+
+
+@skipUnless(apps.is_installed('django.contrib.admin'), 'admin is not part of the API-only profile')
+class PatientDoctorMappingAdminTests(QueryCountTestCase):
+    """
+    The admin changelist runs a fixed number of queries per page.
+    """
+
+    def setUp(self):
+        self.admin = make_user('admin@example.com')
+        self.admin.is_staff = self.admin.is_superuser = True
+        self.admin.save()
+        self.client.force_login(self.admin)
+
+    def grow(self, size):
+        missing = size - PatientDoctorMapping.objects.count()
+        if missing > 0:
+            doctor = make_doctors(1, prefix=f'admin{size}-')[0]
+            make_mappings(make_patients(self.admin, missing, prefix=f'admin{size}-'), [doctor], self.admin)
+
+    def test_changelist(self):
+        self.assertConstantQueries(
+            self.grow,
+            lambda n: self.client.get('/admin/mappings/patientdoctormapping/')
+        )
+
+    def test_search(self):
+        self.grow(3)
+
+        response = self.client.get('/admin/mappings/patientdoctormapping/', {'q': 'Patient 1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class PartitionMonthTests(SimpleTestCase):
+    """
+    Month arithmetic behind the partition bounds and names.
+    """
+
+    def test_month_start(self):
+        self.assertEqual(
+            month_start(datetime(2024, 3, 31, 23, 59, tzinfo=timezone.utc)),
+            datetime(2024, 3, 1, tzinfo=timezone.utc)
+        )
+
+    def test_add_months(self):
+        month = datetime(2024, 11, 1, tzinfo=timezone.utc)
+
+        self.assertEqual(add_months(month, 2), datetime(2025, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(add_months(month, -11), datetime(2023, 12, 1, tzinfo=timezone.utc))
+        self.assertEqual(partition_name(month), 'patient_doctor_mappings_p202411')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'mappings are only partitioned on PostgreSQL')
+class MappingPartitionTests(QueryCountTestCase):
+    """
+    The partitioned table still rejects duplicate pairs, and a detached
+    month no longer counts towards them.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.patient = make_patients(self.user, 1)[0]
+        self.doctor = make_doctors(1)[0]
+
+    def test_partitioned(self):
+        self.assertTrue(is_partitioned(connection))
+
+    def test_duplicate_pair(self):
+        make_mappings([self.patient], [self.doctor], self.user)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PatientDoctorMapping.objects.create(patient=self.patient, doctor=self.doctor)
+
+    def test_detach(self):
+        old_month = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        ensure_partitions(months_ahead=0, now=old_month)
+        mapping = make_mappings([self.patient], [self.doctor], self.user)[0]
+        PatientDoctorMapping.objects.filter(pk=mapping.pk).update(assigned_date=old_month)
+
+        detached = detach_partitions(add_months(old_month, 1))
+
+        self.assertEqual(detached, [partition_name(old_month)])
+        self.assertFalse(PatientDoctorMapping.objects.exists())
+        PatientDoctorMapping.objects.create(patient=self.patient, doctor=self.doctor)
+
+    def test_rows_in_default_partition(self):
+        # No partition for this month yet: the row lands in the default one
+        month = datetime(2010, 6, 1, tzinfo=timezone.utc)
+        mapping = make_mappings([self.patient], [self.doctor], self.user)[0]
+        PatientDoctorMapping.objects.filter(pk=mapping.pk).update(assigned_date=month)
+
+        self.assertEqual(ensure_partitions(months_ahead=0, now=month), [partition_name(month)])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id FROM {partition_name(month)}')
+            self.assertEqual(cursor.fetchall(), [(mapping.pk,)])
+        # The pair is still enforced
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PatientDoctorMapping.objects.create(patient=self.patient, doctor=self.doctor)
+
+
+class MappingArchiveTests(QueryCountTestCase):
+    """
+    Old inactive mappings move to the archive table and are only read
+    back by the history endpoint when asked for.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.patient = make_patients(self.user, 1)[0]
+        self.old = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    def make_old(self, patients, doctors, is_active=False):
+        mappings = make_mappings(patients, doctors, self.user)
+        PatientDoctorMapping.objects.filter(pk__in=[m.pk for m in mappings]).update(
+            assigned_date=self.old,
+            is_active=is_active
+        )
+        return mappings
+
+    def history(self, **params):
+        response = self.client.get(f'/api/mappings/patient/{self.patient.id}/history/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_archive(self):
+        archived, kept_active, recent = make_doctors(3)
+        mapping = self.make_old([self.patient], [archived])[0]
+        self.make_old([self.patient], [kept_active], is_active=True)
+        make_mappings([self.patient], [recent], self.user)
+        PatientDoctorMapping.objects.filter(doctor=recent).update(is_active=False)
+
+        self.assertEqual(archive_mappings(), 1)
+
+        self.assertFalse(PatientDoctorMapping.objects.filter(pk=mapping.pk).exists())
+        self.assertEqual(MappingArchive.objects.get().count, 1)
+        self.assertEqual(self.history()['count'], 2)
+        data = self.history(archived='true')
+        self.assertEqual(data['count'], 3)
+        entry = data['history'][-1]
+        self.assertEqual(
+            (entry['id'], entry['doctor'], entry['doctor_name'], entry['is_active'], entry['archived']),
+            (mapping.pk, archived.pk, archived.name, False, True)
+        )
+
+        # The pair is free again
+        response = self.client.post('/api/mappings/', {'patient': self.patient.id, 'doctor': archived.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_chunks(self):
+        patients = make_patients(self.user, 3, prefix='other')
+        self.make_old(patients, make_doctors(3))
+
+        self.assertEqual(archive_mappings(chunk_size=2), 9)
+
+        self.assertFalse(PatientDoctorMapping.objects.exists())
+        self.assertEqual(sum(MappingArchive.objects.values_list('count', flat=True)), 9)
+
+    def test_command(self):
+        self.make_old([self.patient], make_doctors(2))
+        out = StringIO()
+
+        call_command('archive_mappings', '--older-than', str((datetime.now(timezone.utc) - self.old).days + 1), stdout=out)
+        self.assertEqual(MappingArchive.objects.count(), 0)
+        call_command('archive_mappings', stdout=out)
+        self.assertEqual(MappingArchive.objects.get().count, 2)
+        self.assertIn('Archived 2 mapping(s)', out.getvalue())
+
+    @override_settings(MAPPING_ARCHIVE_INTERVAL=3600)
+    def test_job_reschedules_itself(self):
+        self.make_old([self.patient], make_doctors(1))
+        call_command('archive_mappings', '--enqueue', stdout=StringIO())
+        # Queued twice: still one chain
+        call_command('archive_mappings', '--enqueue', stdout=StringIO())
+
+        Worker(worker_id='test').run(burst=True)
+
+        finished = Job.objects.filter(status=Job.STATUS_SUCCEEDED)
+        self.assertEqual(finished.count(), 2)
+        self.assertEqual(MappingArchive.objects.get().count, 1)
+        # Only the last run, with no other run queued, scheduled the next one
+        first, last = finished.order_by('id')
+        self.assertIsNone(first.result['next_run_at'])
+        queued = Job.objects.get(name='mappings.archive_mappings', status=Job.STATUS_QUEUED)
+        self.assertEqual(last.result['next_run_at'], queued.run_at.isoformat())
+        delay = queued.run_at - last.finished_at
+        self.assertAlmostEqual(delay.total_seconds(), 3600, delta=5)
+
+    @override_settings(MAPPING_ARCHIVE_INTERVAL=0)
+    def test_job_without_interval_runs_once(self):
+        call_command('archive_mappings', '--enqueue', stdout=StringIO())
+
+        Worker(worker_id='test').run(burst=True)
+
+        self.assertFalse(Job.objects.filter(status=Job.STATUS_QUEUED).exists())
+
+    def test_cutoff(self):
+        now = datetime(2025, 1, 31, tzinfo=timezone.utc)
+        self.assertEqual(archive_cutoff(30, now), now - timedelta(days=30))
+
+    def test_patient_delete_removes_archive(self):
+        self.make_old([self.patient], make_doctors(1))
+        archive_mappings()
+
+        self.client.delete(f'/api/patients/{self.patient.id}/')
+
+        self.assertFalse(MappingArchive.objects.exists())
+
+    def test_history_queries(self):
+        def grow(size):
+            missing = size - len(self.history(archived='true')['history'])
+            if missing > 0:
+                self.make_old([self.patient], make_doctors(missing, prefix=f'doc{size}-'))
+                archive_mappings()
+
+        self.assertConstantQueries(
+            grow,
+            lambda n: self.client.get(f'/api/mappings/patient/{self.patient.id}/history/', {'archived': 'true'})
+        )
+
+
+class MappingAsyncViewTests(QueryCountTestCase):
+    """
+    doctors_by_patient lists active doctors of the user's own patient
+    and answers 404 for anyone else's.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.patient = make_patients(self.user, 1, prefix='mine')[0]
+        self.foreign = make_patients(make_user('other@example.com'), 1, prefix='theirs')[0]
+        active, inactive = make_doctors(2, prefix='async')
+        make_mappings([self.patient, self.foreign], [active, inactive], self.user)
+        PatientDoctorMapping.objects.filter(doctor=inactive).update(is_active=False)
+        self.active = active
+        self.headers = {'Authorization': bearer(self.user)}
+
+    async def test_active_doctors(self):
+        response = await self.async_client.get(
+            f'/api/async/mappings/patient/{self.patient.id}/', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_doctors'], 1)
+        self.assertEqual(response.json()['doctors'][0]['id'], self.active.id)
+
+    async def test_other_users_patient_is_404(self):
+        response = await self.async_client.get(
+            f'/api/async/mappings/patient/{self.foreign.id}/', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 404)
 
-# Create your tests here.
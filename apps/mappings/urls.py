@@ -24,6 +24,8 @@ The router automatically generates these URLs:
 
 Additional custom endpoint:
 - GET    /api/mappings/patient/{patient_id}/ -> alternative way to get doctors by patient
+- POST   /api/mappings/bulk-remove/          -> remove several mappings at once
+- GET    /api/mappings/patient/{patient_id}/history/ -> mapping history (?archived=true)
 """
 
 urlpatterns = [
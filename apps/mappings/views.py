@@ -1,20 +1,29 @@
 # apps/mappings/views.py
 
-from rest_framework import viewsets, status
+from django.db import router, transaction
+from rest_framework import serializers, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from apps.changes.models import ChangeEvent
+from apps.changes.outbox import record_change, record_changes
+from apps.core.serializers import prune_queryset
+from apps.core.views import DynamicFieldsViewMixin, ShardedViewMixin
+from apps.idempotency.mixins import IdempotencyMixin
+from .archive import archived_history
 from .models import PatientDoctorMapping
 from .serializers import (
     PatientDoctorMappingSerializer,
     PatientDoctorListSerializer,
-    DoctorsByPatientSerializer
+    DoctorsByPatientSerializer,
+    BulkRemoveSerializer,
+    MappingHistorySerializer
 )
 from apps.patients.models import Patient
 from apps.doctors.serializers import DoctorSerializer
 
-class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
+class PatientDoctorMappingViewSet(ShardedViewMixin, IdempotencyMixin, DynamicFieldsViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing patient-doctor mappings.
     
@@ -23,10 +32,29 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
     - GET /api/mappings/ - List all mappings
     - GET /api/mappings/{patient_id}/ - Get doctors for a specific patient
     - DELETE /api/mappings/{id}/ - Remove a doctor from a patient
+    - POST /api/mappings/bulk-remove/ - Remove several mappings at once
+    - GET /api/mappings/patient/{patient_id}/history/ - All of a patient's
+      mappings, inactive ones included (?archived=true adds archived ones)
     """
     permission_classes = [IsAuthenticated]
     serializer_class = PatientDoctorMappingSerializer
     
+    # Idempotency-Key header (apps/idempotency/mixins.py)
+    idempotent_actions = ('create', 'bulk_remove')
+    
+    # Max queries per action (checked by apps.core.middleware.RequestTimingMiddleware),
+    # including the user lookup for the JWT
+    query_budgets = {
+        'list': 3,
+        'retrieve': 3,
+        'doctors_by_patient': 3,
+        # patient + mappings, + archive rows with ?archived=true
+        'history': 4,
+        'create': 8,
+        'destroy': 5,
+        'bulk_remove': 5,
+    }
+    
     def get_queryset(self):
         """
         Return mappings only for patients created by current user.
@@ -37,7 +65,7 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
         # Return mappings for those patients
         return PatientDoctorMapping.objects.filter(
             patient__in=user_patients
-        ).select_related('patient', 'doctor', 'assigned_by')
+        ).select_related('patient__created_by', 'doctor', 'assigned_by')
     
     def get_serializer_class(self):
         """
@@ -61,12 +89,38 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
         
         if serializer.is_valid():
             # Set assigned_by to current user
-            serializer.save(assigned_by=request.user)
+            try:
+                # The change event commits or rolls back with the write
+                with transaction.atomic(using=router.db_for_write(PatientDoctorMapping)):
+                    mapping = serializer.save(assigned_by=request.user)
+                    
+                    # Reload with everything the nested response fields need
+                    mapping = PatientDoctorMapping.objects.select_related(
+                        'patient__created_by', 'doctor', 'assigned_by'
+                    ).get(pk=mapping.pk)
+                    data = self.get_serializer(mapping).data
+                    
+                    record_change(
+                        ChangeEvent.ENTITY_MAPPING,
+                        mapping.pk,
+                        ChangeEvent.ACTION_CREATED,
+                        owner_id=request.user.pk,
+                        data=data
+                    )
+            except serializers.ValidationError as e:
+                # Patient is already assigned to this doctor
+                return Response(
+                    {
+                        'error': 'Failed to assign doctor to patient',
+                        'details': e.detail
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
             return Response(
                 {
                     'message': 'Doctor assigned to patient successfully',
-                    'mapping': serializer.data
+                    'mapping': data
                 },
                 status=status.HTTP_201_CREATED
             )
@@ -79,11 +133,25 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    def perform_update(self, serializer):
+        # The change event commits or rolls back with the write. A duplicate
+        # pair fails the UPDATE; the serializer's ValidationError must leave
+        # this block so the failed write is rolled back
+        with transaction.atomic(using=router.db_for_write(PatientDoctorMapping)):
+            mapping = serializer.save()
+            record_change(
+                ChangeEvent.ENTITY_MAPPING,
+                mapping.pk,
+                ChangeEvent.ACTION_UPDATED,
+                owner_id=self.request.user.pk,
+                data=serializer.data
+            )
+    
     def list(self, request, *args, **kwargs):
         """
         List all patient-doctor mappings for current user's patients.
         """
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(queryset, many=True)
         
         return Response(
@@ -117,8 +185,11 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
         ).select_related('doctor')
         
         # Extract doctors from mappings
+        context = self.get_serializer_context()
+        if self.wants_sparse_fields():
+            mappings = prune_queryset(mappings, DoctorSerializer(context=context), prefix='doctor__')
         doctors = [mapping.doctor for mapping in mappings]
-        doctor_serializer = DoctorSerializer(doctors, many=True)
+        doctor_serializer = DoctorSerializer(doctors, many=True, context=context)
         
         return Response(
             {
@@ -133,27 +204,88 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
         """
         Remove a doctor from a patient.
         Delete a specific mapping by mapping ID.
+        
+        Runs a single owner-scoped DELETE ... RETURNING (see
+        PatientDoctorMappingQuerySet.delete_owned) instead of loading the
+        mapping, patient and doctor first.
         """
         try:
-            instance = self.get_object()
-            
-            # Store info for response message
-            patient_name = instance.patient.name
-            doctor_name = instance.doctor.name
-            
-            instance.delete()
-            
-            return Response(
-                {
-                    'message': f'Dr. {doctor_name} removed from patient {patient_name} successfully'
-                },
-                status=status.HTTP_204_NO_CONTENT
-            )
-        except PatientDoctorMapping.DoesNotExist:
+            mapping_id = int(kwargs.get('pk'))
+        except (TypeError, ValueError):
+            mapping_id = None
+        
+        deleted = []
+        if mapping_id is not None:
+            deleted = self._delete_owned([mapping_id])
+        
+        if not deleted:
             return Response(
                 {'error': 'Mapping not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        _, patient_name, doctor_name = deleted[0]
+        return Response(
+            {
+                'message': f'Dr. {doctor_name} removed from patient {patient_name} successfully'
+            },
+            status=status.HTTP_204_NO_CONTENT
+        )
+    
+    def _delete_owned(self, ids):
+        """
+        Delete the user's mappings in `ids` and record one change event
+        per deleted mapping, in one transaction.
+        """
+        with transaction.atomic(using=router.db_for_write(PatientDoctorMapping)):
+            deleted = PatientDoctorMapping.objects.delete_owned(self.request.user, ids)
+            if deleted:
+                record_changes(
+                    ChangeEvent.ENTITY_MAPPING,
+                    [mapping_id for mapping_id, _, _ in deleted],
+                    ChangeEvent.ACTION_DELETED,
+                    owner_id=self.request.user.pk
+                )
+        return deleted
+    
+    @action(detail=False, methods=['post'], url_path='bulk-remove')
+    def bulk_remove(self, request):
+        """
+        Remove several mappings at once.
+        URL: POST /api/mappings/bulk-remove/
+        Body: {"ids": [1, 2, 3]}
+        
+        Ids that don't exist or belong to another user's patients are
+        returned in not_found.
+        """
+        serializer = BulkRemoveSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {
+                    'error': 'Failed to remove mappings',
+                    'details': serializer.errors
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        ids = serializer.validated_data['ids']
+        deleted = self._delete_owned(ids)
+        deleted_ids = {mapping_id for mapping_id, _, _ in deleted}
+        
+        return Response(
+            {
+                'message': f'{len(deleted)} mapping(s) removed successfully',
+                'removed': [
+                    {
+                        'id': mapping_id,
+                        'patient_name': patient_name,
+                        'doctor_name': doctor_name
+                    }
+                    for mapping_id, patient_name, doctor_name in deleted
+                ],
+                'not_found': [i for i in dict.fromkeys(ids) if i not in deleted_ids]
+            }
+        )
     
     @action(detail=False, methods=['get'], url_path='patient/(?P<patient_id>[^/.]+)')
     def doctors_by_patient(self, request, patient_id=None):
@@ -176,8 +308,11 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
             is_active=True
         ).select_related('doctor')
         
+        context = self.get_serializer_context()
+        if self.wants_sparse_fields():
+            mappings = prune_queryset(mappings, DoctorSerializer(context=context), prefix='doctor__')
         doctors = [mapping.doctor for mapping in mappings]
-        doctor_serializer = DoctorSerializer(doctors, many=True)
+        doctor_serializer = DoctorSerializer(doctors, many=True, context=context)
         
         data = {
             'patient_id': patient.id,
@@ -186,4 +321,42 @@ class PatientDoctorMappingViewSet(viewsets.ModelViewSet):
             'doctors': doctor_serializer.data
         }
         
-        return Response(data)
\ No newline at end of file
+        return Response(data)
+    
+    @action(detail=False, methods=['get'], url_path='patient/(?P<patient_id>[^/.]+)/history')
+    def history(self, request, patient_id=None):
+        """
+        Every doctor a patient has been assigned to, newest first.
+        URL: GET /api/mappings/patient/{patient_id}/history/
+        
+        Inactive mappings are included. Old inactive mappings moved to
+        the archive table (`manage.py archive_mappings`) are only read
+        with ?archived=true; they follow the live ones, marked
+        "archived": true.
+        """
+        patient = get_object_or_404(
+            Patient.objects.only('id', 'name'),
+            id=patient_id,
+            created_by=request.user
+        )
+        include_archived = request.query_params.get('archived', '').lower() in ('1', 'true', 'yes')
+        
+        mappings = PatientDoctorMapping.objects.filter(
+            patient=patient
+        ).select_related('doctor').order_by('-assigned_date', '-id')
+        entries = [
+            dict(item, archived=False)
+            for item in MappingHistorySerializer(mappings, many=True).data
+        ]
+        if include_archived:
+            entries += [dict(item, archived=True) for item in archived_history(patient)]
+        
+        return Response(
+            {
+                'patient_id': patient.id,
+                'patient_name': patient.name,
+                'count': len(entries),
+                'includes_archived': include_archived,
+                'history': entries
+            }
+        )
\ No newline at end of file
@@ -1,16 +1,20 @@
 # apps/patients/admin.py
 
 from django.contrib import admin
+from apps.core.admin import LargeTableAdminMixin
 from .models import Patient
 
 @admin.register(Patient)
-class PatientAdmin(admin.ModelAdmin):
+class PatientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Admin interface for Patient model"""
     list_display = ['name', 'email', 'phone_number', 'blood_group', 'created_by', 'created_at']
     list_filter = ['blood_group', 'created_at']
     search_fields = ['name', 'email', 'phone_number']
     readonly_fields = ['created_at', 'updated_at']
     
+    list_select_related = ['created_by']
+    raw_id_fields = ['created_by']
+    
     fieldsets = (
         ('Personal Information', {
             'fields': ('name', 'email', 'phone_number', 'date_of_birth', 'address')
@@ -0,0 +1,17 @@
+# apps/patients/async_urls.py
+
+from django.urls import path
+from .async_views import patient_list, patient_detail
+
+"""
+Async patient URL patterns.
+All endpoints are prefixed with /api/async/patients/
+"""
+
+urlpatterns = [
+    # GET /api/async/patients/
+    path('', patient_list, name='patient-list-async'),
+    
+    # GET /api/async/patients/{id}/
+    path('<int:pk>/', patient_detail, name='patient-detail-async'),
+]
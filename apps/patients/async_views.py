@@ -0,0 +1,58 @@
+# apps/patients/async_views.py
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from apps.authentication.async_auth import async_jwt_required
+from .models import Patient
+from .serializers import PatientSerializer, PatientListSerializer
+
+"""
+Async (ASGI-native) read endpoints for patients.
+
+Same responses as PatientViewSet.list / retrieve. Related rows are
+loaded with select_related() up front because lazy FK access would
+hit the sync ORM from an async context.
+
+Read-only subset: ?fields=, ?modified_since=, throttling and query
+budgets are not applied here.
+"""
+
+
+@require_GET
+@async_jwt_required
+async def patient_list(request):
+    """
+    List all patients created by current user.
+    GET /api/async/patients/
+    """
+    queryset = Patient.objects.filter(
+        created_by=request.user
+    ).select_related('created_by')
+    patients = [patient async for patient in queryset.aiterator()]
+    serializer = PatientListSerializer(patients, many=True)
+
+    return JsonResponse(
+        {
+            'count': len(patients),
+            'patients': serializer.data
+        }
+    )
+
+
+@require_GET
+@async_jwt_required
+async def patient_detail(request, pk):
+    """
+    Retrieve a specific patient.
+    GET /api/async/patients/{id}/
+    """
+    try:
+        patient = await Patient.objects.select_related('created_by').aget(
+            pk=pk,
+            created_by=request.user
+        )
+    except Patient.DoesNotExist:
+        return JsonResponse({'detail': 'No Patient matches the given query.'}, status=404)
+
+    serializer = PatientSerializer(patient)
+    return JsonResponse(serializer.data)
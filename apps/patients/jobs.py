@@ -0,0 +1,27 @@
+# apps/patients/jobs.py
+
+from apps.changes.models import ChangeEvent
+from apps.changes.outbox import deletion_recorder
+from apps.core.deletion import run_chunked_delete
+from apps.jobs.registry import job
+from .models import Patient
+
+"""
+Background jobs for the patients app (run by `manage.py run_worker`).
+"""
+
+@job('patients.delete_patient', priority=5)
+def delete_patient(job, pk):
+    """
+    Delete a patient with a large number of doctor mappings.
+    """
+    patient = Patient.objects.filter(pk=pk).first()
+    if patient is None:
+        # Already deleted (e.g. a retried job that had finished)
+        return {'deleted': 0}
+    return run_chunked_delete(
+        job,
+        patient,
+        patient.doctor_mappings.all(),
+        on_delete=deletion_recorder(ChangeEvent.ENTITY_PATIENT, 'created_by_id')
+    )
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_by', 'updated_at'], name='patients_created_996f1b_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from apps.core.admin import trigram_search_indexes
+
+
+class Migration(migrations.Migration):
+    """
+    Trigram indexes behind the admin search_fields (PostgreSQL only).
+    """
+
+    dependencies = [
+        ('patients', '0002_patient_patients_created_996f1b_idx'),
+    ]
+
+    operations = [
+        trigram_search_indexes('patients', ['name', 'email', 'phone_number']),
+    ]
@@ -60,6 +60,8 @@ class Patient(models.Model):
         indexes = [
             models.Index(fields=['email']),
             models.Index(fields=['created_by', 'created_at']),
+            # List ?modified_since= (apps/changes/sync.py)
+            models.Index(fields=['created_by', 'updated_at']),
         ]
     
     def __str__(self):
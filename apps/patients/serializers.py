@@ -1,14 +1,26 @@
 # apps/patients/serializers.py
 
 from rest_framework import serializers
+from apps.core.instrumentation import TimedSerializerMixin
+from apps.core.serializers import DynamicFieldsMixin, UniqueFieldsMixin, VersionedUpdateMixin
 from .models import Patient
 from apps.authentication.serializers import UserSerializer
 
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(TimedSerializerMixin, DynamicFieldsMixin, UniqueFieldsMixin, VersionedUpdateMixin, serializers.ModelSerializer):
     """
     Serializer for Patient model.
     Handles CRUD operations for patients.
+    
+    Email uniqueness is checked by UniqueFieldsMixin. Updates write only
+    the changed columns, guarded by If-Match (VersionedUpdateMixin).
     """
+    unique_field_messages = {
+        'email': "A patient with this email already exists.",
+    }
+    expandable_fields = {
+        'created_by_details': ('apps.authentication.serializers.UserSerializer', {'source': 'created_by'}),
+    }
+    
     # Display creator information in responses
     created_by_details = UserSerializer(source='created_by', read_only=True)
     
@@ -30,55 +42,23 @@ class PatientSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
     
-    def validate_email(self, value):
-        """
-        Check that email is unique when creating or updating.
-        """
-        # Get the instance being updated (None for create)
-        instance = self.instance
-        
-        # Check if email already exists for a different patient
-        if instance:
-            # Updating - exclude current instance from uniqueness check
-            if Patient.objects.exclude(pk=instance.pk).filter(email=value).exists():
-                raise serializers.ValidationError(
-                    "A patient with this email already exists."
-                )
-        else:
-            # Creating - check if email exists
-            if Patient.objects.filter(email=value).exists():
-                raise serializers.ValidationError(
-                    "A patient with this email already exists."
-                )
-        
-        return value
-    
     def create(self, validated_data):
         """
         Create a new patient.
         The 'created_by' field is set in the view.
         """
         return Patient.objects.create(**validated_data)
-    
-    def update(self, instance, validated_data):
-        """
-        Update patient information.
-        """
-        # Update all fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        
-        instance.save()
-        return instance
 
 
-class PatientListSerializer(serializers.ModelSerializer):
+class PatientListSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Lightweight serializer for listing patients.
     Excludes heavy fields like medical_history.
     """
     created_by_name = serializers.CharField(source='created_by.name', read_only=True)
     
+    expandable_fields = PatientSerializer.expandable_fields
+    
     class Meta:
         model = Patient
         fields = [
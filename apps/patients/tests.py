@@ -1,3 +1,301 @@
-from django.test import TestCase
+# apps/patients/tests.py
+
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.core.testing import (
+    QueryCountTestCase,
+    bearer,
+    make_doctors,
+    make_mappings,
+    make_patients,
+    make_user,
+)
+from apps.changes.models import ChangeEvent
+from apps.core.serializers import VersionConflict
+from .models import Patient
+from .serializers import PatientSerializer
+
+
+class PatientViewSetQueryCountTests(QueryCountTestCase):
+    """
+    Every PatientViewSet action runs the same number of queries
+    whether the user has 1, 100 or 1,000 patients.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.patient = make_patients(self.user, 1, prefix='first')[0]
+
+    def grow_patients(self, size):
+        missing = size - Patient.objects.filter(created_by=self.user).count()
+        if missing > 0:
+            make_patients(self.user, missing)
+
+    def patient_payload(self, n):
+        return {
+            'name': f'New Patient {n}',
+            'email': f'new{n}@example.com',
+            'phone_number': '+1234567890',
+            'address': '1 Test St',
+            'blood_group': 'A+',
+            'medical_history': 'None',
+        }
+
+    def test_list(self):
+        self.assertConstantQueries(
+            self.grow_patients,
+            lambda n: self.client.get('/api/patients/')
+        )
+
+    def test_retrieve(self):
+        self.assertConstantQueries(
+            self.grow_patients,
+            lambda n: self.client.get(f'/api/patients/{self.patient.id}/')
+        )
+
+    def test_create(self):
+        self.assertConstantQueries(
+            self.grow_patients,
+            lambda n: self.client.post('/api/patients/', self.patient_payload(n), format='json')
+        )
+
+    def test_update(self):
+        self.assertConstantQueries(
+            self.grow_patients,
+            lambda n: self.client.put(
+                f'/api/patients/{self.patient.id}/',
+                self.patient_payload(n),
+                format='json'
+            )
+        )
+
+    def test_partial_update(self):
+        self.assertConstantQueries(
+            self.grow_patients,
+            lambda n: self.client.patch(
+                f'/api/patients/{self.patient.id}/',
+                {'address': f'{n} Updated St'},
+                format='json'
+            )
+        )
+
+    def test_destroy(self):
+        # The deleted patient has N doctors assigned
+        targets = {}
+
+        def grow(size):
+            targets[size] = make_patients(self.user, 1, prefix=f'target{size}-')[0]
+            make_mappings([targets[size]], make_doctors(size, prefix=f'doc{size}-'), self.user)
+
+        self.assertConstantQueries(
+            grow,
+            lambda n: self.client.delete(f'/api/patients/{targets[n].id}/')
+        )
+
+    def test_list_modified_since(self):
+        since = timezone.now().isoformat()
+        self.assertConstantQueries(
+            self.grow_patients,
+            lambda n: self.client.get('/api/patients/', {'modified_since': since})
+        )
+
+
+class PatientIncrementalSyncTests(QueryCountTestCase):
+    """
+    ?modified_since= returns only changed rows plus tombstones.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.old, self.changed, self.deleted = make_patients(self.user, 3)
+        Patient.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        self.since = timezone.now() - timedelta(hours=1)
+
+    def test_sync(self):
+        self.client.patch(f'/api/patients/{self.changed.id}/', {'name': 'Changed'}, format='json')
+        self.client.delete(f'/api/patients/{self.deleted.id}/')
+
+        response = self.client.get('/api/patients/', {'modified_since': self.since.isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.data['patients']], [self.changed.id])
+        self.assertEqual(response.data['deleted'], [self.deleted.id])
+        self.assertIn('next_modified_since', response.data)
+
+    def test_full_list_has_no_tombstones(self):
+        response = self.client.get('/api/patients/')
+
+        self.assertEqual(response.data['count'], 3)
+        self.assertNotIn('deleted', response.data)
+
+    def test_invalid_modified_since(self):
+        response = self.client.get('/api/patients/', {'modified_since': 'yesterday'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('modified_since', response.data['details'])
+
+
+class PatientSparseFieldsTests(QueryCountTestCase):
+    """
+    ?fields= and ?expand= prune both the response and the SQL.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.patient = make_patients(self.user, 1)[0]
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        # The SELECT of the rows themselves (lists also run a COUNT)
+        select = next(
+            query['sql'] for query in queries
+            if 'FROM "patients"' in query['sql'] and 'COUNT(' not in query['sql']
+        )
+        return response, select
+
+    def test_fields_on_list(self):
+        response, select = self.get('/api/patients/', fields='id,name')
+
+        self.assertEqual(list(response.data['patients'][0]), ['id', 'name'])
+        self.assertNotIn('"users"', select)
+        self.assertNotIn('medical_history', select)
+
+    def test_fields_on_retrieve(self):
+        response, select = self.get(f'/api/patients/{self.patient.id}/', fields='id,email')
+
+        self.assertEqual(response.data, {'id': self.patient.id, 'email': self.patient.email})
+        self.assertNotIn('"users"', select)
+
+    def test_expand_on_list(self):
+        response, select = self.get('/api/patients/', fields='id', expand='created_by_details')
+
+        patient = response.data['patients'][0]
+        self.assertEqual(list(patient), ['id', 'created_by_details'])
+        self.assertEqual(patient['created_by_details']['email'], self.user.email)
+        self.assertIn('"users"', select)
+
+    def test_unknown_names_are_ignored(self):
+        response, _ = self.get(f'/api/patients/{self.patient.id}/', fields='id,nope', expand='nope')
+
+        self.assertEqual(response.data, {'id': self.patient.id})
+
+    def test_writes_ignore_fields(self):
+        response = self.client.patch(
+            f'/api/patients/{self.patient.id}/?fields=id',
+            {'name': 'Renamed'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['patient']['name'], 'Renamed')
+
+
+class PatientConditionalUpdateTests(QueryCountTestCase):
+    """
+    Updates write only changed columns and honour If-Match.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+        self.patient = make_patients(self.user, 1)[0]
+        self.url = f'/api/patients/{self.patient.id}/'
+
+    def patch(self, data, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, data, format='json', headers=headers)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "patients"')]
+        return response, updates
+
+    def test_matching_if_match(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response, _ = self.patch({'name': 'Renamed'}, if_match=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response['ETag'], self.client.get(self.url)['ETag'])
+
+    def test_stale_if_match(self):
+        etag = self.client.get(self.url)['ETag']
+        self.patch({'name': 'Someone else'})
+
+        response, updates = self.patch({'name': 'Mine'}, if_match=etag)
+
+        self.assertEqual(response.status_code, 412)
+        self.assertIn('If-Match', response.data['details'])
+        self.assertEqual(updates, [])
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.name, 'Someone else')
+
+    def test_conflict_between_read_and_write(self):
+        # The row changes after the view loaded it: the UPDATE matches nothing
+        serializer = PatientSerializer(
+            self.patient,
+            data={'name': 'Mine'},
+            partial=True,
+            context={'expected_version': self.patient.updated_at}
+        )
+        Patient.objects.filter(pk=self.patient.pk).update(name='Theirs', updated_at=timezone.now())
+
+        self.assertTrue(serializer.is_valid())
+        # As in the view, the failed save rolls back its atomic block
+        with self.assertRaises(VersionConflict), transaction.atomic():
+            serializer.save()
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.name, 'Theirs')
+
+    def test_writes_only_changed_columns(self):
+        response, updates = self.patch({'name': self.patient.name, 'address': '2 New St'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"address"', updates[0])
+        self.assertIn('"updated_at"', updates[0])
+        self.assertNotIn('"name"', updates[0])
+        self.assertNotIn('"medical_history"', updates[0])
+
+    def test_noop_update_writes_nothing(self):
+        response, updates = self.patch({'name': self.patient.name})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(updates, [])
+        self.assertFalse(ChangeEvent.objects.exists())
+
+
+class PatientAsyncViewTests(QueryCountTestCase):
+    """
+    The async read views only ever return the current user's patients.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.other = make_user('other@example.com')
+        self.patient = make_patients(self.user, 1, prefix='mine')[0]
+        self.foreign = make_patients(self.other, 1, prefix='theirs')[0]
+        self.headers = {'Authorization': bearer(self.user)}
+
+    async def test_list_is_owner_scoped(self):
+        response = await self.async_client.get('/api/async/patients/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual([p['id'] for p in response.json()['patients']], [self.patient.id])
+
+    async def test_detail(self):
+        response = await self.async_client.get(f'/api/async/patients/{self.patient.id}/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.patient.id)
+
+    async def test_other_users_patient_is_404(self):
+        response = await self.async_client.get(f'/api/async/patients/{self.foreign.id}/', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
 
-# Create your tests here.
@@ -1,12 +1,21 @@
 # apps/patients/views.py
 
-from rest_framework import viewsets, status
+from django.db import router, transaction
+from rest_framework import serializers, viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from apps.changes.models import ChangeEvent
+from apps.changes.outbox import deletion_recorder, record_change
+from apps.changes.sync import IncrementalSyncMixin
+from apps.core.deletion import delete_with_dependents
+from apps.core.serializers import VersionConflict
+from apps.core.views import ConditionalUpdateMixin, DynamicFieldsViewMixin, ShardedViewMixin
+from apps.idempotency.mixins import IdempotencyMixin
+from apps.jobs.views import job_accepted_response
 from .models import Patient
 from .serializers import PatientSerializer, PatientListSerializer
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(ShardedViewMixin, IdempotencyMixin, ConditionalUpdateMixin, DynamicFieldsViewMixin, IncrementalSyncMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing patients.
     
@@ -16,6 +25,8 @@ class PatientViewSet(viewsets.ModelViewSet):
     - GET /api/patients/{id}/ - Retrieve a specific patient
     - PUT /api/patients/{id}/ - Update a patient
     - PATCH /api/patients/{id}/ - Partial update
+      (send the ETag from a previous read as If-Match to get 412
+      instead of overwriting someone else's change)
     - DELETE /api/patients/{id}/ - Delete a patient
     
     All endpoints require authentication.
@@ -23,12 +34,33 @@ class PatientViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = PatientSerializer
     
+    # ?modified_since= on list (apps/changes/sync.py)
+    sync_entity = ChangeEvent.ENTITY_PATIENT
+    sync_owned = True
+    
+    # Max queries per action (checked by apps.core.middleware.RequestTimingMiddleware),
+    # including the user lookup for the JWT
+    # Writes include SAVEPOINT/RELEASE when they run inside a transaction (e.g. tests)
+    query_budgets = {
+        'list': 4,
+        'retrieve': 2,
+        'create': 6,
+        'update': 7,
+        'partial_update': 7,
+        # The collector also deletes the patient's archived mappings
+        'destroy': 9,
+    }
+    
     def get_queryset(self):
         """
         Return only patients created by the current user.
         This ensures users can only see their own patients.
         """
-        return Patient.objects.filter(created_by=self.request.user)
+        # created_by is rendered by both serializers (created_by_name /
+        # created_by_details); join it instead of one query per patient
+        return Patient.objects.filter(
+            created_by=self.request.user
+        ).select_related('created_by')
     
     def get_serializer_class(self):
         """
@@ -48,7 +80,26 @@ class PatientViewSet(viewsets.ModelViewSet):
         
         if serializer.is_valid():
             # Set the created_by field to current user
-            serializer.save(created_by=request.user)
+            try:
+                # The change event commits or rolls back with the write
+                with transaction.atomic(using=router.db_for_write(Patient)):
+                    patient = serializer.save(created_by=request.user)
+                    record_change(
+                        ChangeEvent.ENTITY_PATIENT,
+                        patient.pk,
+                        ChangeEvent.ACTION_CREATED,
+                        owner_id=patient.created_by_id,
+                        data=serializer.data
+                    )
+            except serializers.ValidationError as e:
+                # Unique constraint hit by a concurrent request
+                return Response(
+                    {
+                        'error': 'Failed to create patient',
+                        'details': e.detail
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
             return Response(
                 {
@@ -73,7 +124,7 @@ class PatientViewSet(viewsets.ModelViewSet):
         try:
             instance = self.get_object()
             serializer = self.get_serializer(instance)
-            return Response(serializer.data)
+            return self.set_etag(Response(serializer.data), instance)
         except Patient.DoesNotExist:
             return Response(
                 {'error': 'Patient not found'},
@@ -94,6 +145,10 @@ class PatientViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        response = self.check_if_match(instance, 'Failed to update patient')
+        if response is not None:
+            return response
+        
         serializer = self.get_serializer(
             instance,
             data=request.data,
@@ -101,12 +156,37 @@ class PatientViewSet(viewsets.ModelViewSet):
         )
         
         if serializer.is_valid():
-            serializer.save()
-            return Response(
-                {
-                    'message': 'Patient updated successfully',
-                    'patient': serializer.data
-                }
+            try:
+                # The change event commits or rolls back with the write
+                with transaction.atomic(using=router.db_for_write(Patient)):
+                    patient = serializer.save()
+                    # A no-op update writes nothing, so there is no change to record
+                    if serializer.changed_fields:
+                        record_change(
+                            ChangeEvent.ENTITY_PATIENT,
+                            patient.pk,
+                            ChangeEvent.ACTION_UPDATED,
+                            owner_id=patient.created_by_id,
+                            data=serializer.data
+                        )
+            except serializers.ValidationError as e:
+                return Response(
+                    {
+                        'error': 'Failed to update patient',
+                        'details': e.detail
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            except VersionConflict:
+                return self.precondition_failed('Failed to update patient')
+            return self.set_etag(
+                Response(
+                    {
+                        'message': 'Patient updated successfully',
+                        'patient': serializer.data
+                    }
+                ),
+                patient
             )
         
         return Response(
@@ -130,7 +210,19 @@ class PatientViewSet(viewsets.ModelViewSet):
         """
         try:
             instance = self.get_object()
-            instance.delete()
+            
+            # Mappings are deleted in chunks first; very large fan-outs
+            # run as a background job (see apps/core/deletion.py)
+            job = delete_with_dependents(
+                instance,
+                instance.doctor_mappings.all(),
+                'patients.delete_patient',
+                owner=request.user,
+                on_delete=deletion_recorder(ChangeEvent.ENTITY_PATIENT, 'created_by_id')
+            )
+            if job is not None:
+                return job_accepted_response(job, 'Patient deletion started')
+            
             return Response(
                 {'message': 'Patient deleted successfully'},
                 status=status.HTTP_204_NO_CONTENT
@@ -144,13 +236,32 @@ class PatientViewSet(viewsets.ModelViewSet):
     def list(self, request, *args, **kwargs):
         """
         List all patients created by current user.
+        
+        With ?modified_since=<ISO datetime> only rows changed since then
+        are returned, plus the ids deleted since then in `deleted`.
+        Clients pass the returned next_modified_since on their next sync.
         """
-        queryset = self.get_queryset()
+        try:
+            since = self.get_modified_since()
+        except serializers.ValidationError as e:
+            return Response(
+                {
+                    'error': 'Failed to list patients',
+                    'details': e.detail
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        watermark = self.next_watermark()
+        queryset = self.filter_modified_since(self.filter_queryset(self.get_queryset()), since)
         serializer = self.get_serializer(queryset, many=True)
         
-        return Response(
-            {
-                'count': queryset.count(),
-                'patients': serializer.data
-            }
-        )
\ No newline at end of file
+        data = {
+            'count': queryset.count(),
+            'patients': serializer.data,
+            'next_modified_since': watermark
+        }
+        if since is not None:
+            data['deleted'] = self.get_tombstones(since)
+        
+        return Response(data)
\ No newline at end of file
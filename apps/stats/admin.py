@@ -0,0 +1,12 @@
+# apps/stats/admin.py
+
+from django.contrib import admin
+from .models import DashboardSnapshot
+
+@admin.register(DashboardSnapshot)
+class DashboardSnapshotAdmin(admin.ModelAdmin):
+    """Admin interface for precomputed dashboard statistics"""
+    list_display = ['user', 'computed_at']
+    search_fields = ['user__email']
+    readonly_fields = ['user', 'data', 'computed_at']
+    list_select_related = ['user']
@@ -0,0 +1,15 @@
+# apps/stats/jobs.py
+
+from apps.jobs.registry import job
+from .summary import refresh_snapshots
+
+"""
+Background jobs for the stats app (run by `manage.py run_worker`).
+"""
+
+@job('stats.refresh_snapshots')
+def refresh_dashboard_snapshots(job):
+    """
+    Rebuild every user's DashboardSnapshot.
+    """
+    return {'snapshots': refresh_snapshots()}
@@ -0,0 +1,26 @@
+# apps/stats/management/commands/refresh_stats.py
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs.registry import enqueue
+from apps.stats.summary import refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the dashboard statistics snapshots (run periodically, e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Queue a background job instead of refreshing in this process'
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = enqueue('stats.refresh_snapshots')
+            self.stdout.write(self.style.SUCCESS(f'Queued job #{job.pk}'))
+            return
+
+        count = refresh_snapshots()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {count} snapshot(s)'))
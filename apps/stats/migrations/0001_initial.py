@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard_snapshot', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('data', models.JSONField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Dashboard Snapshot',
+                'verbose_name_plural': 'Dashboard Snapshots',
+                'db_table': 'dashboard_snapshots',
+            },
+        ),
+    ]
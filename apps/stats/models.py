@@ -0,0 +1,38 @@
+# apps/stats/models.py
+
+from django.db import models
+from django.conf import settings
+
+class DashboardSnapshot(models.Model):
+    """
+    Precomputed dashboard statistics for one user.
+    
+    Why a summary table?
+    - GET /api/stats/ reads one row instead of running the GROUP BY
+      queries on every dashboard load
+    - `manage.py refresh_stats` rebuilds all rows with the same handful
+      of queries, grouped by owner, however many users there are
+    
+    Rows older than STATS_SNAPSHOT_MAX_AGE are ignored and the stats are
+    computed live instead.
+    """
+    
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='dashboard_snapshot'
+    )
+    
+    # Same shape as the `stats` key of GET /api/stats/
+    data = models.JSONField()
+    
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'dashboard_snapshots'
+        verbose_name = 'Dashboard Snapshot'
+        verbose_name_plural = 'Dashboard Snapshots'
+    
+    def __str__(self):
+        return f"Stats for {self.user_id} at {self.computed_at}"
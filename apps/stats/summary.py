@@ -0,0 +1,163 @@
+# apps/stats/summary.py
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from apps.core.sharding import for_each_shard
+from apps.doctors.models import Doctor
+from apps.mappings.models import PatientDoctorMapping
+from apps.patients.models import Patient
+from .models import DashboardSnapshot
+
+"""
+Dashboard statistics, computed in the database.
+
+Each statistic is one GROUP BY query. Per-user statistics are grouped by
+owner as well, so the same four queries serve one user (GET /api/stats/)
+or every user at once (refresh_snapshots()):
+
+1. patients per blood group
+2. new patients per day
+3. active mappings per doctor
+4. doctors per specialization and availability, with fee totals (shared
+   by all users)
+"""
+
+
+def _fee(total, count):
+    if not count:
+        return None
+    return str((Decimal(total) / count).quantize(Decimal('0.01')))
+
+
+def doctor_stats():
+    """
+    Doctors per specialization and availability, and average fees.
+    """
+    rows = Doctor.objects.order_by().values('specialization', 'is_available').annotate(
+        count=Count('id'),
+        fees=Sum('consultation_fee')
+    )
+    
+    by_specialization = defaultdict(lambda: {'available': 0, 'unavailable': 0, 'fees': Decimal(0)})
+    for row in rows:
+        entry = by_specialization[row['specialization']]
+        entry['available' if row['is_available'] else 'unavailable'] += row['count']
+        entry['fees'] += row['fees'] or 0
+    
+    specializations = []
+    total = available = 0
+    fees = Decimal(0)
+    for name in sorted(by_specialization):
+        entry = by_specialization[name]
+        count = entry['available'] + entry['unavailable']
+        specializations.append({
+            'specialization': name,
+            'count': count,
+            'available': entry['available'],
+            'unavailable': entry['unavailable'],
+            'average_consultation_fee': _fee(entry['fees'], count)
+        })
+        total += count
+        available += entry['available']
+        fees += entry['fees']
+    
+    return {
+        'total': total,
+        'available': available,
+        'average_consultation_fee': _fee(fees, total),
+        'by_specialization': specializations
+    }
+
+
+def owner_stats(owner_ids=None, days=None):
+    """
+    Per-user statistics keyed by user id. `owner_ids` limits the users
+    (None: every user with patients); `days` is the new-patients window.
+    """
+    days = days or settings.STATS_NEW_PATIENT_DAYS
+    patients = Patient.objects.order_by()
+    mappings = PatientDoctorMapping.objects.order_by().filter(is_active=True)
+    if owner_ids is not None:
+        patients = patients.filter(created_by_id__in=owner_ids)
+        mappings = mappings.filter(patient__created_by_id__in=owner_ids)
+    
+    stats = defaultdict(lambda: {
+        'patients': {'total': 0, 'by_blood_group': [], 'new_per_day': []},
+        'mappings': {'active': 0, 'per_doctor': []},
+    })
+    
+    blood_groups = patients.values('created_by_id', 'blood_group').annotate(
+        count=Count('id')
+    ).order_by('created_by_id', 'blood_group')
+    for row in blood_groups:
+        entry = stats[row['created_by_id']]['patients']
+        entry['total'] += row['count']
+        entry['by_blood_group'].append({'blood_group': row['blood_group'], 'count': row['count']})
+    
+    start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    new_patients = patients.filter(created_at__gte=start).annotate(
+        day=TruncDate('created_at')
+    ).values('created_by_id', 'day').annotate(
+        count=Count('id')
+    ).order_by('created_by_id', 'day')
+    for row in new_patients:
+        stats[row['created_by_id']]['patients']['new_per_day'].append(
+            {'date': row['day'].isoformat(), 'count': row['count']}
+        )
+    
+    per_doctor = mappings.values('patient__created_by_id', 'doctor_id', 'doctor__name').annotate(
+        count=Count('id')
+    ).order_by('patient__created_by_id', '-count', 'doctor_id')
+    for row in per_doctor:
+        entry = stats[row['patient__created_by_id']]['mappings']
+        entry['active'] += row['count']
+        if len(entry['per_doctor']) < settings.STATS_TOP_DOCTORS:
+            entry['per_doctor'].append({
+                'doctor_id': row['doctor_id'],
+                'doctor_name': row['doctor__name'],
+                'count': row['count']
+            })
+    
+    return stats
+
+
+def compute_stats(user, days=None):
+    """
+    Live statistics for one user (four queries).
+    """
+    data = owner_stats([user.pk], days)[user.pk]
+    data['doctors'] = doctor_stats()
+    return data
+
+
+def refresh_snapshots():
+    """
+    Rebuild DashboardSnapshot for every user with patients and drop the
+    snapshots of users who have none left, on every shard. Returns the
+    number of rows written.
+    """
+    computed_at = timezone.now()
+    doctors = doctor_stats()
+    written = 0
+    for _ in for_each_shard():
+        snapshots = []
+        for owner_id, data in owner_stats().items():
+            data['doctors'] = doctors
+            snapshots.append(DashboardSnapshot(user_id=owner_id, data=data, computed_at=computed_at))
+        
+        DashboardSnapshot.objects.bulk_create(
+            snapshots,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['data', 'computed_at']
+        )
+        DashboardSnapshot.objects.filter(computed_at__lt=computed_at).delete()
+        written += len(snapshots)
+    return written
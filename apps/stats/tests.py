@@ -0,0 +1,108 @@
+# apps/stats/tests.py
+
+from django.test import override_settings
+
+from apps.core.testing import QueryCountTestCase, make_doctors, make_mappings, make_patients, make_user
+from apps.doctors.models import Doctor
+from apps.patients.models import Patient
+from .models import DashboardSnapshot
+from .summary import refresh_snapshots
+
+
+class DashboardStatsTests(QueryCountTestCase):
+    """
+    Statistics are computed with a fixed number of GROUP BY queries and
+    served from the snapshot table when it is fresh.
+    """
+
+    def setUp(self):
+        self.user = make_user()
+        self.authenticate(self.user)
+
+    def grow(self, size):
+        missing = size - Patient.objects.filter(created_by=self.user).count()
+        if missing > 0:
+            patients = make_patients(self.user, missing, prefix=f'p{size}-')
+            make_mappings(patients, make_doctors(1, prefix=f'd{size}-'), self.user)
+
+    def test_live_query_count(self):
+        counts = self.assertConstantQueries(self.grow, lambda n: self.client.get('/api/stats/', {'live': 'true'}))
+        # User lookup + four GROUP BY queries
+        self.assertEqual(set(counts.values()), {5})
+
+    def test_live_stats(self):
+        patients = make_patients(self.user, 3)
+        Patient.objects.filter(pk=patients[0].pk).update(blood_group='A+')
+        doctors = make_doctors(2)
+        Doctor.objects.filter(pk=doctors[1].pk).update(
+            specialization='Cardiologist',
+            consultation_fee=300,
+            is_available=False
+        )
+        make_mappings(patients, doctors[:1], self.user)
+        make_mappings(patients[:1], doctors[1:], self.user)
+        # Another user's patients are not counted
+        make_mappings(make_patients(make_user('other@example.com'), 2, prefix='other'), doctors, self.user)
+
+        response = self.client.get('/api/stats/', {'live': 'true'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['source'], 'live')
+        stats = response.data['stats']
+        self.assertEqual(stats['patients']['total'], 3)
+        self.assertEqual(stats['patients']['by_blood_group'], [
+            {'blood_group': 'A+', 'count': 1},
+            {'blood_group': 'O+', 'count': 2},
+        ])
+        self.assertEqual(sum(day['count'] for day in stats['patients']['new_per_day']), 3)
+        self.assertEqual(stats['mappings']['active'], 4)
+        self.assertEqual(
+            [(row['doctor_id'], row['count']) for row in stats['mappings']['per_doctor']],
+            [(doctors[0].id, 3), (doctors[1].id, 1)]
+        )
+        self.assertEqual(stats['doctors']['total'], 2)
+        self.assertEqual(stats['doctors']['available'], 1)
+        self.assertEqual(stats['doctors']['average_consultation_fee'], '200.00')
+        self.assertEqual(stats['doctors']['by_specialization'][0], {
+            'specialization': 'Cardiologist',
+            'count': 1,
+            'available': 0,
+            'unavailable': 1,
+            'average_consultation_fee': '300.00',
+        })
+
+    def test_snapshot(self):
+        make_patients(self.user, 2)
+        self.assertEqual(refresh_snapshots(), 1)
+        make_patients(self.user, 1, prefix='later')
+
+        # User lookup + snapshot
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/stats/')
+        self.assertEqual(response.data['source'], 'snapshot')
+        self.assertEqual(response.data['stats']['patients']['total'], 2)
+
+        # A different window is computed live
+        response = self.client.get('/api/stats/', {'days': 7})
+        self.assertEqual(response.data['source'], 'live')
+        self.assertEqual(response.data['stats']['patients']['total'], 3)
+
+    @override_settings(STATS_SNAPSHOT_MAX_AGE=0)
+    def test_snapshots_disabled(self):
+        make_patients(self.user, 1)
+        refresh_snapshots()
+
+        response = self.client.get('/api/stats/')
+        self.assertEqual(response.data['source'], 'live')
+
+    def test_refresh_drops_users_without_patients(self):
+        patient = make_patients(self.user, 1)[0]
+        refresh_snapshots()
+        patient.delete()
+
+        self.assertEqual(refresh_snapshots(), 0)
+        self.assertFalse(DashboardSnapshot.objects.exists())
+
+    def test_invalid_days(self):
+        response = self.client.get('/api/stats/', {'days': 'abc'})
+        self.assertEqual(response.status_code, 400)
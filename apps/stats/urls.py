@@ -0,0 +1,15 @@
+# apps/stats/urls.py
+
+from django.urls import path
+from .views import DashboardStatsView
+
+"""
+Dashboard statistics URL patterns.
+All statistics endpoints are prefixed with /api/stats/
+
+- GET /api/stats/ -> statistics for the current user
+"""
+
+urlpatterns = [
+    path('', DashboardStatsView.as_view(), name='dashboard-stats'),
+]
@@ -0,0 +1,67 @@
+# apps/stats/views.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.core.views import ShardedViewMixin
+from .models import DashboardSnapshot
+from .summary import compute_stats
+
+class DashboardStatsView(ShardedViewMixin, APIView):
+    """
+    Dashboard statistics for the current user.
+    GET /api/stats/?days=<n>&live=<true|false>
+    
+    Returns patients per blood group and new patients per day (last
+    `days` days, default STATS_NEW_PATIENT_DAYS), active mappings per
+    doctor for the user's patients, and doctors per specialization and
+    availability with average consultation fees.
+    
+    Served from the user's DashboardSnapshot (see `manage.py
+    refresh_stats`) when one is newer than STATS_SNAPSHOT_MAX_AGE
+    seconds and the default window is asked for. Otherwise, or with
+    ?live=true, computed with four GROUP BY queries.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    # Max queries (checked by apps.core.middleware.RequestTimingMiddleware)
+    # JWT user lookup + snapshot lookup + four GROUP BY queries when it misses
+    query_budget = 6
+    
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', settings.STATS_NEW_PATIENT_DAYS))
+        except ValueError:
+            return Response(
+                {'error': 'days must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        days = max(1, min(days, settings.STATS_MAX_DAYS))
+        live = request.query_params.get('live', '').lower() in ('1', 'true', 'yes')
+        
+        if not live and days == settings.STATS_NEW_PATIENT_DAYS and settings.STATS_SNAPSHOT_MAX_AGE:
+            snapshot = DashboardSnapshot.objects.filter(
+                user=request.user,
+                computed_at__gte=timezone.now() - timedelta(seconds=settings.STATS_SNAPSHOT_MAX_AGE)
+            ).first()
+            if snapshot is not None:
+                return Response(
+                    {
+                        'stats': snapshot.data,
+                        'computed_at': snapshot.computed_at,
+                        'source': 'snapshot'
+                    }
+                )
+        
+        return Response(
+            {
+                'stats': compute_stats(request.user, days),
+                'computed_at': timezone.now(),
+                'source': 'live'
+            }
+        )
@@ -0,0 +1,233 @@
+# benchmarks/asgi_vs_wsgi.py
+
+"""
+Compare concurrency capacity of the async (ASGI) read endpoints against
+the synchronous DRF viewsets served through WSGI.
+
+Both paths run in-process against a seeded test database:
+- WSGI: Django's WSGIHandler driven by a thread pool (one thread per
+  in-flight request, like a threaded gunicorn/uwsgi worker)
+- ASGI: Django's ASGIHandler driven by an asyncio event loop with
+  `--concurrency` requests in flight (like a single uvicorn worker)
+
+Use --db-latency-ms to simulate a network round trip to PostgreSQL;
+with 0 the numbers are dominated by Python CPU time.
+
+Usage:
+    python -m benchmarks.asgi_vs_wsgi --requests 500 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import (
+    access_token_for,
+    seed,
+    setup_django,
+    summarize,
+    test_database,
+)
+
+# (sync path, async path) pairs; {patient_id} / {doctor_id} are filled in
+ENDPOINTS = [
+    ('doctor-list', '/api/doctors/', '/api/async/doctors/'),
+    ('doctor-detail', '/api/doctors/{doctor_id}/', '/api/async/doctors/{doctor_id}/'),
+    ('patient-list', '/api/patients/', '/api/async/patients/'),
+    ('patient-detail', '/api/patients/{patient_id}/', '/api/async/patients/{patient_id}/'),
+    (
+        'doctors-by-patient',
+        '/api/mappings/patient/{patient_id}/',
+        '/api/async/mappings/patient/{patient_id}/',
+    ),
+]
+
+
+def install_db_latency(delay):
+    """
+    Sleep `delay` seconds around every query to mimic network latency.
+    """
+    from django.db.backends.signals import connection_created
+
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def on_connection(sender, connection, **kwargs):
+        connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(on_connection, weak=False)
+
+    from django.db import connections
+    for conn in connections.all():
+        if conn.connection is not None:
+            conn.execute_wrappers.append(wrapper)
+
+
+def run_wsgi(path, token, total, concurrency):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    import io
+
+    handler = WSGIHandler()
+
+    def one_request(_):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'testserver',
+            'HTTP_AUTHORIZATION': f'Bearer {token}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(b''),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status_holder = []
+        started = time.perf_counter()
+        response = handler(environ, lambda status, headers: status_holder.append(status))
+        b''.join(response)
+        response.close()
+        elapsed = time.perf_counter() - started
+        connections.close_all()
+        return elapsed, status_holder[0]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(total)))
+    wall = time.perf_counter() - started
+    return results, wall
+
+
+def run_asgi(path, token, total, concurrency):
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+
+    async def one_request():
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Bearer {token}'.encode()),
+            ],
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+        sent_body = False
+        disconnected = asyncio.Event()
+        status_holder = []
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status_holder.append(message['status'])
+
+        started = time.perf_counter()
+        await handler(scope, receive, send)
+        elapsed = time.perf_counter() - started
+        disconnected.set()
+        return elapsed, status_holder[0]
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded():
+            async with semaphore:
+                return await one_request()
+
+        return await asyncio.gather(*(bounded() for _ in range(total)))
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    wall = time.perf_counter() - started
+    return results, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300, help='Requests per endpoint and mode')
+    parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight')
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--doctors', type=int, default=100)
+    parser.add_argument('--mappings-per-patient', type=int, default=3)
+    parser.add_argument('--db-latency-ms', type=float, default=0.0)
+    parser.add_argument('--settings', default=None, help='DJANGO_SETTINGS_MODULE override')
+    parser.add_argument('--output', default=None, help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    setup_django(args.settings)
+
+    with test_database():
+        from apps.doctors.models import Doctor
+        from apps.patients.models import Patient
+
+        user = seed(
+            users=1,
+            patients=args.patients,
+            doctors=args.doctors,
+            mappings_per_patient=args.mappings_per_patient,
+        )[0]
+        token = access_token_for(user)
+        ids = {
+            'patient_id': Patient.objects.filter(created_by=user).values_list('id', flat=True).first(),
+            'doctor_id': Doctor.objects.values_list('id', flat=True).first(),
+        }
+
+        if args.db_latency_ms:
+            install_db_latency(args.db_latency_ms / 1000)
+
+        report = {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'db_latency_ms': args.db_latency_ms,
+            'endpoints': {},
+        }
+        for name, sync_path, async_path in ENDPOINTS:
+            wsgi_results, wsgi_wall = run_wsgi(
+                sync_path.format(**ids), token, args.requests, args.concurrency
+            )
+            asgi_results, asgi_wall = run_asgi(
+                async_path.format(**ids), token, args.requests, args.concurrency
+            )
+            report['endpoints'][name] = {
+                'wsgi': summarize([r[0] for r in wsgi_results], wsgi_wall),
+                'asgi': summarize([r[0] for r in asgi_results], asgi_wall),
+                'errors': {
+                    'wsgi': sum(1 for r in wsgi_results if not str(r[1]).startswith('200')),
+                    'asgi': sum(1 for r in asgi_results if r[1] != 200),
+                },
+            }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/cold_start.py
+
+"""
+Compare start-up time and per-request overhead of settings profiles.
+
+Each profile is measured in fresh interpreter processes (--runs of them),
+the way an autoscaled pod starts:
+- setup_ms: import settings and run django.setup() (app loading)
+- urlconf_ms: import and resolve the URL configuration
+- first_request_ms: first request through the middleware stack
+- modules: number of modules imported after the first request
+
+Then --requests requests per process go to endpoints that never touch
+the database (the API root and an unauthenticated 401), so the latency
+is middleware, routing and rendering overhead only.
+
+Usage:
+    python -m benchmarks.cold_start --runs 5 --requests 2000
+    python -m benchmarks.cold_start --settings healthcare_backend.settings_api
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import ROOT, summarize
+
+PROFILES = 'healthcare_backend.settings,healthcare_backend.settings_api'
+
+# Database-free requests: (name, path)
+REQUESTS = [
+    ('api-root', '/api/'),
+    ('unauthenticated', '/api/patients/'),
+]
+
+
+def child(settings_module, requests):
+    """
+    Runs in a fresh process; prints one JSON result line.
+    """
+    started = time.perf_counter()
+    from benchmarks.common import setup_django
+    setup_django(settings_module)
+    setup_done = time.perf_counter()
+
+    from django.urls import get_resolver
+    get_resolver().resolve('/api/')
+    urlconf_done = time.perf_counter()
+
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    client = Client()
+
+    first = time.perf_counter()
+    client.get(REQUESTS[0][1])
+    first_done = time.perf_counter()
+
+    samples = {}
+    for name, path in REQUESTS:
+        durations = samples[name] = []
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            client.get(path)
+            durations.append(time.perf_counter() - t0)
+
+    print(json.dumps({
+        'setup_ms': (setup_done - started) * 1000,
+        'urlconf_ms': (urlconf_done - setup_done) * 1000,
+        'first_request_ms': (first_done - first) * 1000,
+        'modules': len(sys.modules),
+        'samples': samples,
+    }))
+
+
+def measure(settings_module, runs, requests):
+    results = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, '-m', 'benchmarks.cold_start', '--child',
+             '--settings', settings_module, '--requests', str(requests)],
+            cwd=ROOT,
+            text=True,
+            # One request log line per request would dominate the timings
+            env={'REQUEST_LOG_LEVEL': 'WARNING', **os.environ}
+        )
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = {
+        key: round(statistics.median(result[key] for result in results), 3)
+        for key in ('setup_ms', 'urlconf_ms', 'first_request_ms', 'modules')
+    }
+    report['requests'] = {
+        name: summarize([sample for result in results for sample in result['samples'][name]])
+        for name, _ in REQUESTS
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=PROFILES, help='Comma-separated settings modules to compare')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per profile (medians are reported)')
+    parser.add_argument('--requests', type=int, default=1000, help='Timed requests per endpoint per process')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.settings, args.requests)
+        return
+
+    report = {
+        settings_module: measure(settings_module, args.runs, args.requests)
+        for settings_module in args.settings.split(',') if settings_module
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
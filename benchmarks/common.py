@@ -0,0 +1,157 @@
+# benchmarks/common.py
+
+import os
+import statistics
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway test database (created and destroyed
+the same way `manage.py test` does), so they never touch real data.
+"""
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BENCHMARK_PASSWORD = 'BenchPass123!'
+
+
+def setup_django(settings_module=None):
+    """
+    Configure Django for a standalone script.
+    """
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    # Benchmarks send far more requests per client than the rate limits allow
+    os.environ.setdefault('THROTTLE_ENABLED', 'False')
+    if settings_module:
+        os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    else:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare_backend.settings')
+
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """
+    Create the test database(s) for the duration of the block.
+    """
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        yield
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+
+def seed(users=1, patients=100, doctors=50, mappings_per_patient=2):
+    """
+    Bulk-insert a dataset and return the list of created users.
+
+    Patients are spread evenly across users; each patient is mapped to
+    `mappings_per_patient` doctors (round-robin).
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from apps.doctors.models import Doctor
+    from apps.mappings.models import PatientDoctorMapping
+    from apps.patients.models import Patient
+
+    User = get_user_model()
+    password = make_password(BENCHMARK_PASSWORD)
+
+    user_objs = User.objects.bulk_create([
+        User(
+            username=f'bench{i}@example.com',
+            email=f'bench{i}@example.com',
+            name=f'Bench User {i}',
+            password=password,
+        )
+        for i in range(users)
+    ])
+    user_objs = list(User.objects.filter(email__startswith='bench').order_by('id'))
+
+    Doctor.objects.bulk_create([
+        Doctor(
+            name=f'Doctor {i}',
+            email=f'doctor{i}@example.com',
+            phone_number='+1234567890',
+            specialization=('Cardiologist', 'Neurologist', 'General Physician')[i % 3],
+            qualification='MBBS',
+            experience_years=i % 30,
+            license_number=f'LIC-{i:08d}',
+            clinic_address='1 Bench St',
+            consultation_fee=100 + i % 50,
+            is_available=i % 4 != 0,
+        )
+        for i in range(doctors)
+    ], batch_size=1000)
+    doctor_ids = list(Doctor.objects.order_by('id').values_list('id', flat=True))
+
+    Patient.objects.bulk_create([
+        Patient(
+            created_by=user_objs[i % len(user_objs)],
+            name=f'Patient {i}',
+            email=f'patient{i}@example.com',
+            phone_number='+1234567890',
+            blood_group=('A+', 'B+', 'O+', 'AB-')[i % 4],
+            medical_history='None',
+        )
+        for i in range(patients)
+    ], batch_size=1000)
+
+    if doctor_ids and mappings_per_patient:
+        per_patient = min(mappings_per_patient, len(doctor_ids))
+        patient_rows = Patient.objects.order_by('id').values_list('id', 'created_by_id')
+        PatientDoctorMapping.objects.bulk_create([
+            PatientDoctorMapping(
+                patient_id=patient_id,
+                doctor_id=doctor_ids[(index + offset) % len(doctor_ids)],
+                assigned_by_id=owner_id,
+            )
+            for index, (patient_id, owner_id) in enumerate(patient_rows)
+            for offset in range(per_patient)
+        ], batch_size=1000)
+
+    return user_objs
+
+
+def access_token_for(user):
+    """
+    Issue an access token without going through the login endpoint.
+    """
+    from apps.authentication.tokens import token_service
+    return token_service.issue_pair(user)['access']
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_samples) - 1))), len(sorted_samples) - 1)
+    return sorted_samples[index]
+
+
+def summarize(samples, wall_time=None):
+    """
+    Latency summary (milliseconds) for a list of durations in seconds.
+    """
+    ordered = sorted(samples)
+    summary = {
+        'requests': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+    }
+    if wall_time:
+        summary['throughput_rps'] = round(len(ordered) / wall_time, 1)
+    return summary
@@ -0,0 +1,69 @@
+# benchmarks/compare.py
+
+"""
+Compare two benchmark result files produced by benchmarks/run.py.
+
+Prints p50/p95/p99 and throughput per scenario with the relative change,
+and exits with status 1 if any scenario's p95 regressed by more than
+--threshold percent (useful in CI).
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+
+import argparse
+import json
+import sys
+
+
+def _delta(old, new):
+    if not old:
+        return ''
+    return f'{(new - old) / old * 100:+.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed p95 regression in percent')
+    args = parser.parse_args()
+
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    with open(args.candidate) as handle:
+        candidate = json.load(handle)
+
+    print(f"baseline:  {baseline['meta']['commit']}  {baseline['meta']['timestamp']}")
+    print(f"candidate: {candidate['meta']['commit']}  {candidate['meta']['timestamp']}")
+    if baseline.get('dataset') != candidate.get('dataset'):
+        print('warning: datasets differ, numbers are not directly comparable')
+    print()
+
+    regressions = []
+    header = f"{'mode':12} {'scenario':30} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18} {'rps':>16}"
+    print(header)
+    print('-' * len(header))
+
+    for mode, scenarios in candidate['results'].items():
+        for name, new in scenarios.items():
+            old = baseline['results'].get(mode, {}).get(name)
+            if old is None:
+                print(f'{mode:12} {name:30} (new scenario)')
+                continue
+
+            cells = []
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+                cells.append(f"{new.get(key, 0):>9.2f} {_delta(old.get(key, 0), new.get(key, 0)):>7}")
+            print(f'{mode:12} {name:30} ' + ' '.join(cells))
+
+            if old.get('p95_ms') and (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 > args.threshold:
+                regressions.append(f'{mode} {name}')
+
+    if regressions:
+        print(f'\np95 regressed more than {args.threshold}%: ' + ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
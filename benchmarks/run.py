@@ -0,0 +1,458 @@
+# benchmarks/run.py
+
+"""
+Reproducible latency/throughput benchmarks for every API endpoint.
+
+Seeds a throwaway test database with a configurable dataset, then runs
+each scenario (register, login, token refresh, patient/doctor CRUD and
+mapping endpoints) through:
+- the Django test client (in-process, no network), and/or
+- a real WSGI server (wsgiref, threaded) over HTTP, with --concurrency
+  client threads
+
+Results (p50/p95/p99 latency and throughput per scenario) are written as
+JSON to benchmarks/results/ so runs can be compared across commits with
+`python -m benchmarks.compare old.json new.json`.
+
+Usage:
+    python -m benchmarks.run --patients 10000 --doctors 1000 --iterations 200
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.common import (
+    BENCHMARK_PASSWORD,
+    ROOT,
+    access_token_for,
+    seed,
+    setup_django,
+    summarize,
+    test_database,
+)
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+# ----------------------------------------------------------------------
+# Drivers
+# ----------------------------------------------------------------------
+
+class TestClientDriver:
+    """
+    Sends requests through django.test.Client (no sockets).
+    """
+    name = 'test_client'
+
+    def __init__(self):
+        from django.test import Client
+        self._local = threading.local()
+        self._client_class = Client
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._client_class()
+        return client
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        data = json.dumps(body) if body is not None else None
+        handler = getattr(self._client(), method.lower())
+        started = time.perf_counter()
+        if data is None:
+            response = handler(path, **headers)
+        else:
+            response = handler(path, data=data, content_type='application/json', **headers)
+        elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, _json(response.content)
+
+    def close(self):
+        pass
+
+
+class WSGIServerDriver:
+    """
+    Runs the project's WSGI application in a threaded wsgiref server and
+    sends real HTTP requests to it.
+    """
+    name = 'wsgi_server'
+
+    def __init__(self):
+        from socketserver import ThreadingMixIn
+        from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+        from django.core.wsgi import get_wsgi_application
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+            daemon_threads = True
+            request_queue_size = 128
+
+        self._server = make_server(
+            '127.0.0.1', 0, get_wsgi_application(),
+            server_class=ThreadingWSGIServer,
+            handler_class=QuietHandler,
+        )
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Host': 'testserver'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+        finally:
+            connection.close()
+        elapsed = time.perf_counter() - started
+        return response.status, elapsed, _json(content)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _json(content):
+    try:
+        return json.loads(content) if content else None
+    except ValueError:
+        return None
+
+
+# ----------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------
+
+class Fixtures:
+    """
+    Per-mode state shared by scenarios: tokens, ids to read/update/delete,
+    and counters for generating unique emails and license numbers.
+
+    Built once per mode with enough rows for every scenario, and
+    discarded at the end of the mode so the dataset doesn't grow
+    from one mode to the next.
+    """
+
+    def __init__(self, user, token, iterations):
+        from apps.doctors.models import Doctor
+        from apps.mappings.models import PatientDoctorMapping
+        from apps.patients.models import Patient
+
+        self.user = user
+        self.token = token
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+        self.patient_ids = list(
+            Patient.objects.filter(created_by=user).order_by('id').values_list('id', flat=True)
+        )
+        self.doctor_ids = list(Doctor.objects.order_by('id').values_list('id', flat=True))
+
+        # Rows consumed by DELETE scenarios, created outside the timed section
+        stamp = time.monotonic_ns()
+        self.deletable_patients = self._create_patients(iterations, f'del{stamp}')
+        self.deletable_doctors = self._create_doctors(iterations, f'del{stamp}')
+        mapping_patients = self._create_patients(iterations, f'map{stamp}')
+        PatientDoctorMapping.objects.bulk_create([
+            PatientDoctorMapping(patient_id=patient_id, doctor_id=self.doctor_ids[0], assigned_by=user)
+            for patient_id in mapping_patients
+        ])
+        self.deletable_mappings = list(
+            PatientDoctorMapping.objects.filter(patient_id__in=mapping_patients).values_list('id', flat=True)
+        )
+        # Patients with no mappings yet, for POST /api/mappings/
+        self.unmapped_patients = self._create_patients(iterations, f'new{stamp}')
+
+        self._created_patients = self.deletable_patients + mapping_patients + self.unmapped_patients
+        self._created_doctors = list(self.deletable_doctors)
+        self.refresh_tokens = []
+
+    def discard(self):
+        """
+        Delete the rows created above that scenarios didn't consume.
+        """
+        from apps.doctors.models import Doctor
+        from apps.patients.models import Patient
+        Patient.objects.filter(id__in=self._created_patients).delete()
+        Doctor.objects.filter(id__in=self._created_doctors).delete()
+
+    def _create_patients(self, count, tag):
+        from apps.patients.models import Patient
+        Patient.objects.bulk_create([
+            Patient(created_by=self.user, name=f'P {tag} {i}', email=f'{tag}-{i}@patients.example.com')
+            for i in range(count)
+        ])
+        return list(
+            Patient.objects.filter(email__startswith=f'{tag}-').order_by('id').values_list('id', flat=True)
+        )
+
+    def _create_doctors(self, count, tag):
+        from apps.doctors.models import Doctor
+        Doctor.objects.bulk_create([
+            Doctor(
+                name=f'D {tag} {i}',
+                email=f'{tag}-{i}@doctors.example.com',
+                phone_number='+1234567890',
+                specialization='General Physician',
+                qualification='MBBS',
+                license_number=f'{tag}-{i}',
+                clinic_address='1 Bench St',
+                consultation_fee=100,
+            )
+            for i in range(count)
+        ])
+        return list(
+            Doctor.objects.filter(email__startswith=f'{tag}-').order_by('id').values_list('id', flat=True)
+        )
+
+    def next(self):
+        return next(self.counter)
+
+    def pop(self, name):
+        with self.lock:
+            return getattr(self, name).pop()
+
+
+def _patient_body(n):
+    return {
+        'name': f'Bench Patient {n}',
+        'email': f'bench-create-{n}-{time.monotonic_ns()}@patients.example.com',
+        'phone_number': '+1234567890',
+        'address': '1 Bench St',
+        'blood_group': 'O+',
+        'medical_history': 'None',
+    }
+
+
+def _doctor_body(n):
+    unique = f'{n}-{time.monotonic_ns()}'
+    return {
+        'name': f'Bench Doctor {n}',
+        'email': f'bench-create-{unique}@doctors.example.com',
+        'phone_number': '+1234567890',
+        'specialization': 'Cardiologist',
+        'qualification': 'MBBS, MD',
+        'experience_years': 5,
+        'license_number': f'BENCH-{unique}',
+        'clinic_address': '1 Bench St',
+        'consultation_fee': '150.00',
+        'is_available': True,
+    }
+
+
+def _register(driver, fx):
+    n = fx.next()
+    return driver.request('POST', '/api/auth/register/', {
+        'name': f'Registered {n}',
+        'email': f'registered-{n}-{time.monotonic_ns()}@example.com',
+        'password': BENCHMARK_PASSWORD,
+        'password2': BENCHMARK_PASSWORD,
+    })
+
+
+def _login(driver, fx):
+    result = driver.request('POST', '/api/auth/login/', {
+        'email': fx.user.email,
+        'password': BENCHMARK_PASSWORD,
+    })
+    if result[2] and 'refresh' in result[2]:
+        with fx.lock:
+            fx.refresh_tokens.append(result[2]['refresh'])
+    return result
+
+
+def _refresh(driver, fx):
+    with fx.lock:
+        refresh = fx.refresh_tokens.pop() if fx.refresh_tokens else ''
+    return driver.request('POST', '/api/auth/token/refresh/', {'refresh': refresh})
+
+
+def _patient_id(fx):
+    return fx.patient_ids[fx.next() % len(fx.patient_ids)]
+
+
+def _doctor_id(fx):
+    return fx.doctor_ids[fx.next() % len(fx.doctor_ids)]
+
+
+SCENARIOS = [
+    # (name, is_auth_scenario, callable)
+    ('auth.register', True, _register),
+    ('auth.login', True, _login),
+    ('auth.token_refresh', True, _refresh),
+    ('patients.list', False, lambda d, fx: d.request('GET', '/api/patients/', token=fx.token)),
+    ('patients.retrieve', False, lambda d, fx: d.request('GET', f'/api/patients/{_patient_id(fx)}/', token=fx.token)),
+    ('patients.create', False, lambda d, fx: d.request('POST', '/api/patients/', _patient_body(fx.next()), token=fx.token)),
+    ('patients.partial_update', False, lambda d, fx: d.request(
+        'PATCH', f'/api/patients/{_patient_id(fx)}/', {'address': f'{fx.next()} Updated St'}, token=fx.token)),
+    ('patients.destroy', False, lambda d, fx: d.request(
+        'DELETE', f'/api/patients/{fx.pop("deletable_patients")}/', token=fx.token)),
+    ('doctors.list', False, lambda d, fx: d.request('GET', '/api/doctors/', token=fx.token)),
+    ('doctors.retrieve', False, lambda d, fx: d.request('GET', f'/api/doctors/{_doctor_id(fx)}/', token=fx.token)),
+    ('doctors.create', False, lambda d, fx: d.request('POST', '/api/doctors/', _doctor_body(fx.next()), token=fx.token)),
+    ('doctors.partial_update', False, lambda d, fx: d.request(
+        'PATCH', f'/api/doctors/{_doctor_id(fx)}/', {'experience_years': fx.next() % 40}, token=fx.token)),
+    ('doctors.destroy', False, lambda d, fx: d.request(
+        'DELETE', f'/api/doctors/{fx.pop("deletable_doctors")}/', token=fx.token)),
+    ('mappings.create', False, lambda d, fx: d.request(
+        'POST', '/api/mappings/',
+        {'patient': fx.pop('unmapped_patients'), 'doctor': _doctor_id(fx)}, token=fx.token)),
+    ('mappings.list', False, lambda d, fx: d.request('GET', '/api/mappings/', token=fx.token)),
+    ('mappings.by_patient', False, lambda d, fx: d.request(
+        'GET', f'/api/mappings/{_patient_id(fx)}/', token=fx.token)),
+    ('mappings.doctors_by_patient', False, lambda d, fx: d.request(
+        'GET', f'/api/mappings/patient/{_patient_id(fx)}/', token=fx.token)),
+    ('mappings.destroy', False, lambda d, fx: d.request(
+        'DELETE', f'/api/mappings/{fx.pop("deletable_mappings")}/', token=fx.token)),
+]
+
+
+def run_scenario(driver, fixtures, scenario, iterations, warmup, concurrency):
+    name, _, func = scenario
+
+    for _ in range(warmup):
+        func(driver, fixtures)
+
+    def one(_):
+        status, elapsed, _body = func(driver, fixtures)
+        return status, elapsed
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(iterations)))
+    else:
+        results = [one(i) for i in range(iterations)]
+    wall = time.perf_counter() - started
+
+    summary = summarize([elapsed for _, elapsed in results], wall)
+    summary['errors'] = sum(1 for status, _ in results if status >= 400)
+    return summary
+
+
+# ----------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--patients', type=int, default=1000, help='Total patients (the benchmark user owns 1/users of them)')
+    parser.add_argument('--doctors', type=int, default=200)
+    parser.add_argument('--mappings-per-patient', type=int, default=2)
+    parser.add_argument('--iterations', type=int, default=100, help='Timed requests per scenario')
+    parser.add_argument('--auth-iterations', type=int, default=20,
+                        help='Timed requests for register/login/refresh (password hashing is slow)')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=1, help='Client threads (wsgi_server mode)')
+    parser.add_argument('--mode', choices=['test_client', 'wsgi_server', 'both'], default='both')
+    parser.add_argument('--only', default='', help='Comma-separated scenario name prefixes to run')
+    parser.add_argument('--settings', default=None, help='DJANGO_SETTINGS_MODULE override')
+    parser.add_argument('--output', default=None, help='Result file (default: benchmarks/results/<time>-<commit>.json)')
+    args = parser.parse_args()
+
+    setup_django(args.settings)
+    import django
+    from django.conf import settings
+
+    prefixes = [p for p in args.only.split(',') if p]
+    scenarios = [s for s in SCENARIOS if not prefixes or s[0].startswith(tuple(prefixes))]
+    modes = ['test_client', 'wsgi_server'] if args.mode == 'both' else [args.mode]
+
+    commit = _git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'settings': settings.SETTINGS_MODULE,
+        },
+        'dataset': {
+            'users': args.users,
+            'patients': args.patients,
+            'doctors': args.doctors,
+            'mappings_per_patient': args.mappings_per_patient,
+        },
+        'params': {
+            'iterations': args.iterations,
+            'auth_iterations': args.auth_iterations,
+            'warmup': args.warmup,
+            'concurrency': args.concurrency,
+        },
+        'results': {},
+    }
+
+    with test_database():
+        users = seed(
+            users=args.users,
+            patients=args.patients,
+            doctors=args.doctors,
+            mappings_per_patient=args.mappings_per_patient,
+        )
+        user = users[0]
+        token = access_token_for(user)
+
+        for mode in modes:
+            driver = TestClientDriver() if mode == 'test_client' else WSGIServerDriver()
+            concurrency = args.concurrency if mode == 'wsgi_server' else 1
+            mode_results = report['results'][mode] = {}
+            fixtures = Fixtures(user, token, args.iterations + args.warmup)
+            try:
+                for scenario in scenarios:
+                    iterations = args.auth_iterations if scenario[1] else args.iterations
+                    if scenario[0] == 'auth.token_refresh':
+                        for _ in range(iterations + args.warmup):
+                            _login(TestClientDriver(), fixtures)
+                    mode_results[scenario[0]] = run_scenario(
+                        driver, fixtures, scenario, iterations, args.warmup, concurrency
+                    )
+                    print(f'{mode:12} {scenario[0]:30} {mode_results[scenario[0]]}')
+            finally:
+                driver.close()
+                fixtures.discard()
+
+    if args.output:
+        path = Path(args.output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        path = RESULTS_DIR / f'{stamp}-{commit}.json'
+    path.write_text(json.dumps(report, indent=2))
+    print(f'Results written to {path}')
+
+
+if __name__ == '__main__':
+    main()
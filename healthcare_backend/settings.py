@@ -1,5 +1,5 @@
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -26,19 +26,28 @@ INSTALLED_APPS = [
     # Third-party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'django_extensions',
     
     # Our custom apps
+    'apps.core',
     'apps.authentication',
     'apps.patients',
     'apps.doctors',
     'apps.mappings',
+    'apps.jobs',
+    'apps.changes',
+    'apps.stats',
+    'apps.idempotency',
 ]
 
 # Custom user model
 AUTH_USER_MODEL = 'authentication.User'
 
 MIDDLEWARE = [
+    # First, so they measure the whole request (see apps/core/middleware.py)
+    'apps.core.middleware.MetricsMiddleware',
+    'apps.core.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +89,24 @@ DATABASES = {
     }
 }
 
+# Owner shards (apps/core/sharding.py): each user's patients and mappings
+# live on one of these aliases. Aliases other than 'default' use the same
+# server and credentials with <DATABASE_NAME>_<alias> as the database
+# name, unless <ALIAS>_DATABASE_NAME is set.
+SHARD_DATABASES = config('SHARD_DATABASES', default='default', cast=Csv())
+for _alias in SHARD_DATABASES:
+    if _alias not in DATABASES:
+        DATABASES[_alias] = dict(
+            DATABASES['default'],
+            NAME=config(f'{_alias.upper()}_DATABASE_NAME', default=f"{DATABASES['default']['NAME']}_{_alias}")
+        )
+DATABASE_ROUTERS = ['apps.core.sharding.ShardRouter']
+# Primary keys of sharded tables come from a block of this size per shard
+SHARD_ID_BLOCK = config('SHARD_ID_BLOCK', default=10 ** 12, cast=int)
+# Seconds `rebalance_shards --move` waits after locking a user for writes
+# already in flight to finish
+SHARD_MOVE_GRACE = config('SHARD_MOVE_GRACE', default=5, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -122,15 +149,147 @@ REST_FRAMEWORK = {
     'DEFAULT_PARSER_CLASSES': (
         'rest_framework.parsers.JSONParser',
     ),
+    # Token buckets per user (or IP) and scope, see apps/core/throttling.py
+    'DEFAULT_THROTTLE_CLASSES': (
+        'apps.core.throttling.TokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'auth': config('THROTTLE_AUTH_RATE', default='20/min'),
+        'write': config('THROTTLE_WRITE_RATE', default='120/min'),
+        'read': config('THROTTLE_READ_RATE', default='600/min'),
+    },
+}
+
+# Idempotency-Key on POST (apps/idempotency)
+# Stored responses are replayed for this many seconds
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+# A key still in progress after this many seconds is considered abandoned
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=60, cast=int)
+
+# Rate limiting (apps/core/throttling.py)
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+# 'local': per-process token buckets; 'cache': fixed-window counters shared
+# through the THROTTLE_CACHE cache (allows bursts of 2x at window boundaries)
+THROTTLE_STORE = config('THROTTLE_STORE', default='local')
+THROTTLE_CACHE = config('THROTTLE_CACHE', default='default')
+
+# Cascade deletes (apps/core/deletion.py)
+# Dependent rows are deleted in chunks of this size before the parent row
+CASCADE_DELETE_CHUNK_SIZE = config('CASCADE_DELETE_CHUNK_SIZE', default=5000, cast=int)
+# Above this many dependent rows the deletion runs as a background job
+CASCADE_DELETE_BACKGROUND_THRESHOLD = config('CASCADE_DELETE_BACKGROUND_THRESHOLD', default=20000, cast=int)
+
+# Mapping table partitions (PostgreSQL, apps/mappings/partitioning.py)
+# `manage.py mapping_partitions` keeps this many future months ready
+MAPPING_PARTITION_MONTHS_AHEAD = config('MAPPING_PARTITION_MONTHS_AHEAD', default=3, cast=int)
+
+# Archiving (apps/mappings/archive.py): inactive mappings assigned more than
+# this many days ago move to the compressed archive table, this many rows per
+# transaction
+MAPPING_ARCHIVE_AFTER_DAYS = config('MAPPING_ARCHIVE_AFTER_DAYS', default=365, cast=int)
+MAPPING_ARCHIVE_CHUNK_SIZE = config('MAPPING_ARCHIVE_CHUNK_SIZE', default=1000, cast=int)
+# The archive job re-queues itself this many seconds after each run
+# (`archive_mappings --enqueue` starts it); 0 = run once, e.g. from cron
+MAPPING_ARCHIVE_INTERVAL = config('MAPPING_ARCHIVE_INTERVAL', default=86400, cast=int)
+
+# Background jobs (apps/jobs, run with `python manage.py run_worker`)
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=1.0, cast=float)
+JOB_DEFAULT_MAX_ATTEMPTS = config('JOB_DEFAULT_MAX_ATTEMPTS', default=3, cast=int)
+# Retry n waits JOB_RETRY_BACKOFF * 2 ** (n - 1) seconds
+JOB_RETRY_BACKOFF = config('JOB_RETRY_BACKOFF', default=10, cast=int)
+# Running jobs are requeued when their worker hasn't refreshed locked_at
+# for JOB_LEASE_TIMEOUT seconds; it does so every JOB_HEARTBEAT_INTERVAL
+# seconds (0 disables the heartbeat thread) and on every set_progress()
+JOB_LEASE_TIMEOUT = config('JOB_LEASE_TIMEOUT', default=3600, cast=int)
+JOB_HEARTBEAT_INTERVAL = config('JOB_HEARTBEAT_INTERVAL', default=60.0, cast=float)
+
+# Change feed (apps/changes, GET /api/changes/)
+CHANGES_PAGE_SIZE = config('CHANGES_PAGE_SIZE', default=100, cast=int)
+CHANGES_MAX_PAGE_SIZE = config('CHANGES_MAX_PAGE_SIZE', default=1000, cast=int)
+# Events younger than this many seconds are held back (see ChangeFeedView)
+CHANGES_FEED_DELAY = config('CHANGES_FEED_DELAY', default=2, cast=float)
+
+# ?modified_since= sync on list endpoints (apps/changes/sync.py)
+# next_modified_since is this many seconds behind the server clock
+SYNC_WATERMARK_LAG = config('SYNC_WATERMARK_LAG', default=5, cast=float)
+
+# GET /api/ is cacheable by clients for this many seconds (it has an ETag too)
+API_ROOT_MAX_AGE = config('API_ROOT_MAX_AGE', default=3600, cast=int)
+# GET /health/ready reuses its database check for this many seconds
+HEALTH_CHECK_CACHE_SECONDS = config('HEALTH_CHECK_CACHE_SECONDS', default=5.0, cast=float)
+
+# Admin changelists count exactly up to this many rows, then use the
+# planner's estimate (PostgreSQL only, see apps/core/admin.py)
+ADMIN_EXACT_COUNT_LIMIT = config('ADMIN_EXACT_COUNT_LIMIT', default=10000, cast=int)
+
+# Dashboard statistics (apps/stats, GET /api/stats/)
+# Snapshots older than this many seconds are ignored (0: always compute live)
+STATS_SNAPSHOT_MAX_AGE = config('STATS_SNAPSHOT_MAX_AGE', default=900, cast=int)
+STATS_NEW_PATIENT_DAYS = config('STATS_NEW_PATIENT_DAYS', default=30, cast=int)
+STATS_MAX_DAYS = config('STATS_MAX_DAYS', default=365, cast=int)
+# Doctors listed under mappings.per_doctor, busiest first
+STATS_TOP_DOCTORS = config('STATS_TOP_DOCTORS', default=20, cast=int)
+
+# Unique field validation (apps/core/serializers.py UniqueFieldsMixin)
+# 'query': one SELECT checks all unique fields before saving
+# 'constraint': skip the pre-check, map IntegrityError to field errors
+UNIQUE_VALIDATION_MODE = config('UNIQUE_VALIDATION_MODE', default='query')
+
+# Request instrumentation (apps/core/middleware.py)
+# Raise instead of logging a warning when a view exceeds its query budget.
+# Turn this on in tests.
+QUERY_BUDGET_ENFORCE = config('QUERY_BUDGET_ENFORCE', default=False, cast=bool)
+
+# Metrics endpoint (apps/core/metrics.py)
+# Under gunicorn, point this at a shared, writable directory (e.g. a tmpfs)
+# that is emptied on deploy so /metrics aggregates all workers.
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')
+METRICS_WRITE_INTERVAL = config('METRICS_WRITE_INTERVAL', default=5.0, cast=float)
+# Bearer token required to scrape /metrics; without one /metrics is
+# only served in DEBUG (403 otherwise)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Server-Timing response header (apps/core/middleware.py); exposes
+# per-request DB/serialize/render times, so only on by default in DEBUG
+SERVER_TIMING_HEADER = config('SERVER_TIMING_HEADER', default=DEBUG, cast=bool)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # One JSON line per request: queries, db/serialize/render/total ms
+        'apps.core.requests': {
+            'handlers': ['console'],
+            # Set to INFO to log every request; WARNING keeps budget overruns only
+            'level': config('REQUEST_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
 }
 
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=5),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': False,
+    'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
-}
\ No newline at end of file
+}
+
+# Token service (apps/authentication/tokens.py)
+# OutstandingToken rows for new tokens are buffered and written in batches
+TOKEN_BLACKLIST_BATCH_SIZE = config('TOKEN_BLACKLIST_BATCH_SIZE', default=100, cast=int)
+TOKEN_BLACKLIST_FLUSH_INTERVAL = config('TOKEN_BLACKLIST_FLUSH_INTERVAL', default=2.0, cast=float)
+# How often (seconds) each process pulls blacklist entries written by other processes
+TOKEN_BLACKLIST_SYNC_INTERVAL = config('TOKEN_BLACKLIST_SYNC_INTERVAL', default=5.0, cast=float)
+# Blacklist bloom filter, rebuilt from unexpired entries once more ids
+# than TOKEN_BLOOM_CAPACITY have been added
+TOKEN_BLOOM_CAPACITY = config('TOKEN_BLOOM_CAPACITY', default=100000, cast=int)
+TOKEN_BLOOM_ERROR_RATE = config('TOKEN_BLOOM_ERROR_RATE', default=0.001, cast=float)
@@ -0,0 +1,58 @@
+# healthcare_backend/settings_api.py
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE
+
+"""
+Settings profile for API-only worker processes.
+
+    DJANGO_SETTINGS_MODULE=healthcare_backend.settings_api
+
+The API authenticates with JWT only and renders JSON only, so these
+processes skip everything that exists for the admin and HTML pages:
+
+- apps: admin, sessions, messages, staticfiles, django_extensions
+- middleware: sessions, CSRF, auth (DRF sets request.user itself),
+  messages, X-Frame-Options
+- URLs: healthcare_backend.urls_api (no /admin/)
+
+Fewer apps and modules to import means faster pod start-up, and a
+shorter middleware chain means less work per request. Run the admin,
+migrations and management commands with the full profile
+(healthcare_backend.settings); `python -m benchmarks.cold_start`
+compares the two.
+"""
+
+ADMIN_ONLY_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django_extensions',
+]
+
+ADMIN_ONLY_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_ONLY_APPS]
+
+MIDDLEWARE = [name for name in MIDDLEWARE if name not in ADMIN_ONLY_MIDDLEWARE]
+
+ROOT_URLCONF = 'healthcare_backend.urls_api'
+
+# No HTML is rendered; keep the engine for error pages only
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'context_processors': [],
+        },
+    },
+]
@@ -0,0 +1,49 @@
+# healthcare_backend/urls_api.py
+
+from django.urls import path, include
+from apps.core.views import api_root, health_live, health_ready, metrics_view
+
+"""
+URL configuration for API-only processes (settings_api.py).
+
+Every API route lives here; urls.py adds the admin on top for the full
+profile.
+"""
+
+urlpatterns = [
+    # Prometheus metrics
+    path('metrics', metrics_view, name='metrics'),
+    
+    # Liveness / readiness probes
+    path('health/live', health_live, name='health-live'),
+    path('health/ready', health_ready, name='health-ready'),
+    
+    # API Root - route catalog
+    path('api/', api_root, name='api-root'),
+    
+    # Authentication endpoints
+    path('api/auth/', include('apps.authentication.urls')),
+    
+    # Patient endpoints
+    path('api/patients/', include('apps.patients.urls')),
+    
+    # Doctor endpoints
+    path('api/doctors/', include('apps.doctors.urls')),
+    
+    # Patient-Doctor Mapping endpoints
+    path('api/mappings/', include('apps.mappings.urls')),
+    
+    # Async (ASGI-native) read endpoints
+    path('api/async/patients/', include('apps.patients.async_urls')),
+    path('api/async/doctors/', include('apps.doctors.async_urls')),
+    path('api/async/mappings/', include('apps.mappings.async_urls')),
+    
+    # Background job status
+    path('api/jobs/', include('apps.jobs.urls')),
+    
+    # Change feed
+    path('api/changes/', include('apps.changes.urls')),
+    
+    # Dashboard statistics
+    path('api/stats/', include('apps.stats.urls')),
+]
\ No newline at end of file